@@ -12,15 +12,16 @@ Features:
 """
 
 import streamlit as st
-import subprocess
-import json
-import requests
+import os
 import time
-import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional, Union
 import pandas as pd
 
+from troubleshooter import anomaly, categorize, collector, frames, informer, llm, llmcache, pipeline, prompt, rates, templates, triage
+from troubleshooter.evidence import EvidenceBundle
+
 # Page configuration
 st.set_page_config(
     page_title="Enhanced AI OpenShift Troubleshooter v2.0",
@@ -30,9 +31,11 @@ st.set_page_config(
 )
 
 # Enhanced Configuration
-GROQ_API_KEY = "YOUR_GROQ_API_KEY_HERE"
-GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "YOUR_GROQ_API_KEY_HERE")
+GROQ_ENDPOINT = os.environ.get("GROQ_ENDPOINT", "https://api.groq.com/openai/v1/chat/completions")
 GROQ_MODEL = "llama-3.3-70b-versatile"
+PROMPT_TOKEN_BUDGET = prompt.BUDGET  # Upper bound on the evidence sent with each analysis
+PROMPT_VERSION = "v2-1"  # Bump when the prompt changes so cached analyses are not reused
 
 # Severity levels and categories
 SEVERITY_LEVELS = {
@@ -42,16 +45,7 @@ SEVERITY_LEVELS = {
     "SUCCESS": {"color": "#3e8635", "icon": "🟢", "priority": 4}
 }
 
-ERROR_CATEGORIES = {
-    "RESOURCE": {"name": "Resource Issues", "icon": "💾", "patterns": ["insufficient", "resource", "memory", "cpu", "disk"]},
-    "NETWORK": {"name": "Network Issues", "icon": "🌐", "patterns": ["network", "dns", "connection", "timeout", "unreachable"]},
-    "STORAGE": {"name": "Storage Issues", "icon": "💿", "patterns": ["volume", "mount", "pvc", "storage", "disk"]},
-    "IMAGE": {"name": "Image Issues", "icon": "📦", "patterns": ["image", "pull", "registry", "manifest"]},
-    "PERMISSION": {"name": "Permission Issues", "icon": "🔐", "patterns": ["permission", "forbidden", "unauthorized", "rbac"]},
-    "CONFIG": {"name": "Configuration Issues", "icon": "⚙️", "patterns": ["config", "environment", "secret", "configmap"]},
-    "INIT": {"name": "Initialization Issues", "icon": "🔄", "patterns": ["init", "startup", "readiness", "liveness"]},
-    "SCHEDULING": {"name": "Scheduling Issues", "icon": "📅", "patterns": ["schedule", "node", "affinity", "taint", "toleration"]}
-}
+ERROR_CATEGORIES = categorize.ERROR_CATEGORIES
 
 # Enhanced CSS with severity colors and better visualization
 st.markdown("""
@@ -186,88 +180,47 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def run_command(cmd, timeout=30):
-    """Execute shell command and return output"""
-    try:
-        result = subprocess.run(
-            cmd, shell=True, capture_output=True, text=True, timeout=timeout
-        )
-        return result.returncode, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return -1, "", "Command timed out"
-    except Exception as e:
-        return -1, "", str(e)
-
 def categorize_error(error_text: str) -> Tuple[str, str]:
     """Categorize error and determine severity"""
-    error_lower = error_text.lower()
-    
-    # Determine category
-    category = "CONFIG"  # default
-    for cat_key, cat_info in ERROR_CATEGORIES.items():
-        if any(pattern in error_lower for pattern in cat_info["patterns"]):
-            category = cat_key
-            break
-    
-    # Determine severity based on keywords and patterns
-    if any(word in error_lower for word in ["failed", "error", "crash", "critical", "fatal", "emergency"]):
-        severity = "CRITICAL"
-    elif any(word in error_lower for word in ["warning", "warn", "deprecated", "retry", "backoff"]):
-        severity = "WARNING"
-    elif any(word in error_lower for word in ["success", "completed", "ready", "healthy"]):
-        severity = "SUCCESS"
-    else:
-        severity = "INFO"
-    
-    return category, severity
+    return categorize.categorize_error(error_text)
+
+def categorize_errors(error_texts: List[str]) -> List[Tuple[str, str]]:
+    """Categorize many errors and determine their severities in one call"""
+    return categorize.categorize_errors(error_texts)
+
+def get_namespaces() -> List[str]:
+    """Get list of namespaces"""
+    try:
+        return informer.get_namespaces()
+    except collector.CollectorError:
+        return ["default"]
+
+def get_pods_in_namespace(namespace: str) -> List[str]:
+    """Get pods in a specific namespace"""
+    try:
+        return informer.get_pods_in_namespace(namespace)
+    except collector.CollectorError:
+        return []
+
+def get_pod_logs(namespace: str, pod: str, tail: int = 100) -> str:
+    """Get recent pod logs"""
+    try:
+        return collector.get_pod_logs(namespace, pod, tail=tail)
+    except collector.CollectorError:
+        return "No logs available\n"
 
-def analyze_resource_consumption(namespace: str, pod: str) -> Dict:
+def get_log_window(namespace: str, pod: str) -> Dict:
+    """Fetch the pod log once, timestamped: its recent lines as "logs" and its sliding-window rates"""
+    try:
+        return rates.analyze_pod(namespace, pod)
+    except collector.CollectorError as e:
+        return {"error": f"Log rates failed: {e}", "logs": "No logs available\n"}
+
+def analyze_resource_consumption(namespace: str, pod: str, bundle: Optional[EvidenceBundle] = None) -> Dict:
     """Analyze pod resource consumption"""
     try:
-        # Get pod resource requests and limits
-        cmd = f"oc get pod {pod} -n {namespace} -o json"
-        returncode, stdout, stderr = run_command(cmd)
-        
-        if returncode != 0:
-            return {"error": f"Failed to get pod info: {stderr}"}
-        
-        pod_data = json.loads(stdout)
-        
-        # Extract resource information
-        containers = pod_data.get("spec", {}).get("containers", [])
-        resource_info = {
-            "requests": {"cpu": "0", "memory": "0"},
-            "limits": {"cpu": "0", "memory": "0"},
-            "containers": len(containers)
-        }
-        
-        for container in containers:
-            resources = container.get("resources", {})
-            requests = resources.get("requests", {})
-            limits = resources.get("limits", {})
-            
-            # Aggregate requests and limits
-            if "cpu" in requests:
-                resource_info["requests"]["cpu"] = requests["cpu"]
-            if "memory" in requests:
-                resource_info["requests"]["memory"] = requests["memory"]
-            if "cpu" in limits:
-                resource_info["limits"]["cpu"] = limits["cpu"]
-            if "memory" in limits:
-                resource_info["limits"]["memory"] = limits["memory"]
-        
-        # Get current resource usage (if available)
-        cmd = f"oc adm top pod {pod} -n {namespace} --no-headers 2>/dev/null || echo 'N/A N/A'"
-        returncode, stdout, stderr = run_command(cmd)
-        
-        usage_parts = stdout.strip().split()
-        resource_info["current"] = {
-            "cpu": usage_parts[1] if len(usage_parts) > 1 and usage_parts[1] != "N/A" else "N/A",
-            "memory": usage_parts[2] if len(usage_parts) > 2 and usage_parts[2] != "N/A" else "N/A"
-        }
-        
-        return resource_info
-        
+        bundle = bundle or EvidenceBundle.fetch(namespace, pod)
+        return bundle.resources()
     except Exception as e:
         return {"error": f"Resource analysis failed: {str(e)}"}
 
@@ -276,28 +229,31 @@ def get_cluster_health(namespace: str) -> Dict:
     try:
         health_info = {}
         
-        # Get node status
-        cmd = "oc get nodes --no-headers | wc -l"
-        returncode, stdout, stderr = run_command(cmd)
-        health_info["total_nodes"] = stdout.strip() if returncode == 0 else "N/A"
+        # Nodes, pods and events are independent lookups, fetch them in parallel
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            nodes = executor.submit(collector.get_nodes)
+            pods = executor.submit(collector.get_pods, namespace)
+            events = executor.submit(collector.get_events, namespace)
         
-        cmd = "oc get nodes --no-headers | grep -c Ready"
-        returncode, stdout, stderr = run_command(cmd)
-        health_info["ready_nodes"] = stdout.strip() if returncode == 0 else "N/A"
+        # Get node status
+        try:
+            health_info["total_nodes"] = str(len(nodes.result()))
+            health_info["ready_nodes"] = str(sum(1 for node in nodes.result() if collector.node_ready(node)))
+        except collector.CollectorError:
+            health_info["total_nodes"] = health_info["ready_nodes"] = "N/A"
         
         # Get namespace pod status
-        cmd = f"oc get pods -n {namespace} --no-headers | wc -l"
-        returncode, stdout, stderr = run_command(cmd)
-        health_info["total_pods"] = stdout.strip() if returncode == 0 else "N/A"
-        
-        cmd = f"oc get pods -n {namespace} --no-headers | grep -c Running"
-        returncode, stdout, stderr = run_command(cmd)
-        health_info["running_pods"] = stdout.strip() if returncode == 0 else "N/A"
+        try:
+            health_info["total_pods"] = str(len(pods.result()))
+            health_info["running_pods"] = str(sum(1 for p in pods.result() if collector.pod_display_status(p) == "Running"))
+        except collector.CollectorError:
+            health_info["total_pods"] = health_info["running_pods"] = "N/A"
         
         # Get recent events
-        cmd = f"oc get events -n {namespace} --sort-by='.lastTimestamp' | tail -5"
-        returncode, stdout, stderr = run_command(cmd)
-        health_info["recent_events"] = stdout if returncode == 0 else "No recent events"
+        try:
+            health_info["recent_events"] = collector.format_events(events.result()[-5:])
+        except collector.CollectorError:
+            health_info["recent_events"] = "No recent events"
         
         return health_info
         
@@ -306,65 +262,30 @@ def get_cluster_health(namespace: str) -> Dict:
 
 def detect_log_anomalies(logs: str) -> List[Dict]:
     """Detect anomalies in logs"""
-    anomalies = []
-    
-    # Pattern-based anomaly detection
-    patterns = {
-        "excessive_restarts": {
-            "pattern": r"restart.*(\d+)",
-            "threshold": 5,
-            "description": "Excessive container restarts detected"
-        },
-        "repeated_errors": {
-            "pattern": r"(error|failed|exception)",
-            "threshold": 10,
-            "description": "High frequency of errors in logs"
-        },
-        "timeout_issues": {
-            "pattern": r"timeout|timed out",
-            "threshold": 3,
-            "description": "Multiple timeout issues detected"
-        },
-        "network_retries": {
-            "pattern": r"retry|retrying",
-            "threshold": 5,
-            "description": "Excessive network retries detected"
-        }
-    }
-    
-    for anomaly_type, config in patterns.items():
-        matches = re.findall(config["pattern"], logs, re.IGNORECASE)
-        if len(matches) >= config["threshold"]:
-            anomalies.append({
-                "type": anomaly_type,
-                "count": len(matches),
-                "description": config["description"],
-                "severity": "WARNING" if len(matches) < config["threshold"] * 2 else "CRITICAL"
-            })
-    
-    return anomalies
+    return anomaly.detect_log_anomalies(logs)
+
+def get_enhanced_ai_analysis(pod_info: str, resource_info: Dict, cluster_health: Dict, anomalies: List[Dict], namespace: str, pod: str,
+                             logs: str = "", stream: bool = False, evidence: Optional[Dict] = None) -> Union[str, Iterator[str]]:
+    """Get enhanced AI analysis with all the new features, as text chunks while they arrive if stream is set.
 
-def get_enhanced_ai_analysis(pod_info: str, resource_info: Dict, cluster_health: Dict, anomalies: List[Dict], namespace: str, pod: str) -> str:
-    """Get enhanced AI analysis with all the new features"""
+    Answers are cached by evidence (see llmcache.pod_evidence), or by the prompt if not given.
+    """
     
-    # Prepare comprehensive context for AI
-    context = f"""
+    # Prepare comprehensive context for AI, most relevant evidence kept first when over budget
+    builder = prompt.PromptBuilder(PROMPT_TOKEN_BUDGET)
+    builder.add("DETECTED ANOMALIES", anomalies, priority=4)
+    builder.add("LOG TEMPLATES (count × line pattern, <*> marks varying values)",
+                templates.summarize_logs(logs) if logs else "", priority=3)
+    builder.add("RESOURCE ANALYSIS", resource_info, priority=3)
+    builder.add("POD INFORMATION", pod_info, priority=2)
+    builder.add("CLUSTER HEALTH", cluster_health, priority=1)
+    context = builder.build(
+        header=f"""
     ENHANCED KUBERNETES TROUBLESHOOTING ANALYSIS
     
     Pod: {namespace}/{pod}
-    
-    RESOURCE ANALYSIS:
-    {json.dumps(resource_info, indent=2)}
-    
-    CLUSTER HEALTH:
-    {json.dumps(cluster_health, indent=2)}
-    
-    DETECTED ANOMALIES:
-    {json.dumps(anomalies, indent=2)}
-    
-    POD INFORMATION AND LOGS:
-    {pod_info}
-    
+    """,
+        footer="""
     Please provide a comprehensive analysis including:
     1. SEVERITY CLASSIFICATION (CRITICAL/WARNING/INFO/SUCCESS)
     2. ROOT CAUSE ANALYSIS with specific technical details
@@ -375,14 +296,9 @@ def get_enhanced_ai_analysis(pod_info: str, resource_info: Dict, cluster_health:
     7. TIMELINE of events leading to the issue
     
     Format your response with clear sections and actionable insights.
-    """
+    """)
     
     try:
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "model": GROQ_MODEL,
             "messages": [
@@ -399,36 +315,394 @@ def get_enhanced_ai_analysis(pod_info: str, resource_info: Dict, cluster_health:
             "temperature": 0.1
         }
         
-        response = requests.post(GROQ_ENDPOINT, headers=headers, json=payload, timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-        else:
-            return f"AI Analysis Error: {response.status_code} - {response.text}"
+        answer = llmcache.cached_completion(GROQ_ENDPOINT, GROQ_API_KEY, payload,
+                                            context if evidence is None else evidence, PROMPT_VERSION, stream)
+        if isinstance(answer, str):
+            return answer
+        return llm.safe_stream(answer, "AI Analysis failed")
             
+    except llm.LLMError as e:
+        return f"AI Analysis Error: {e}"
     except Exception as e:
         return f"AI Analysis failed: {str(e)}"
 
+def analyze_failure_group(group: triage.FailureGroup) -> str:
+    """Get one AI analysis for a group of pods failing the same way"""
+    payload = {
+        "model": GROQ_MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are an expert Kubernetes and OpenShift troubleshooter. Several pods fail the same way; diagnose them together and give actionable, specific fixes."
+            },
+            {
+                "role": "user",
+                "content": group.build_prompt(PROMPT_TOKEN_BUDGET)
+            }
+        ],
+        "max_tokens": 1000,
+        "temperature": 0.1
+    }
+    return llmcache.cached_completion(GROQ_ENDPOINT, GROQ_API_KEY, payload, group.evidence(), PROMPT_VERSION + "-triage")
+
 def create_timeline_visualization(events: str) -> List[Dict]:
     """Create timeline from events"""
-    timeline = []
-    
-    # Parse events and create timeline items
-    lines = events.split('\n')
-    for line in lines[1:]:  # Skip header
-        if line.strip():
-            parts = line.split()
-            if len(parts) >= 6:
-                timeline.append({
-                    "time": parts[0],
-                    "type": parts[1],
-                    "reason": parts[2],
-                    "object": parts[3],
-                    "message": " ".join(parts[4:])
-                })
-    
-    return timeline
+    return frames.events_table_frame(events).to_dict("records")
+
+def render_ai_analysis_tab(ai_analysis: Union[str, Iterator[str]], namespace: str, pod: str) -> str:
+    """Render the AI analysis tab, writing a streamed analysis as it arrives, and return the text written"""
+    st.markdown(f"""
+    <div class="severity-info">
+        <h3>🧠 Enhanced AI Analysis</h3>
+        <p><strong>Pod:</strong> {namespace}/{pod}</p>
+        <p><strong>Analysis Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    if isinstance(ai_analysis, str):
+        st.markdown(ai_analysis)
+        return ai_analysis
+    return st.write_stream(ai_analysis)
+
+def render_resources_tab(resource_info: Dict):
+    """Render the resource analysis tab"""
+    st.header("📊 Resource Analysis")
+
+    if "error" not in resource_info:
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-value">{resource_info['containers']}</div>
+                <div class="metric-label">Containers</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+        with col2:
+            cpu_current = resource_info.get('current', {}).get('cpu', 'N/A')
+            st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-value">{cpu_current}</div>
+                <div class="metric-label">CPU Usage</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+        with col3:
+            memory_current = resource_info.get('current', {}).get('memory', 'N/A')
+            st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-value">{memory_current}</div>
+                <div class="metric-label">Memory Usage</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+        st.markdown(f"""
+        <div class="resource-metrics">
+            <h4>Resource Requests & Limits</h4>
+            <p><strong>CPU Request:</strong> {resource_info['requests']['cpu']}</p>
+            <p><strong>CPU Limit:</strong> {resource_info['limits']['cpu']}</p>
+            <p><strong>Memory Request:</strong> {resource_info['requests']['memory']}</p>
+            <p><strong>Memory Limit:</strong> {resource_info['limits']['memory']}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.error(resource_info["error"])
+
+def render_cluster_health_tab(cluster_health: Dict):
+    """Render the cluster health tab"""
+    st.header("🏥 Cluster Health")
+
+    if "error" not in cluster_health:
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric("Total Nodes", cluster_health.get('total_nodes', 'N/A'))
+        with col2:
+            st.metric("Ready Nodes", cluster_health.get('ready_nodes', 'N/A'))
+        with col3:
+            st.metric("Total Pods", cluster_health.get('total_pods', 'N/A'))
+        with col4:
+            st.metric("Running Pods", cluster_health.get('running_pods', 'N/A'))
+
+        st.markdown(f"""
+        <div class="cluster-health">
+            <h4>Recent Events</h4>
+            <pre>{cluster_health.get('recent_events', 'No events')}</pre>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.error(cluster_health["error"])
+
+def render_anomalies_tab(anomalies: List[Dict]):
+    """Render the anomaly detection tab"""
+    st.header("⚠️ Anomaly Detection")
+
+    if anomalies:
+        for anomaly in anomalies:
+            severity_class = f"severity-{anomaly['severity'].lower()}"
+            icon = SEVERITY_LEVELS[anomaly['severity']]['icon']
+
+            st.markdown(f"""
+            <div class="{severity_class}">
+                <h4>{icon} {anomaly['description']}</h4>
+                <p><strong>Type:</strong> {anomaly['type']}</p>
+                <p><strong>Count:</strong> {anomaly['count']}</p>
+                <p><strong>Severity:</strong> {anomaly['severity']}</p>
+            </div>
+            """, unsafe_allow_html=True)
+    else:
+        st.info("🟢 No anomalies detected in the logs")
+
+def render_timeline_tab(events: pd.DataFrame):
+    """Render the event timeline tab from classified events"""
+    st.header("📅 Event Timeline")
+
+    if not events.empty:
+        summary = frames.summarize(events, weights="count")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Events", summary["total"])
+        col2.metric("Critical", summary["by_severity"].get("CRITICAL", 0))
+        col3.metric("Warnings", summary["by_severity"].get("WARNING", 0))
+
+        for item in events.tail(10).itertuples():  # Show last 10 events
+            icon = SEVERITY_LEVELS[item.severity]['icon']
+            when = item.time.strftime('%Y-%m-%d %H:%M:%S') if pd.notna(item.time) else 'N/A'
+            st.markdown(f"""
+            <div class="timeline-item">
+                <strong>{when}</strong> - {icon} {item.type}
+                <br><strong>Reason:</strong> {item.reason} (x{item.count})
+                <br><strong>Message:</strong> {item.message}
+            </div>
+            """, unsafe_allow_html=True)
+
+        st.subheader("Events by Reason")
+        st.bar_chart(frames.top(events, "reason", 10, weights="count"))
+        rates = frames.error_rate(events, weights="count")
+        if len(rates) > 1:
+            st.subheader("Critical Events per Minute")
+            st.line_chart(rates["errors"])
+    else:
+        st.info("No events found for this pod")
+
+def render_log_stats(logs: pd.DataFrame):
+    """Render severity and category counts of the classified log lines"""
+    st.subheader("📈 Log Line Classification")
+    if logs.empty:
+        st.info("No log lines to classify")
+        return
+    summary = frames.summarize(logs)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**By severity**")
+        st.bar_chart(pd.Series(summary["by_severity"], name="lines"))
+    with col2:
+        st.markdown("**By category**")
+        st.bar_chart(pd.Series(summary["by_category"], name="lines"))
+    rates = frames.error_rate(logs)
+    if len(rates) > 1:
+        st.markdown("**Error lines per minute**")
+        st.line_chart(rates["errors"])
+
+def render_log_rates(report: Dict):
+    """Render per-minute anomaly rates from the timestamped log window"""
+    st.subheader("⏱️ Log Rates")
+    if "error" in report:
+        st.error(report["error"])
+        return
+    if not report["lines"]:
+        st.info("No timestamped log lines to measure")
+        return
+    st.caption(f"{report['lines']} lines in the last {report['window_seconds'] // 60} minutes of log time "
+               f"({report['lines_per_minute']}/min), up to {report['last_timestamp']}; "
+               f"{report['new_lines']} new since the last analysis")
+    for item in report["anomalies"]:
+        icon = SEVERITY_LEVELS[item['severity']]['icon']
+        st.markdown(f"{icon} **{item['description']}**")
+    active = [r for r in report["rates"] if r["count"]]
+    if active:
+        st.dataframe(pd.DataFrame(active).set_index("type"), use_container_width=True)
+
+def follow_log_anomalies(namespace: str, pod: str, seconds: int, placeholder):
+    """Follow the pod log and keep the anomalies placeholder updated with running counts"""
+    counter = anomaly.AnomalyCounter()
+    deadline = time.monotonic() + seconds
+    stream = None
+    try:
+        stream = anomaly.batches(collector.follow_pod_logs(namespace, pod, tail=100))
+        for batch in stream:
+            counter.feed(batch)
+            remaining = int(deadline - time.monotonic())
+            with placeholder.container():
+                render_anomalies_tab(counter.anomalies())
+                st.caption(f"📡 Live: {counter.lines} lines scanned, {max(remaining, 0)}s left")
+                if counter.recent:
+                    st.code("\n".join(list(counter.recent)[-20:]))
+            if remaining <= 0:
+                break
+    except collector.CollectorError as e:
+        with placeholder.container():
+            render_anomalies_tab(counter.anomalies())
+            st.warning(f"Log stream ended after {counter.lines} lines: {e}")
+    finally:
+        if stream is not None:
+            stream.close()
+
+def render_remediation_tab(pod_info: str, namespace: str, pod: str):
+    """Render the remediation tab"""
+    st.header("🔧 Remediation Steps")
+
+    # Extract common remediation patterns
+    if "CrashLoopBackOff" in pod_info:
+        st.markdown("""
+        <div class="remediation-step">
+            <h4>🔄 CrashLoopBackOff Remediation</h4>
+            <ol>
+                <li>Check container logs: <code>oc logs {pod} -n {namespace} --previous</code></li>
+                <li>Verify image and command configuration</li>
+                <li>Check resource limits and requests</li>
+                <li>Validate environment variables and secrets</li>
+            </ol>
+        </div>
+        """.format(pod=pod, namespace=namespace), unsafe_allow_html=True)
+
+    if "ImagePullBackOff" in pod_info:
+        st.markdown("""
+        <div class="remediation-step">
+            <h4>📦 ImagePullBackOff Remediation</h4>
+            <ol>
+                <li>Verify image name and tag</li>
+                <li>Check registry credentials: <code>oc get secrets</code></li>
+                <li>Test image pull manually: <code>podman pull [image]</code></li>
+                <li>Check network connectivity to registry</li>
+            </ol>
+        </div>
+        """, unsafe_allow_html=True)
+
+    if "Pending" in pod_info:
+        st.markdown("""
+        <div class="remediation-step">
+            <h4>📅 Pending Pod Remediation</h4>
+            <ol>
+                <li>Check node resources: <code>oc describe nodes</code></li>
+                <li>Verify PVC status: <code>oc get pvc -n {namespace}</code></li>
+                <li>Check node selectors and taints</li>
+                <li>Review resource requests vs available capacity</li>
+            </ol>
+        </div>
+        """.format(namespace=namespace), unsafe_allow_html=True)
+
+    # Always show general remediation
+    st.markdown("""
+    <div class="remediation-step">
+        <h4>🛠️ General Troubleshooting Steps</h4>
+        <ol>
+            <li>Get detailed pod information: <code>oc describe pod {pod} -n {namespace}</code></li>
+            <li>Check recent events: <code>oc get events -n {namespace} --sort-by='.lastTimestamp'</code></li>
+            <li>Review pod logs: <code>oc logs {pod} -n {namespace} -f</code></li>
+            <li>Check resource quotas: <code>oc get resourcequota -n {namespace}</code></li>
+            <li>Validate RBAC permissions: <code>oc auth can-i --list --as=system:serviceaccount:{namespace}:default</code></li>
+        </ol>
+    </div>
+    """.format(pod=pod, namespace=namespace), unsafe_allow_html=True)
+
+def analysis_steps(namespace: str, pod: str) -> pipeline.Steps:
+    """The enhanced analysis as pipeline steps: collection runs concurrently, the AI call once its inputs are ready"""
+    # The pod, its events and usage are fetched once and every view is derived from that bundle.
+    return {
+        "bundle": (lambda: EvidenceBundle.fetch(namespace, pod), ()),
+        "pod_info": (lambda bundle: bundle.describe(), ("bundle",)),
+        "resource_info": (lambda bundle: analyze_resource_consumption(namespace, pod, bundle), ("bundle",)),
+        "events": (lambda bundle: frames.classify(frames.events_frame(bundle.events), "message"), ("bundle",)),
+        "cluster_health": (lambda: get_cluster_health(namespace), ()),
+        # One timestamped log fetch serves the rates and, stripped, every step that reads the log
+        "log_rates": (lambda: get_log_window(namespace, pod), ()),
+        "logs": (lambda log_rates: log_rates["logs"], ("log_rates",)),
+        "anomalies": (detect_log_anomalies, ("logs",)),
+        "log_lines": (lambda logs: frames.classify(frames.logs_frame(logs, pod), "line"), ("logs",)),
+        # Without the bundle the analysis still runs on the logs, anomalies and cluster health
+        "ai_analysis": (lambda pod_info, resource_info, cluster_health, anomalies, logs, bundle: get_enhanced_ai_analysis(
+            f"Error: {pod_info}" if isinstance(pod_info, pipeline.StepFailed) else pod_info,
+            {"error": str(resource_info)} if isinstance(resource_info, pipeline.StepFailed) else resource_info,
+            cluster_health, anomalies, namespace, pod, logs, stream=True,
+            evidence=None if isinstance(bundle, pipeline.StepFailed) else llmcache.pod_evidence(
+                bundle.pod, bundle.events, anomalies)),
+                        ("pod_info?", "resource_info?", "cluster_health", "anomalies", "logs", "bundle?")),
+    }
+
+def run_enhanced_analysis(namespace: str, pod: str, follow_seconds: int = 0) -> Dict:
+    """Run the analysis pipeline into the result tabs, each tab rendering as soon as its data arrives.
+
+    Returns the step results, with the AI analysis as the text that was written.
+    """
+    status = st.empty()
+    status.info("🚀 Running enhanced analysis...")
+    
+    # Tabs are created up front and each one renders as soon as its data arrives
+    tabs = st.tabs(["🎯 AI Analysis", "📊 Resources", "🏥 Cluster Health", "⚠️ Anomalies", "📅 Timeline", "🔧 Remediation"])
+    renderers = {
+        "ai_analysis": (tabs[0], "🤖 Running AI analysis...",
+                        lambda result: render_ai_analysis_tab(result, namespace, pod)),
+        "resource_info": (tabs[1], "💾 Analyzing resource consumption...", render_resources_tab),
+        "cluster_health": (tabs[2], "🏥 Checking cluster health...", render_cluster_health_tab),
+        "anomalies": (tabs[3], "🔍 Detecting log anomalies...", render_anomalies_tab),
+        "log_lines": (tabs[3], "📈 Classifying log lines...", render_log_stats),
+        "log_rates": (tabs[3], "⏱️ Measuring log rates...", render_log_rates),
+        "events": (tabs[4], "📅 Loading events...", render_timeline_tab),
+        "pod_info": (tabs[5], "📊 Gathering pod information...",
+                     lambda result: render_remediation_tab(result, namespace, pod)),
+    }
+    placeholders = {}
+    for name, (tab, waiting, _) in renderers.items():
+        placeholders[name] = tab.empty()
+        placeholders[name].info(waiting)
+    
+    def render(name, result):
+        with placeholders[name].container():
+            if isinstance(result, pipeline.StepFailed):
+                st.error(str(result))
+                return result
+            return renderers[name][2](result)
+    
+    def render_result(name, result, elapsed):
+        # The AI answer streams for seconds: writing it here would stall every step still running
+        if name in renderers and name != "ai_analysis":
+            render(name, result)
+    
+    with st.spinner("Running enhanced analysis..."):
+        results = pipeline.run(analysis_steps(namespace, pod), on_result=render_result)
+    
+    # Every other tab is done, so the AI answer can stream into its tab on the script thread
+    results["ai_analysis"] = render("ai_analysis", results["ai_analysis"])
+    status.success("✅ Enhanced analysis complete!")
+    
+    if follow_seconds:
+        follow_log_anomalies(namespace, pod, follow_seconds, placeholders["anomalies"])
+    return results
+
+def render_namespace_triage(namespace: str):
+    """Triage every unhealthy pod of a namespace and render the ranked failure groups"""
+    st.header(f"🚑 Namespace Triage: {namespace}")
+    start = time.monotonic()
+    with st.spinner("Collecting evidence and analyzing failure groups..."):
+        try:
+            groups = triage.triage(namespace, analyze_failure_group)
+        except collector.CollectorError as e:
+            st.error(f"Triage failed: {e}")
+            return
+    
+    if not groups:
+        st.success("✅ No unhealthy pods in this namespace")
+        return
+    
+    pods = sum(len(group.pods) for group in groups)
+    st.info(f"{pods} unhealthy pod(s) in {len(groups)} failure group(s), analyzed in {time.monotonic() - start:.1f}s")
+    st.dataframe(triage.summary_frame(groups), hide_index=True, use_container_width=True)
+    
+    for rank, group in enumerate(groups, 1):
+        with st.expander(f"#{rank} {group.severity} · {group.describe()} ({len(group.pods)} pod(s))", expanded=rank == 1):
+            st.markdown(f"**Affected pods:** {', '.join(pod.name for pod in group.pods)}")
+            st.markdown(group.analysis or "")
 
 # Main Streamlit App
 def main():
@@ -443,17 +717,13 @@ def main():
         selected_cluster = st.selectbox("🌐 Select Cluster", clusters)
         
         # Get namespaces
-        cmd = "oc get namespaces --no-headers | awk '{print $1}' | head -20"
-        returncode, stdout, stderr = run_command(cmd)
-        namespaces = stdout.strip().split('\n') if returncode == 0 else ["default"]
+        namespaces = get_namespaces()
         
         selected_namespace = st.selectbox("📁 Select Namespace", namespaces)
         
         if selected_namespace:
             # Get pods
-            cmd = f"oc get pods -n {selected_namespace} --no-headers | awk '{{print $1}}'"
-            returncode, stdout, stderr = run_command(cmd)
-            pods = stdout.strip().split('\n') if returncode == 0 and stdout.strip() else []
+            pods = get_pods_in_namespace(selected_namespace)
             
             if pods:
                 selected_pod = st.selectbox("🔍 Select Pod", pods)
@@ -462,216 +732,21 @@ def main():
                 selected_pod = None
         else:
             selected_pod = None
+        
+        follow_seconds = st.slider("📡 Follow logs after analysis (seconds, 0 = off)", 0, 600, 0, step=30,
+                                   help="Keep the Anomalies tab updating live from the log stream")
+        
+        triage_namespace = bool(selected_namespace) and st.button(
+            "🚑 Triage Namespace", help="Analyze every unhealthy pod in the namespace, one AI call per distinct failure")
+    
+    if triage_namespace:
+        render_namespace_triage(selected_namespace)
+        return
     
     # Main analysis section
     if selected_pod and selected_namespace:
         if st.button("🚀 Run Enhanced Analysis", type="primary"):
-            with st.spinner("Running enhanced analysis..."):
-                
-                # Step 1: Basic pod analysis
-                st.info("📊 Gathering pod information...")
-                cmd = f"oc describe pod {selected_pod} -n {selected_namespace}"
-                returncode, stdout, stderr = run_command(cmd)
-                pod_info = stdout if returncode == 0 else f"Error: {stderr}"
-                
-                # Step 2: Resource analysis
-                st.info("💾 Analyzing resource consumption...")
-                resource_info = analyze_resource_consumption(selected_namespace, selected_pod)
-                
-                # Step 3: Cluster health
-                st.info("🏥 Checking cluster health...")
-                cluster_health = get_cluster_health(selected_namespace)
-                
-                # Step 4: Get logs for anomaly detection
-                st.info("🔍 Detecting log anomalies...")
-                cmd = f"oc logs {selected_pod} -n {selected_namespace} --tail=100 2>/dev/null || echo 'No logs available'"
-                returncode, logs, stderr = run_command(cmd)
-                anomalies = detect_log_anomalies(logs)
-                
-                # Step 5: AI Analysis
-                st.info("🤖 Running AI analysis...")
-                ai_analysis = get_enhanced_ai_analysis(pod_info, resource_info, cluster_health, anomalies, selected_namespace, selected_pod)
-            
-            st.success("✅ Enhanced analysis complete!")
-            
-            # Display results in tabs
-            tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🎯 AI Analysis", "📊 Resources", "🏥 Cluster Health", "⚠️ Anomalies", "📅 Timeline", "🔧 Remediation"])
-            
-            with tab1:
-                st.markdown(f"""
-                <div class="severity-info">
-                    <h3>🧠 Enhanced AI Analysis</h3>
-                    <p><strong>Pod:</strong> {selected_namespace}/{selected_pod}</p>
-                    <p><strong>Analysis Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                st.markdown(ai_analysis)
-            
-            with tab2:
-                st.header("📊 Resource Analysis")
-                
-                if "error" not in resource_info:
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-value">{resource_info['containers']}</div>
-                            <div class="metric-label">Containers</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col2:
-                        cpu_current = resource_info.get('current', {}).get('cpu', 'N/A')
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-value">{cpu_current}</div>
-                            <div class="metric-label">CPU Usage</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col3:
-                        memory_current = resource_info.get('current', {}).get('memory', 'N/A')
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-value">{memory_current}</div>
-                            <div class="metric-label">Memory Usage</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    st.markdown(f"""
-                    <div class="resource-metrics">
-                        <h4>Resource Requests & Limits</h4>
-                        <p><strong>CPU Request:</strong> {resource_info['requests']['cpu']}</p>
-                        <p><strong>CPU Limit:</strong> {resource_info['limits']['cpu']}</p>
-                        <p><strong>Memory Request:</strong> {resource_info['requests']['memory']}</p>
-                        <p><strong>Memory Limit:</strong> {resource_info['limits']['memory']}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.error(resource_info["error"])
-            
-            with tab3:
-                st.header("🏥 Cluster Health")
-                
-                if "error" not in cluster_health:
-                    col1, col2, col3, col4 = st.columns(4)
-                    
-                    with col1:
-                        st.metric("Total Nodes", cluster_health.get('total_nodes', 'N/A'))
-                    with col2:
-                        st.metric("Ready Nodes", cluster_health.get('ready_nodes', 'N/A'))
-                    with col3:
-                        st.metric("Total Pods", cluster_health.get('total_pods', 'N/A'))
-                    with col4:
-                        st.metric("Running Pods", cluster_health.get('running_pods', 'N/A'))
-                    
-                    st.markdown(f"""
-                    <div class="cluster-health">
-                        <h4>Recent Events</h4>
-                        <pre>{cluster_health.get('recent_events', 'No events')}</pre>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.error(cluster_health["error"])
-            
-            with tab4:
-                st.header("⚠️ Anomaly Detection")
-                
-                if anomalies:
-                    for anomaly in anomalies:
-                        severity_class = f"severity-{anomaly['severity'].lower()}"
-                        icon = SEVERITY_LEVELS[anomaly['severity']]['icon']
-                        
-                        st.markdown(f"""
-                        <div class="{severity_class}">
-                            <h4>{icon} {anomaly['description']}</h4>
-                            <p><strong>Type:</strong> {anomaly['type']}</p>
-                            <p><strong>Count:</strong> {anomaly['count']}</p>
-                            <p><strong>Severity:</strong> {anomaly['severity']}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                else:
-                    st.info("🟢 No anomalies detected in the logs")
-            
-            with tab5:
-                st.header("📅 Event Timeline")
-                
-                # Get events
-                cmd = f"oc get events -n {selected_namespace} --field-selector involvedObject.name={selected_pod} --sort-by='.lastTimestamp'"
-                returncode, events, stderr = run_command(cmd)
-                
-                if returncode == 0 and events.strip():
-                    timeline = create_timeline_visualization(events)
-                    
-                    for item in timeline[-10:]:  # Show last 10 events
-                        st.markdown(f"""
-                        <div class="timeline-item">
-                            <strong>{item.get('time', 'N/A')}</strong> - {item.get('type', 'N/A')}
-                            <br><strong>Reason:</strong> {item.get('reason', 'N/A')}
-                            <br><strong>Message:</strong> {item.get('message', 'N/A')}
-                        </div>
-                        """, unsafe_allow_html=True)
-                else:
-                    st.info("No events found for this pod")
-            
-            with tab6:
-                st.header("🔧 Remediation Steps")
-                
-                # Extract common remediation patterns
-                if "CrashLoopBackOff" in pod_info:
-                    st.markdown("""
-                    <div class="remediation-step">
-                        <h4>🔄 CrashLoopBackOff Remediation</h4>
-                        <ol>
-                            <li>Check container logs: <code>oc logs {pod} -n {namespace} --previous</code></li>
-                            <li>Verify image and command configuration</li>
-                            <li>Check resource limits and requests</li>
-                            <li>Validate environment variables and secrets</li>
-                        </ol>
-                    </div>
-                    """.format(pod=selected_pod, namespace=selected_namespace), unsafe_allow_html=True)
-                
-                if "ImagePullBackOff" in pod_info:
-                    st.markdown("""
-                    <div class="remediation-step">
-                        <h4>📦 ImagePullBackOff Remediation</h4>
-                        <ol>
-                            <li>Verify image name and tag</li>
-                            <li>Check registry credentials: <code>oc get secrets</code></li>
-                            <li>Test image pull manually: <code>podman pull [image]</code></li>
-                            <li>Check network connectivity to registry</li>
-                        </ol>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                if "Pending" in pod_info:
-                    st.markdown("""
-                    <div class="remediation-step">
-                        <h4>📅 Pending Pod Remediation</h4>
-                        <ol>
-                            <li>Check node resources: <code>oc describe nodes</code></li>
-                            <li>Verify PVC status: <code>oc get pvc -n {namespace}</code></li>
-                            <li>Check node selectors and taints</li>
-                            <li>Review resource requests vs available capacity</li>
-                        </ol>
-                    </div>
-                    """.format(namespace=selected_namespace), unsafe_allow_html=True)
-                
-                # Always show general remediation
-                st.markdown("""
-                <div class="remediation-step">
-                    <h4>🛠️ General Troubleshooting Steps</h4>
-                    <ol>
-                        <li>Get detailed pod information: <code>oc describe pod {pod} -n {namespace}</code></li>
-                        <li>Check recent events: <code>oc get events -n {namespace} --sort-by='.lastTimestamp'</code></li>
-                        <li>Review pod logs: <code>oc logs {pod} -n {namespace} -f</code></li>
-                        <li>Check resource quotas: <code>oc get resourcequota -n {namespace}</code></li>
-                        <li>Validate RBAC permissions: <code>oc auth can-i --list --as=system:serviceaccount:{namespace}:default</code></li>
-                    </ol>
-                </div>
-                """.format(pod=selected_pod, namespace=selected_namespace), unsafe_allow_html=True)
+            run_enhanced_analysis(selected_namespace, selected_pod, follow_seconds)
 
 if __name__ == "__main__":
     main()
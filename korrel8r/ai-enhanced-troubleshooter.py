@@ -10,10 +10,11 @@ import subprocess
 import json
 import os
 import time
-import requests
 from datetime import datetime
 import pandas as pd
 
+from troubleshooter import collector, informer, llm, llmcache, templates
+
 # Configure Streamlit page
 st.set_page_config(
     page_title="🤖 AI-Enhanced Korrel8r Troubleshooter",
@@ -23,9 +24,10 @@ st.set_page_config(
 )
 
 # Groq Configuration
-GROQ_API_KEY = "YOUR_GROQ_API_KEY_HERE"
-GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "YOUR_GROQ_API_KEY_HERE")
+GROQ_ENDPOINT = os.environ.get("GROQ_ENDPOINT", "https://api.groq.com/openai/v1/chat/completions")
 GROQ_MODEL = "llama-3.3-70b-versatile"
+PROMPT_VERSION = "v1-1"  # Bump when prompts change so cached analyses are not reused
 
 # Custom CSS with OpenShift color scheme for better readability
 st.markdown("""
@@ -148,14 +150,12 @@ def run_command(cmd, timeout=30):
     except Exception as e:
         return -1, "", str(e)
 
-def call_groq_api(prompt, max_tokens=1000):
-    """Call Groq API for AI analysis"""
+def call_groq_api(prompt, max_tokens=1000, stream=False, evidence=None):
+    """Call Groq API for AI analysis, returning text chunks as they arrive if stream is set.
+
+    Answers are cached by evidence (the prompt itself if not given).
+    """
     try:
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "model": GROQ_MODEL,
             "messages": [
@@ -172,14 +172,14 @@ def call_groq_api(prompt, max_tokens=1000):
             "temperature": 0.3
         }
         
-        response = requests.post(GROQ_ENDPOINT, json=payload, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result['choices'][0]['message']['content']
-        else:
-            return f"API Error: {response.status_code} - {response.text}"
+        answer = llmcache.cached_completion(GROQ_ENDPOINT, GROQ_API_KEY, payload,
+                                            prompt if evidence is None else evidence, PROMPT_VERSION, stream)
+        if isinstance(answer, str):
+            return answer
+        return llm.safe_stream(answer, "Error calling Groq API")
             
+    except llm.LLMError as e:
+        return f"API Error: {e}"
     except Exception as e:
         return f"Error calling Groq API: {str(e)}"
 
@@ -213,6 +213,7 @@ def switch_cluster(cluster_name):
         # Try to use the cluster context
         returncode, stdout, stderr = run_command(f"oc config use-context {cluster_name}")
         if returncode == 0:
+            collector.set_backend(None)  # Reconnect using the new context
             return True, f"Switched to cluster: {cluster_name}"
         else:
             return False, f"Failed to switch cluster: {stderr}"
@@ -247,27 +248,24 @@ def get_cluster_info(cluster_name):
 
 def get_namespaces():
     """Get list of namespaces"""
-    returncode, stdout, stderr = run_command("oc get namespaces -o jsonpath='{.items[*].metadata.name}'")
-    if returncode == 0:
-        namespaces = stdout.strip().split()
-        return sorted(namespaces)
-    return ["openshift-monitoring", "ai-troubleshooter", "korrel8r", "test-problematic-pods"]
+    try:
+        return informer.get_namespaces()
+    except collector.CollectorError:
+        return ["openshift-monitoring", "ai-troubleshooter", "korrel8r", "test-problematic-pods"]
 
 def get_pods_in_namespace(namespace):
     """Get pods in a specific namespace"""
-    cmd = f"oc get pods -n {namespace} -o jsonpath='{{.items[*].metadata.name}}'"
-    returncode, stdout, stderr = run_command(cmd)
-    if returncode == 0 and stdout.strip():
-        return sorted(stdout.strip().split())
-    return []
+    try:
+        return informer.get_pods_in_namespace(namespace)
+    except collector.CollectorError:
+        return []
 
 def get_pod_status(namespace, pod_name):
     """Get basic pod status"""
-    cmd = f"oc get pod {pod_name} -n {namespace} -o jsonpath='{{.status.phase}}'"
-    returncode, stdout, stderr = run_command(cmd)
-    if returncode == 0:
-        return stdout.strip()
-    return "Unknown"
+    try:
+        return informer.get_pod_status(namespace, pod_name)
+    except collector.CollectorError:
+        return "Unknown"
 
 def run_troubleshooter_analysis(namespace, pod_name):
     """Run the AI troubleshooter analysis"""
@@ -283,12 +281,13 @@ def run_troubleshooter_analysis(namespace, pod_name):
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
 
-def get_ai_analysis(troubleshooter_output, namespace, pod_name):
+def get_ai_analysis(troubleshooter_output, namespace, pod_name, stream=False):
     """Get AI-powered analysis of the troubleshooting results"""
     prompt = f"""
-    Analyze this Kubernetes pod troubleshooting output for pod '{pod_name}' in namespace '{namespace}':
+    Analyze this Kubernetes pod troubleshooting output for pod '{pod_name}' in namespace '{namespace}'
+    (runs of similar lines are collapsed to one "[count × similar]" line, <*> marks varying values):
 
-    {troubleshooter_output}
+    {templates.compact_text(troubleshooter_output)}
 
     Provide a comprehensive analysis with:
     1. **Root Cause Analysis**: What is the primary issue?
@@ -300,7 +299,8 @@ def get_ai_analysis(troubleshooter_output, namespace, pod_name):
     Format your response with clear sections and actionable recommendations.
     """
     
-    return call_groq_api(prompt, max_tokens=1500)
+    return call_groq_api(prompt, max_tokens=1500, stream=stream,
+                         evidence=[namespace, pod_name, troubleshooter_output])
 
 def parse_analysis_output(output):
     """Parse the troubleshooter output into structured sections"""
@@ -475,11 +475,11 @@ def main():
             status_text.text("🤖 Analyzing with Groq AI...")
             progress_bar.progress(80)
             
-            # Get AI analysis
-            ai_analysis = get_ai_analysis(result["output"], selected_namespace, selected_pod)
+            # Start the AI analysis; it renders below as it streams in
+            ai_analysis = get_ai_analysis(result["output"], selected_namespace, selected_pod, stream=True)
             progress_bar.progress(100)
             
-            status_text.text("✅ AI analysis complete!")
+            status_text.text("✅ AI analysis started!")
             time.sleep(0.5)
             progress_bar.empty()
             status_text.empty()
@@ -502,7 +502,10 @@ def main():
             </div>
             """, unsafe_allow_html=True)
             
-            st.markdown(ai_analysis)
+            if isinstance(ai_analysis, str):
+                st.markdown(ai_analysis)
+            else:
+                ai_analysis = st.write_stream(ai_analysis)
             
             st.markdown("---")
             
@@ -584,7 +587,7 @@ def main():
         # Enhanced stats
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("🏗️ Namespaces", len(get_namespaces()))
+            st.metric("🏗️ Namespaces", len(namespaces))
         with col2:
             st.metric("🤖 AI Model", "LLaMA-3.1-70B")
         with col3:
@@ -4,13 +4,21 @@ AI-Powered Korrel8r Troubleshooter
 Combines Korrel8r's correlation engine with AI analysis for intelligent pod troubleshooting
 """
 
-import requests
 import json
-import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 import urllib3
 
+from troubleshooter import (categorize, collector, graphindex, korrel8r, korrel8rcache, llm, llmcache, planner,
+                           templates, triage)
+from troubleshooter.evidence import EvidenceBundle
+
+GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama-3.1-70b-versatile"
+PROMPT_VERSION = "cli-1"  # Bump when the prompt changes so cached analyses are not reused
+
 # Disable SSL warnings for self-signed certs
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -18,73 +26,100 @@ class AIKorrel8rTroubleshooter:
     def __init__(self, korrel8r_url, groq_api_key=None):
         self.korrel8r_url = korrel8r_url
         self.groq_api_key = groq_api_key
-        self.session = requests.Session()
-        self.session.verify = False  # For self-signed certs
+        self.korrel8r = korrel8r.Korrel8rClient(korrel8r_url, verify=False,  # For self-signed certs
+                                                cache=korrel8rcache.get_cache())
         
-    def get_pod_info(self, namespace, pod_name):
-        """Get detailed pod information using oc describe"""
+    def get_pod_info(self, namespace, pod_name, bundle=None):
+        """Get detailed pod information equivalent to oc describe"""
         try:
-            cmd = ["oc", "describe", "pod", pod_name, "-n", namespace]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            return result.stdout if result.returncode == 0 else f"Error: {result.stderr}"
+            return (bundle or EvidenceBundle.fetch(namespace, pod_name)).describe()
         except Exception as e:
             return f"Error getting pod info: {str(e)}"
     
-    def get_pod_logs(self, namespace, pod_name, container=None):
+    def get_pod_logs(self, namespace, pod_name, container=None, timeout=None):
         """Get pod logs"""
         try:
-            cmd = ["oc", "logs", f"{pod_name}", "-n", namespace]
-            if container:
-                cmd.extend(["-c", container])
-            cmd.extend(["--tail=50"])
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            return result.stdout if result.returncode == 0 else f"Error: {result.stderr}"
+            return collector.get_pod_logs(namespace, pod_name, container, tail=50, timeout=timeout)
+        except collector.CollectorError as e:
+            return f"Error: {e}"
         except Exception as e:
             return f"Error getting logs: {str(e)}"
     
-    def get_events(self, namespace, pod_name):
+    def get_events(self, namespace, pod_name, bundle=None):
         """Get events related to the pod"""
         try:
-            cmd = ["oc", "get", "events", "-n", namespace, "--field-selector", f"involvedObject.name={pod_name}", "--sort-by='.lastTimestamp'"]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            return result.stdout if result.returncode == 0 else f"Error: {result.stderr}"
+            if bundle is None:
+                events = collector.get_events(namespace, pod_name)
+                return collector.format_events(events) if events else ""
+            return bundle.events_table()
+        except collector.CollectorError as e:
+            return f"Error: {e}"
         except Exception as e:
             return f"Error getting events: {str(e)}"
     
     def get_node_info(self, node_name):
         """Get node information"""
         try:
-            cmd = ["oc", "describe", "node", node_name]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            return result.stdout if result.returncode == 0 else f"Error: {result.stderr}"
+            return collector.describe_node(node_name)
+        except collector.CollectorError as e:
+            return f"Error: {e}"
         except Exception as e:
             return f"Error getting node info: {str(e)}"
     
-    def korrel8r_query(self, query):
-        """Query Korrel8r API"""
+    def correlate_pod(self, namespace, pod_name, bundle=None, timeout=None):
+        """Korrel8r correlation of a pod, searching only the goals the rules plan for the failure its bundle shows.
+        
+        Without the pod (no bundle, or its fetch failed) the search covers the goals of every failure
+        category, so it can start before the pod is fetched; the whole neighbourhood is searched only
+        when the rules plan no goals at all.
+        """
+        version = None
+        if bundle is not None and bundle.pod:
+            goals = planner.get_planner().goals(self.categorize(bundle), namespace)
+            version = bundle.pod.get("metadata", {}).get("resourceVersion")
+        else:
+            goals = planner.get_planner().any_goals(namespace)
+        return self.korrel8r_query(korrel8r.pod_query(namespace, pod_name), goals=goals, version=version,
+                                   timeout=timeout)
+    
+    def categorize(self, bundle):
+        """Error category of the failure a bundle shows, as the namespace triage finds it"""
+        return categorize.categorize_error(bundle.failure_text())[0]
+    
+    def korrel8r_query(self, query, depth=korrel8r.DEPTH, follow_up_wait=5, version=None, goals=None, timeout=None):
+        """Graph of the objects of a query: paths to the goal classes from one POST /graphs/goals if given,
+        else the neighbourhood from one POST /graphs/neighbours.
+        
+        A partial (206) neighbourhood is kept and completed by narrower follow-up searches for up to
+        follow_up_wait seconds. version, the resourceVersion of the start object, keys the answer in the
+        korrel8r response cache. timeout, in seconds, replaces the client's own request timeout.
+        """
         try:
-            # Try different API endpoints
-            endpoints = [
-                f"{self.korrel8r_url}/api/v1alpha1/objects",
-                f"{self.korrel8r_url}/api/v1alpha1/neighbours"
-            ]
-            
-            for endpoint in endpoints:
-                try:
-                    params = {"query": query}
-                    response = self.session.get(endpoint, params=params, timeout=10)
-                    if response.status_code == 200:
-                        return response.json()
-                except:
-                    continue
-                    
-            return {"error": "Korrel8r API not accessible"}
-        except Exception as e:
-            return {"error": f"Korrel8r query failed: {str(e)}"}
+            start = korrel8r.Start([query], versions={query: version} if version else None)
+            if goals:
+                graph = self.korrel8r.goals(start, goals, korrel8r.GraphOptions(rules=True), timeout)
+                result = graph.to_json()
+                result["goals"] = goals
+                if graph.partial:
+                    result["partial"] = True
+                return result
+            progressive = self.korrel8r.neighbours_progressive(start, depth, korrel8r.GraphOptions(rules=True),
+                                                               timeout)
+        except korrel8r.Korrel8rError as e:
+            return {"error": f"Korrel8r query failed: {e}"}
+        graph = progressive.graph
+        if graph.partial:
+            print(f"⚠️ Korrel8r returned a partial graph ({', '.join(graph.summary()) or 'nothing yet'}), "
+                  "following up on missing signals...")
+            graph = progressive.wait(follow_up_wait)
+            progressive.cancel()
+        result = graph.to_json()
+        if graph.partial:
+            result["partial"] = True  # Tells the AI that more may be correlated than shown
+        return result
     
-    def ai_analyze(self, problem_data):
-        """Analyze the problem using AI (Groq)"""
+    def ai_analyze(self, problem_data, evidence=None):
+        """Analyze the problem using AI (Groq), cached by evidence or else by problem_data"""
         if not self.groq_api_key:
             return "AI analysis not available - no API key provided"
         
@@ -103,87 +138,189 @@ Problem Data:
 Provide a clear, actionable response focused on fixing the issue.
 """
             
-            headers = {
-                "Authorization": f"Bearer {self.groq_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "llama-3.1-70b-versatile",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.1,
-                "max_tokens": 1500
-            }
-            
-            response = requests.post(
-                "https://api.groq.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
-            else:
-                return f"AI analysis failed: {response.status_code}"
-                
+            payload = llm.chat_payload(GROQ_MODEL, [{"role": "user", "content": prompt}],
+                                       max_tokens=1500, temperature=0.1)
+            return llmcache.cached_completion(GROQ_ENDPOINT, self.groq_api_key, payload,
+                                              problem_data if evidence is None else evidence, PROMPT_VERSION)
+        except llm.LLMError as e:
+            return f"AI analysis failed: {e}"
         except Exception as e:
             return f"AI analysis error: {str(e)}"
     
-    def troubleshoot_pod(self, namespace, pod_name):
-        """Complete troubleshooting workflow"""
-        print(f"🔍 AI-Powered Korrel8r Troubleshooting: {namespace}/{pod_name}")
-        print("=" * 60)
+    def collect_evidence(self, namespace, pod_name, concurrent=True, max_workers=4, deadline=45):
+        """Fetch describe, events, logs and korrel8r correlation for a pod.
+
+        Describe text and events both come from a single EvidenceBundle fetch.
+        In concurrent mode the fetches run on a bounded thread pool and anything
+        not finished by the overall deadline is reported as an error instead of
+        holding up the analysis. The correlation starts with the other steps,
+        so it searches the goals of every failure category rather than waiting
+        for the pod. Log and korrel8r requests time out at the deadline, so a
+        step abandoned there does not keep its worker for long after.
+        Returns (evidence, per-step timings in seconds, names of the steps that
+        failed); a step that timed out has no timing.
+        """
+        steps = {
+            "bundle": ("📋 Steps 1-2: Gathering Pod Information and Events...",
+                       lambda: EvidenceBundle.fetch(namespace, pod_name)),
+            "logs": ("📋 Step 3: Retrieving Logs...", lambda: self.get_pod_logs(namespace, pod_name, timeout=deadline)),
+            "correlation": ("📋 Step 4: Korrel8r Correlation Analysis...",
+                            lambda: self.correlate_pod(namespace, pod_name, timeout=deadline)),
+        }
         
-        # 1. Gather basic pod information
-        print("\n📋 Step 1: Gathering Pod Information...")
-        pod_info = self.get_pod_info(namespace, pod_name)
+        def timed(fetch):
+            """(result or error text, seconds, whether the step failed)"""
+            start = time.monotonic()
+            try:
+                result = fetch()
+            except Exception as e:
+                return f"Error: {str(e)}", time.monotonic() - start, True
+            return result, time.monotonic() - start, self._failed(result)
         
-        # 2. Get events
-        print("\n📋 Step 2: Checking Events...")
-        events = self.get_events(namespace, pod_name)
+        evidence, timings, failed = {}, {}, set()
+        if not concurrent:
+            for name, (message, fetch) in steps.items():
+                print(f"\n{message}")
+                evidence[name], timings[name], step_failed = timed(fetch)
+                if step_failed:
+                    failed.add(name)
+            return self._unbundle(self._correlation_dict(evidence)), timings, failed
         
-        # 3. Try to get logs
-        print("\n📋 Step 3: Retrieving Logs...")
-        logs = self.get_pod_logs(namespace, pod_name)
+        print("\n📋 Steps 1-4: Gathering pod information, events, logs and correlation in parallel...")
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {executor.submit(timed, fetch): name for name, (_, fetch) in steps.items()}
+        done, not_done = wait(futures, timeout=deadline)
+        for future in done:
+            name = futures[future]
+            evidence[name], timings[name], step_failed = future.result()
+            if step_failed:
+                failed.add(name)
+        for future in not_done:
+            name = futures[future]
+            evidence[name] = f"Error: {name} did not finish within {deadline}s"
+            timings[name] = None
+        executor.shutdown(wait=False, cancel_futures=True)  # Steps not started yet never start
+        return self._unbundle(self._correlation_dict(evidence)), timings, failed
+    
+    def _failed(self, result):
+        """Whether a step gave an error in place of evidence: the helpers return errors rather than raise"""
+        if isinstance(result, EvidenceBundle):
+            return bool(result.error)
+        if isinstance(result, dict):
+            return "error" in result
+        return isinstance(result, str) and result.startswith("Error")
+    
+    def _correlation_dict(self, evidence):
+        """Wrap a correlation error text in the dict shape of a correlation result"""
+        if not isinstance(evidence["correlation"], dict):
+            evidence["correlation"] = {"error": evidence["correlation"]}
+        return evidence
+    
+    def _unbundle(self, evidence):
+        """Add the describe text and events derived from the fetched bundle"""
+        bundle = evidence["bundle"]
+        if isinstance(bundle, EvidenceBundle):
+            evidence["pod_info"] = self.get_pod_info(bundle.namespace, bundle.pod_name, bundle)
+            evidence["events"] = self.get_events(bundle.namespace, bundle.pod_name, bundle)
+        else:
+            evidence["pod_info"] = evidence["events"] = bundle
+        return evidence
+    
+    def troubleshoot_pod(self, namespace, pod_name, concurrent=True, max_workers=4, deadline=45):
+        """Complete troubleshooting workflow"""
+        print(f"🔍 AI-Powered Korrel8r Troubleshooting: {namespace}/{pod_name}")
+        print("=" * 60)
         
-        # 4. Korrel8r correlation
-        print("\n📋 Step 4: Korrel8r Correlation Analysis...")
-        korrel8r_query = f"k8s:Pod.v1:{{namespace: {namespace}, name: {pod_name}}}"
-        correlation_data = self.korrel8r_query(korrel8r_query)
+        # 1-4. Gather pod information, events, logs and Korrel8r correlation
+        start = time.monotonic()
+        evidence, timings, failed = self.collect_evidence(namespace, pod_name, concurrent, max_workers, deadline)
+        timings["collection"] = time.monotonic() - start
+        pod_info = evidence["pod_info"]
+        events = evidence["events"]
+        logs = evidence["logs"]
+        correlation_data = evidence["correlation"]
         
-        # 5. Compile data for AI analysis
+        # 5. Compile data for AI analysis, with the correlation reduced to what the pod leads to
+        # The search covered every failure category; the signals planned for this one are what to read first
+        bundle = evidence["bundle"]
+        correlation_view = correlation_data
+        if correlation_data.get("nodes"):
+            index = graphindex.GraphIndex.from_json(correlation_data)
+            correlation_view = {"partial": index.partial or bool(correlation_data.get("partial")),
+                                "searched": correlation_data.get("goals", "neighbourhood"),
+                                "related": index.digest(korrel8r.POD_CLASS)}
+            if isinstance(bundle, EvidenceBundle) and bundle.pod:
+                correlation_view["focus"] = planner.get_planner().goals(self.categorize(bundle), namespace)
         problem_data = f"""
 POD INFORMATION:
 {pod_info}
 
 EVENTS:
-{events}
+{templates.compact_text(events)}
 
-LOGS:
-{logs}
+LOG TEMPLATES (count × line pattern, <*> marks varying values):
+{templates.summarize_logs(logs)}
 
 KORREL8R CORRELATION:
-{json.dumps(correlation_data, indent=2)}
+{json.dumps(correlation_view, indent=2)}
 """
         
         # 6. AI Analysis
         print("\n🤖 Step 5: AI Analysis...")
-        ai_analysis = self.ai_analyze(problem_data)
+        start = time.monotonic()
+        cache_evidence = None  # The pod itself when there is one, so a changed spec is a new analysis
+        if isinstance(bundle, EvidenceBundle):
+            cache_evidence = {"pod": llmcache.pod_evidence(bundle.pod, bundle.events, []), "logs": logs,
+                              "correlation": correlation_view}
+        ai_analysis = self.ai_analyze(problem_data, cache_evidence)
+        timings["ai_analysis"] = time.monotonic() - start
         
         # 7. Generate report
         print("\n" + "=" * 60)
         print("🎯 TROUBLESHOOTING REPORT")
         print("=" * 60)
         print(ai_analysis)
+        print("\n⏱️ Step timings: " + ", ".join(
+            f"{step}=timed out" if t is None else f"{step}=failed after {t:.2f}s" if step in failed
+            else f"{step}={t:.2f}s" for step, t in timings.items()))
         
         return {
             "pod_info": pod_info,
             "events": events,
             "logs": logs,
             "correlation": correlation_data,
-            "ai_analysis": ai_analysis
+            "ai_analysis": ai_analysis,
+            "timings": {step: round(t, 3) if t is not None else None for step, t in timings.items()},
+            "failed_steps": sorted(failed)
         }
+    
+    def ai_analyze_group(self, group):
+        """Analyze a failure group of a namespace triage with one AI call"""
+        if not self.groq_api_key:
+            return "AI analysis not available - no API key provided"
+        payload = llm.chat_payload(GROQ_MODEL, [{"role": "user", "content": group.build_prompt()}],
+                                   max_tokens=1000, temperature=0.1)
+        return llmcache.cached_completion(GROQ_ENDPOINT, self.groq_api_key, payload, group.evidence(),
+                                          PROMPT_VERSION + "-triage")
+    
+    def triage_namespace(self, namespace, workers=triage.WORKERS):
+        """Analyze every unhealthy pod of a namespace, one AI call per distinct failure"""
+        print(f"🚑 AI-Powered Namespace Triage: {namespace}")
+        print("=" * 60)
+        start = time.monotonic()
+        groups = triage.triage(namespace, self.ai_analyze_group, workers, korrel8r_client=self.korrel8r)
+        pods = sum(len(group.pods) for group in groups)
+        print(f"\n{pods} unhealthy pod(s) in {len(groups)} failure group(s), "
+              f"{time.monotonic() - start:.1f}s\n")
+        if not groups:
+            return groups
+        print(triage.summary_frame(groups).drop(columns=["analysis"]).to_string(index=False))
+        for rank, group in enumerate(groups, 1):
+            print("\n" + "=" * 60)
+            print(f"#{rank} {group.severity} {group.describe()} ({len(group.pods)} pod(s))")
+            print("=" * 60)
+            print(group.analysis)
+        return groups
 
 def main():
     # Configuration
@@ -204,6 +341,11 @@ def main():
     # Initialize troubleshooter
     troubleshooter = AIKorrel8rTroubleshooter(KORREL8R_URL, GROQ_API_KEY)
     
+    # Triage a whole namespace: --triage <namespace>
+    if len(sys.argv) >= 3 and sys.argv[1] == "--triage":
+        troubleshooter.triage_namespace(sys.argv[2])
+        return
+    
     # Example: Troubleshoot the pending Prometheus pod
     if len(sys.argv) >= 3:
         namespace = sys.argv[1]
@@ -13,6 +13,8 @@ import time
 from datetime import datetime
 import pandas as pd
 
+from troubleshooter import collector, informer
+
 # Configure Streamlit page
 st.set_page_config(
     page_title="🔍 AI Korrel8r Troubleshooter",
@@ -77,27 +79,24 @@ def run_command(cmd, timeout=30):
 
 def get_namespaces():
     """Get list of namespaces"""
-    returncode, stdout, stderr = run_command("oc get namespaces -o jsonpath='{.items[*].metadata.name}'")
-    if returncode == 0:
-        namespaces = stdout.strip().split()
-        return sorted(namespaces)
-    return ["openshift-monitoring", "openshift-ai-analyzer", "korrel8r", "openshift-logging"]
+    try:
+        return informer.get_namespaces()
+    except collector.CollectorError:
+        return ["openshift-monitoring", "openshift-ai-analyzer", "korrel8r", "openshift-logging"]
 
 def get_pods_in_namespace(namespace):
     """Get pods in a specific namespace"""
-    cmd = f"oc get pods -n {namespace} -o jsonpath='{{.items[*].metadata.name}}'"
-    returncode, stdout, stderr = run_command(cmd)
-    if returncode == 0 and stdout.strip():
-        return sorted(stdout.strip().split())
-    return []
+    try:
+        return informer.get_pods_in_namespace(namespace)
+    except collector.CollectorError:
+        return []
 
 def get_pod_status(namespace, pod_name):
     """Get basic pod status"""
-    cmd = f"oc get pod {pod_name} -n {namespace} -o jsonpath='{{.status.phase}}'"
-    returncode, stdout, stderr = run_command(cmd)
-    if returncode == 0:
-        return stdout.strip()
-    return "Unknown"
+    try:
+        return informer.get_pod_status(namespace, pod_name)
+    except collector.CollectorError:
+        return "Unknown"
 
 def run_troubleshooter_analysis(namespace, pod_name):
     """Run the AI troubleshooter analysis"""
@@ -312,7 +311,7 @@ def main():
         # Quick stats
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("🏗️ Available Namespaces", len(get_namespaces()))
+            st.metric("🏗️ Available Namespaces", len(namespaces))
         with col2:
             st.metric("🔗 Korrel8r Status", "✅ Connected")
         with col3:
@@ -0,0 +1,45 @@
+#!/bin/bash
+
+# Deploy an AI Troubleshooter GUI with the scripts and troubleshooter package of this tree
+# Usage: ./deploy-ai-troubleshooter.sh [v1|v2]
+
+set -e
+
+cd "$(dirname "$0")"
+
+case "${1:-v2}" in
+  v1)
+    NAMESPACE="ai-troubleshooter"
+    MANIFEST="ai-troubleshooter-deployment.yaml"
+    DEPLOYMENT="ai-troubleshooter-gui"
+    APP_CONFIGMAP="ai-troubleshooter-app"
+    APP="ai-troubleshooter-gui.py=ai-enhanced-troubleshooter.py"
+    ;;
+  v2)
+    NAMESPACE="ai-troubleshooter-v2"
+    MANIFEST="ai-enhanced-troubleshooter-v2-deployment.yaml"
+    DEPLOYMENT="ai-troubleshooter-gui-v2"
+    APP_CONFIGMAP="ai-troubleshooter-app-v2"
+    APP="ai-enhanced-troubleshooter-v2.py"
+    ;;
+  *)
+    echo "Usage: $0 [v1|v2]"
+    exit 1
+    ;;
+esac
+
+# Create or update a ConfigMap from files
+apply_configmap() {
+  oc create configmap "$1" -n "${NAMESPACE}" "${@:2}" --dry-run=client -o yaml | oc apply -f -
+}
+
+echo "🚀 Deploying ${DEPLOYMENT} to ${NAMESPACE}"
+oc apply -f "${MANIFEST}"
+
+# The script, and the troubleshooter package it imports (mounted on the PYTHONPATH of the pod)
+apply_configmap "${APP_CONFIGMAP}" --from-file="${APP}"
+apply_configmap troubleshooter-package --from-file=troubleshooter/
+
+# Pick up changed code in a running deployment
+oc rollout restart deployment/"${DEPLOYMENT}" -n "${NAMESPACE}"
+oc rollout status deployment/"${DEPLOYMENT}" -n "${NAMESPACE}"
@@ -0,0 +1,6 @@
+"""
+Shared helpers for the AI troubleshooter scripts.
+
+The Streamlit UIs and the CLI troubleshooter import from this package so that
+cluster access, analysis and AI calls are implemented once.
+"""
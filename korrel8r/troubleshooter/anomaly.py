@@ -0,0 +1,323 @@
+"""
+Single-pass log anomaly scanner
+===============================
+detect_log_anomalies() used to run one case-insensitive re.findall() per
+pattern over the whole log and build full match lists just to take their
+length, so cost grew with every pattern added. LogScanner lowercases the log
+once and finds candidate lines with plain substring search on literal keywords
+derived from the patterns (shared keywords are searched only once). Only
+candidate lines are matched, and only against the patterns whose keywords they
+contain. No match lists are kept.
+
+Patterns must match within a single line (no newlines), which makes counting
+per candidate line identical to counting over the whole text. Patterns without
+a usable literal (e.g. a bare character class) are matched over the full text.
+
+The same property lets AnomalyCounter keep running counts over a followed log:
+batches() groups a blocking line stream into small batches, and each batch is
+counted and dropped, so memory stays bounded however long the pod is watched.
+"""
+
+import queue
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+MIN_KEYWORD = 2  # Shorter literals match almost every line and make poor prefilters
+
+# Same shape as the original inline table in detect_log_anomalies(), extended
+# with common Kubernetes failure signatures.
+ANOMALY_PATTERNS = {
+    "excessive_restarts": {
+        "pattern": r"restart.*(\d+)",
+        "threshold": 5,
+        "description": "Excessive container restarts detected"
+    },
+    "repeated_errors": {
+        "pattern": r"(error|failed|exception)",
+        "threshold": 10,
+        "description": "High frequency of errors in logs"
+    },
+    "timeout_issues": {
+        "pattern": r"timeout|timed out",
+        "threshold": 3,
+        "description": "Multiple timeout issues detected"
+    },
+    "network_retries": {
+        "pattern": r"retry|retrying",
+        "threshold": 5,
+        "description": "Excessive network retries detected"
+    },
+    "oom_killed": {
+        "pattern": r"OOMKilled|out of memory|oom-kill",
+        "threshold": 1,
+        "description": "Container killed for running out of memory"
+    },
+    "probe_failures": {
+        "pattern": r"(liveness|readiness|startup) probe failed",
+        "threshold": 3,
+        "description": "Repeated health probe failures detected"
+    },
+    "tls_errors": {
+        "pattern": r"x509:|tls: |certificate (has expired|signed by unknown authority|is not valid)",
+        "threshold": 1,
+        "description": "TLS or certificate errors detected"
+    },
+    "connection_refused": {
+        "pattern": r"connection refused",
+        "threshold": 3,
+        "description": "Repeated refused connections detected"
+    },
+    "dns_failures": {
+        "pattern": r"no such host|could not resolve|NXDOMAIN",
+        "threshold": 3,
+        "description": "DNS resolution failures detected"
+    },
+    "crashes": {
+        "pattern": r"panic:|segmentation fault|SIGSEGV|core dumped",
+        "threshold": 1,
+        "description": "Process crash detected"
+    },
+    "disk_full": {
+        "pattern": r"no space left on device",
+        "threshold": 1,
+        "description": "Disk full errors detected"
+    },
+    "permission_denied": {
+        "pattern": r"permission denied|forbidden",
+        "threshold": 3,
+        "description": "Repeated permission errors detected"
+    },
+}
+
+
+class LogScanner:
+    """Counts matches of many anomaly patterns in one pass over a log"""
+
+    def __init__(self, patterns: Optional[Dict[str, Dict]] = None, flags: int = 0):
+        self.flags = flags | re.IGNORECASE  # Matching runs on lowered text, so it is always case-insensitive
+        self.patterns: Dict[str, Dict] = {}
+        self._compiled: Dict[str, re.Pattern] = {}
+        self._keywords: Dict[str, List[str]] = {}  # keyword -> patterns it can start a match for
+        self._unanchored: List[str] = []
+        for name, config in (ANOMALY_PATTERNS if patterns is None else patterns).items():
+            self.register(name, **config)
+
+    def register(self, name: str, pattern: str, threshold: int, description: str,
+                 keywords: Optional[List[str]] = None) -> None:
+        """Add or replace a pattern.
+
+        keywords are literals of which every match contains at least one; they
+        are derived from the pattern when not given.
+        """
+        self.patterns[name] = {"pattern": pattern, "threshold": threshold, "description": description}
+        self._compiled[name] = re.compile(pattern, self.flags)
+        if keywords is not None:
+            self.patterns[name]["keywords"] = keywords
+        self._index()
+
+    def _index(self) -> None:
+        self._keywords, self._unanchored = {}, []
+        for name, config in self.patterns.items():
+            keywords = config.get("keywords") or required_literals(config["pattern"])
+            if not keywords:
+                self._unanchored.append(name)
+                continue
+            for keyword in {k.lower() for k in keywords}:
+                self._keywords.setdefault(keyword, []).append(name)
+
+    def count(self, text: str, counts: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """Count matches of every pattern in text, adding to counts if given"""
+        counts = counts if counts is not None else dict.fromkeys(self.patterns, 0)
+        if not self.patterns or not text:
+            return counts
+        # Matching the lowered text keeps offsets consistent with the keyword search.
+        text = text.lower()
+        compiled = self._compiled
+        for name in self._unanchored:
+            counts[name] = counts.get(name, 0) + _count(compiled[name], text, 0, len(text))
+        for name, lines in self._candidates(text).items():
+            # Matches never span lines, so the candidate lines can be matched as one text
+            candidates = "\n".join(text[start:end] for start, end in sorted(lines.items()))
+            counts[name] = counts.get(name, 0) + len(compiled[name].findall(candidates))
+        return counts
+
+    def _candidates(self, text: str) -> Dict[str, Dict[int, int]]:
+        """Pattern name -> {start: end} of each line containing one of its keywords"""
+        lines: Dict[str, Dict[int, int]] = {}
+        find, rfind, size = text.find, text.rfind, len(text)
+        for keyword, names in self._keywords.items():
+            found: Dict[int, int] = {}
+            pos = find(keyword)
+            while pos >= 0:
+                start = rfind("\n", 0, pos) + 1
+                end = find("\n", pos)
+                if end < 0:
+                    end = size
+                found[start] = end
+                pos = find(keyword, end)
+            for name in names:
+                lines.setdefault(name, {}).update(found)
+        return lines
+
+    def anomalies(self, counts: Dict[str, int]) -> List[Dict]:
+        """Turn match counts into anomaly records for the patterns over their threshold"""
+        anomalies = []
+        for name, config in self.patterns.items():
+            count = counts.get(name, 0)
+            if count >= config["threshold"]:
+                anomalies.append({
+                    "type": name,
+                    "count": count,
+                    "description": config["description"],
+                    "severity": "WARNING" if count < config["threshold"] * 2 else "CRITICAL"
+                })
+        return anomalies
+
+    def scan(self, text: str) -> List[Dict]:
+        """Detect anomalies in a log"""
+        return self.anomalies(self.count(text))
+
+
+def _count(pattern: re.Pattern, text: str, start: int, end: int) -> int:
+    n = 0
+    for _ in pattern.finditer(text, start, end):
+        n += 1
+    return n
+
+
+def required_literals(pattern: str) -> Optional[List[str]]:
+    """Lowercase literals of which every match of pattern contains one, None if there are none"""
+    try:
+        return _literals(sre_parse.parse(pattern))
+    except (re.error, TypeError, ValueError):
+        return None
+
+
+def _literals(items) -> Optional[List[str]]:
+    # Candidates are alternative sets: a run of consecutive literals, or the
+    # union over the branches of a group. Keep the set whose shortest literal
+    # is longest, since that filters best.
+    candidates, run = [], ""
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run += chr(av)
+            continue
+        if run:
+            candidates.append([run])
+            run = ""
+        if op is sre_parse.SUBPATTERN:
+            literals = _literals(av[-1])
+            if literals:
+                candidates.append(literals)
+        elif op is sre_parse.BRANCH:
+            branches = [_literals(branch) for branch in av[1]]
+            if all(branches):
+                candidates.append([literal for branch in branches for literal in branch])
+    if run:
+        candidates.append([run])
+    candidates = [c for c in candidates if min(len(literal) for literal in c) >= MIN_KEYWORD]
+    if not candidates:
+        return None
+    return sorted({literal.lower() for literal in max(candidates, key=lambda c: min(map(len, c)))})
+
+
+default_scanner = LogScanner()
+
+
+class AnomalyCounter:
+    """Running anomaly counts over a log stream, keeping only the most recent lines"""
+
+    def __init__(self, scanner: Optional[LogScanner] = None, keep_lines: int = 200):
+        self.scanner = scanner or default_scanner
+        self.counts = dict.fromkeys(self.scanner.patterns, 0)
+        self.lines = 0
+        self.recent = deque(maxlen=keep_lines)
+
+    def feed(self, lines: List[str]) -> None:
+        """Count a batch of lines"""
+        if not lines:
+            return
+        self.scanner.count("\n".join(lines), self.counts)
+        self.lines += len(lines)
+        self.recent.extend(lines)
+
+    def anomalies(self) -> List[Dict]:
+        """Anomalies over everything fed so far"""
+        return self.scanner.anomalies(self.counts)
+
+
+_END = object()
+
+
+def batches(lines: Iterable[str], max_lines: int = 500, max_wait: float = 1.0,
+            buffer: int = 10000) -> Iterator[List[str]]:
+    """Group a blocking line stream into lists of at most max_lines.
+
+    A batch is yielded at least every max_wait seconds, empty if nothing
+    arrived, so consumers can refresh or stop while the stream is quiet. Lines
+    are read by a daemon thread into a queue of at most buffer lines; a slow
+    consumer holds the reader back instead of growing memory. Errors raised by
+    the stream are re-raised here after the lines read before them. Closing
+    the batches closes lines too (if it has close(), like collector.LineStream),
+    so a reader blocked on a quiet stream does not hold its connection open.
+    """
+    pending: queue.Queue = queue.Queue(maxsize=buffer)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                pending.put(item, timeout=max_wait)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read() -> None:
+        try:
+            for line in lines:
+                if not put(line):
+                    return
+            put(_END)
+        except Exception as e:
+            put(e)
+
+    threading.Thread(target=read, name="log-batches", daemon=True).start()
+    try:
+        while True:
+            batch: List[str] = []
+            deadline = time.monotonic() + max_wait
+            while len(batch) < max_lines:
+                try:
+                    item = pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _END or isinstance(item, Exception):
+                    if batch:
+                        yield batch
+                    if isinstance(item, Exception):
+                        raise item
+                    return
+                batch.append(item)
+            yield batch
+    finally:
+        stopped.set()
+        close = getattr(lines, "close", None)
+        if close:
+            try:
+                close()
+            except ValueError:
+                pass  # A plain generator still running in the reader thread cannot be closed from here
+
+
+def detect_log_anomalies(logs: str) -> List[Dict]:
+    """Detect anomalies in logs with the default pattern set"""
+    return default_scanner.scan(logs)
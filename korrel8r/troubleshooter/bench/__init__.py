@@ -0,0 +1,39 @@
+"""
+Offline benchmarks for the AI troubleshooters.
+
+Everything here runs without a cluster, korrel8r or an LLM provider: fixtures
+are built from the scenarios in test-problematic-pods.yaml and served by local
+stand-in servers (fakes.py). e2e.py times the troubleshooters end to end;
+micro.py times the hot pure functions on synthetic inputs and compares runs
+with a saved baseline.
+"""
+
+from typing import Dict, List, Sequence
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """q-th percentile (0-100) of samples, interpolating between closest ranks"""
+    ordered = sorted(samples)
+    if not ordered:
+        return float("nan")
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(samples: Dict[str, List[float]]) -> List[Dict]:
+    """n, p50, p95 and max per stage, in the order the stages were first recorded"""
+    return [{"stage": stage, "n": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95),
+             "max": max(values) if values else float("nan")}
+            for stage, values in samples.items()]
+
+
+def format_table(rows: List[Dict], unit: str = "ms", scale: float = 1000) -> str:
+    """Stage timings as an aligned text table"""
+    width = max([len("stage")] + [len(row["stage"]) for row in rows])
+    lines = [f"{'stage':<{width}}  {'n':>4}  {'p50 ' + unit:>10}  {'p95 ' + unit:>10}  {'max ' + unit:>10}"]
+    for row in rows:
+        lines.append(f"{row['stage']:<{width}}  {row['n']:>4}  {row['p50'] * scale:>10.1f}  "
+                     f"{row['p95'] * scale:>10.1f}  {row['max'] * scale:>10.1f}")
+    return "\n".join(lines)
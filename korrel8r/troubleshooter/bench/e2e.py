@@ -0,0 +1,205 @@
+"""
+End-to-end latency of the troubleshooters, offline
+==================================================
+Starts FakeKubeAPI, FakeKorrel8r and FakeLLM on localhost, points the
+collector and the three scripts at them, and times every stage of an analysis
+for each scenario pod: the v2 Streamlit analysis functions one by one and as
+the pipeline the UI runs (rendering and the AI stream included), the v1 AI
+call, and troubleshoot_pod() of the CLI.
+AI stages run with an empty response cache except v2.ai_cached, which times
+a repeat, and the CLI with an empty korrel8r cache. Nothing leaves the machine, so the suite runs in CI.
+
+Prints n, p50, p95 and max per stage; --json also writes them to a file.
+
+Usage:
+    python -m troubleshooter.bench.e2e --iterations 10 --llm-first-token 0.3
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from troubleshooter import bench
+from troubleshooter.bench import fakes, fixtures
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+API_KEY = "bench"
+
+
+class Recorder:
+    """Seconds per stage, in the order stages were first seen"""
+
+    def __init__(self):
+        self.samples: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def time(self, stage: str, func: Callable, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.add(stage, time.perf_counter() - start)
+        return result
+
+
+def quiet_streamlit() -> None:
+    """Silence the warnings Streamlit logs for every call while scripts run bare, outside `streamlit run`"""
+    import streamlit
+    import streamlit.logger
+
+    streamlit.config.get_option("logger.level")  # Parsing the config later would reset the level
+    streamlit.logger.set_log_level("error")
+
+
+def load_script(filename: str, name: str):
+    """Import one of the hyphen-named troubleshooter scripts as a module"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _answer(text: Any) -> str:
+    """The AI answer, failing the run if it is an error message rather than the fake analysis"""
+    if not isinstance(text, str) or not text.startswith("**Root cause:**"):
+        raise RuntimeError(f"AI stage failed: {str(text)[:200]}")
+    return text
+
+
+def bench_v2(v2, rec: Recorder, namespace: str, pod: str) -> None:
+    """The Streamlit v2 analysis functions one by one, then as the UI pipeline"""
+    from troubleshooter import frames, llmcache, pipeline
+    from troubleshooter.evidence import EvidenceBundle
+
+    cache = llmcache.get_cache()
+    bundle = rec.time("v2.bundle", EvidenceBundle.fetch, namespace, pod)
+    pod_info = rec.time("v2.describe", bundle.describe)
+    resources = rec.time("v2.resources", v2.analyze_resource_consumption, namespace, pod, bundle)
+    rec.time("v2.events", lambda: frames.classify(frames.events_frame(bundle.events), "message"))
+    health = rec.time("v2.cluster_health", v2.get_cluster_health, namespace)
+    logs = rec.time("v2.log_rates", v2.get_log_window, namespace, pod)["logs"]
+    anomalies = rec.time("v2.anomalies", v2.detect_log_anomalies, logs)
+    rec.time("v2.log_lines", lambda: frames.classify(frames.logs_frame(logs, pod), "line"))
+    evidence = llmcache.pod_evidence(bundle.pod, bundle.events, anomalies)
+    analysis_args = (pod_info, resources, health, anomalies, namespace, pod, logs)
+
+    cache.clear()
+    _answer(rec.time("v2.ai_analysis", v2.get_enhanced_ai_analysis, *analysis_args, evidence=evidence))
+    cache.clear()
+    start = time.perf_counter()
+    chunks = v2.get_enhanced_ai_analysis(*analysis_args, stream=True, evidence=evidence)
+    if isinstance(chunks, str):
+        _answer(chunks)
+    first = next(chunks)
+    rec.add("v2.ai_first_token", time.perf_counter() - start)
+    _answer(first + "".join(chunks))
+    rec.add("v2.ai_stream", time.perf_counter() - start)
+    _answer(rec.time("v2.ai_cached", v2.get_enhanced_ai_analysis, *analysis_args, evidence=evidence))
+
+    # The analysis main() runs, rendering included: a render that holds up the pipeline shows up here
+    cache.clear()
+    results = rec.time("v2.pipeline", v2.run_enhanced_analysis, namespace, pod)
+    failed = {name: str(result) for name, result in results.items()
+              if isinstance(result, pipeline.StepFailed)}
+    if failed:
+        raise RuntimeError(f"pipeline steps failed: {failed}")
+    _answer(results["ai_analysis"])
+
+
+def bench_v1(v1, rec: Recorder, namespace: str, pod: str) -> None:
+    """The v1 AI call on troubleshooting output of the size the script prints"""
+    from troubleshooter import llmcache
+    from troubleshooter.evidence import EvidenceBundle
+
+    bundle = EvidenceBundle.fetch(namespace, pod)
+    output = bundle.describe() + "\n" + bundle.events_table()
+    llmcache.get_cache().clear()
+    _answer(rec.time("v1.ai_analysis", v1.get_ai_analysis, output, namespace, pod))
+
+
+def bench_cli(cli, korrel8r_url: str, rec: Recorder, namespace: str, pod: str) -> None:
+    """troubleshoot_pod() of the CLI, with its own per-step timings"""
+    from troubleshooter import korrel8rcache, llmcache
+
+    llmcache.get_cache().clear()
+    korrel8rcache.get_cache().clear()
+    troubleshooter = cli.AIKorrel8rTroubleshooter(korrel8r_url, API_KEY)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = rec.time("cli.troubleshoot_pod", troubleshooter.troubleshoot_pod, namespace, pod)
+    _answer(result["ai_analysis"])
+    for step, seconds in result["timings"].items():
+        if seconds is not None and step not in result["failed_steps"]:
+            rec.add(f"cli.{step}", seconds)
+
+
+def run(iterations: int = 5, warmup: int = 1, scenarios: Optional[List[str]] = None, log_lines: int = 200,
+        api_latency: float = 0.002, korrel8r_latency: float = 0.02, llm_first_token: float = 0.2,
+        llm_token_delay: float = 0.002, llm_tokens: int = 200) -> List[Dict]:
+    """Run the suite against fresh fakes and return the per-stage summary"""
+    os.environ["TROUBLESHOOTER_INFORMERS"] = "0"  # Watches would only add noise
+    cache_dir = tempfile.mkdtemp(prefix="troubleshooter-bench-")
+    os.environ["TROUBLESHOOTER_CACHE_DIR"] = cache_dir
+
+    from troubleshooter import collector
+
+    quiet_streamlit()
+    records = fixtures.load(log_lines=log_lines)
+    names = scenarios or list(records)
+    unknown = set(names) - set(records)
+    if unknown:
+        raise ValueError(f"Unknown scenarios {sorted(unknown)}, choose from {sorted(records)}")
+    with fakes.FakeKubeAPI(records, api_latency) as api, \
+            fakes.FakeKorrel8r(records, korrel8r_latency) as korrel8r, \
+            fakes.FakeLLM(llm_first_token, llm_token_delay, llm_tokens) as llm:
+        collector.set_backend(collector.APIBackend(api.url))
+        v2 = load_script("ai-enhanced-troubleshooter-v2.py", "troubleshooter_v2")
+        v1 = load_script("ai-enhanced-troubleshooter.py", "troubleshooter_v1")
+        cli = load_script("ai-korrel8r-troubleshooter.py", "troubleshooter_cli")
+        for module in (v1, v2, cli):
+            module.GROQ_ENDPOINT = llm.endpoint
+        v1.GROQ_API_KEY = v2.GROQ_API_KEY = API_KEY
+
+        rec = Recorder()
+        for iteration in range(warmup + iterations):
+            current = rec if iteration >= warmup else Recorder()
+            for name in names:
+                namespace = records[name]["pod"]["metadata"]["namespace"]
+                bench_v2(v2, current, namespace, name)
+                bench_v1(v1, current, namespace, name)
+                bench_cli(cli, korrel8r.url, current, namespace, name)
+    return bench.summarize(rec.samples)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time the troubleshooters end to end against local fakes")
+    parser.add_argument("--iterations", type=int, default=5, help="measured runs per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured runs per scenario first")
+    parser.add_argument("--scenario", action="append", dest="scenarios", help="pod name, repeatable (default all)")
+    parser.add_argument("--log-lines", type=int, default=200, help="log lines per pod that has logs")
+    parser.add_argument("--api-latency", type=float, default=0.002, help="seconds per Kubernetes API request")
+    parser.add_argument("--korrel8r-latency", type=float, default=0.02, help="seconds per korrel8r request")
+    parser.add_argument("--llm-first-token", type=float, default=0.2, help="seconds to the first LLM token")
+    parser.add_argument("--llm-token-delay", type=float, default=0.002, help="seconds between LLM tokens")
+    parser.add_argument("--llm-tokens", type=int, default=200, help="tokens per LLM answer")
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    rows = run(args.iterations, args.warmup, args.scenarios, args.log_lines, args.api_latency,
+               args.korrel8r_latency, args.llm_first_token, args.llm_token_delay, args.llm_tokens)
+    print(bench.format_table(rows))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""
+Local stand-ins for the Kubernetes API, korrel8r and an LLM provider
+====================================================================
+Each fake is a threaded HTTP/1.1 server on 127.0.0.1 with an optional
+per-request latency, serving fixtures.load() records:
+
+- FakeKubeAPI: the API paths collector.APIBackend reads (namespaces, pods,
+  pod logs with tailLines/timestamps/sinceTime, events, nodes, pod metrics).
+- FakeKorrel8r: GET /api/v1alpha1/objects and /domains, and POST
+  /api/v1alpha1/graphs/neighbours, /graphs/goals and /lists/goals returning
+  the neighbours of the start pods (events, logs, alerts, node and metrics),
+  honouring the rules and zeros options; with partial=True a neighbours
+  search answers 206 with only the first classes, as korrel8r does when a
+  store timed out, while goals searches still complete.
+- FakeLLM: an OpenAI-compatible /chat/completions with a time to first token,
+  a delay per token and optional failure statuses, streamed as SSE on request.
+
+    with FakeKubeAPI(fixtures.load()) as api:
+        collector.set_backend(collector.APIBackend(api.url))
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from troubleshooter.bench import fixtures
+
+KORREL8R_API = "/api/v1alpha1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so pooled clients reuse connections
+
+    def log_message(self, format, *args):
+        pass
+
+    def _query(self) -> Tuple[str, Dict[str, str]]:
+        url = urlsplit(self.path)
+        return url.path, {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def send(self, status: int, body, content_type: str = "application/json") -> None:
+        data = body if isinstance(body, bytes) else (
+            body.encode() if isinstance(body, str) else json.dumps(body).encode())
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.hit()
+        self.server.get(self)
+
+    def do_POST(self):
+        self.server.hit()
+        self.server.post(self)
+
+
+class FakeServer(ThreadingHTTPServer):
+    """Threaded local server with a fixed latency per request"""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self) -> "FakeServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True, name=type(self).__name__)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def hit(self) -> None:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get(self, handler: _Handler) -> None:
+        handler.send(404, {"error": "not found"})
+
+    def post(self, handler: _Handler) -> None:
+        handler.send(404, {"error": "not found"})
+
+
+class FakeKubeAPI(FakeServer):
+    """Kubernetes API server replaying scenario records"""
+
+    _POD = re.compile(r"^/api/v1/namespaces/([^/]+)/pods/([^/]+)(/log)?$")
+    _METRICS = re.compile(r"^/apis/metrics\.k8s\.io/v1beta1/namespaces/([^/]+)/pods/([^/]+)$")
+    _LIST = re.compile(r"^/api/v1/namespaces/([^/]+)/(pods|events)$")
+
+    def __init__(self, records: Dict[str, Dict], latency: float = 0.0):
+        super().__init__(latency)
+        self.records = records
+
+    def _find(self, namespace: str, name: str) -> Optional[Dict]:
+        record = self.records.get(name)
+        return record if record and record["pod"]["metadata"]["namespace"] == namespace else None
+
+    def get(self, handler: _Handler) -> None:
+        path, query = handler._query()
+        if path == "/api/v1/namespaces":
+            names = sorted({r["pod"]["metadata"]["namespace"] for r in self.records.values()} | {"default"})
+            return handler.send(200, {"items": [{"metadata": {"name": n}} for n in names]})
+        if path == "/api/v1/nodes":
+            return handler.send(200, {"items": fixtures.nodes()})
+        if path == "/api/v1/pods":
+            return handler.send(200, {"metadata": {"resourceVersion": "1000"},
+                                      "items": [r["pod"] for r in self.records.values()]})
+        match = self._LIST.match(path)
+        if match:
+            namespace, kind = match.groups()
+            records = [r for r in self.records.values() if r["pod"]["metadata"]["namespace"] == namespace]
+            if kind == "pods":
+                selector = dict(term.split("=", 1) for term in query.get("labelSelector", "").split(",") if "=" in term)
+                items = [r["pod"] for r in records
+                         if all(r["pod"]["metadata"].get("labels", {}).get(k) == v for k, v in selector.items())]
+            else:
+                involved = query.get("fieldSelector", "").partition("involvedObject.name=")[2]
+                items = [e for r in records for e in r["events"]
+                         if not involved or e["involvedObject"]["name"] == involved]
+            return handler.send(200, {"metadata": {"resourceVersion": "1000"}, "items": items})
+        match = self._POD.match(path)
+        if match:
+            namespace, name, log = match.groups()
+            record = self._find(namespace, name)
+            if record is None:
+                return handler.send(404, {"kind": "Status", "message": f'pods "{name}" not found'})
+            if not log:
+                return handler.send(200, record["pod"])
+            if not record["logs"]:
+                return handler.send(400, {"kind": "Status", "message": f'container in pod "{name}" is waiting to '
+                                                                      "start: ContainerCreating"})
+            lines = record["logs"]
+            if "sinceTime" in query:
+                lines = [line for line in lines if line[:19] >= query["sinceTime"][:19]]
+            if "tailLines" in query:
+                lines = lines[-int(query["tailLines"]):] if int(query["tailLines"]) else []
+            if query.get("timestamps") != "true":
+                lines = [line.partition(" ")[2] for line in lines]
+            return handler.send(200, "".join(line + "\n" for line in lines), "text/plain")
+        match = self._METRICS.match(path)
+        if match:
+            record = self._find(*match.groups())
+            if record and record["usage"]:
+                return handler.send(200, record["usage"])
+            return handler.send(404, {"kind": "Status", "message": "podmetrics not found"})
+        handler.send(404, {"kind": "Status", "message": f"no fake for {path}"})
+
+
+# Neighbours of a pod: (goal class, rule, count of the record it comes from)
+_POD_NEIGHBOURS = [
+    ("k8s:Event.v1", "AllToEvent", lambda r: len(r["events"])),
+    ("log:application", "PodToLogs", lambda r: len(r["logs"])),
+    ("alert:alert", "PodToAlert", lambda r: int(r["pod"]["status"].get("phase") != "Running"
+                                                or any("waiting" in s.get("state", {})
+                                                       for s in r["pod"]["status"].get("containerStatuses", [])))),
+    ("k8s:Node.v1", "PodToNode", lambda r: int(bool(r["pod"]["spec"].get("nodeName")))),
+    ("metric:metric", "AllToMetric", lambda r: int(bool(r["usage"]))),
+]
+PARTIAL_CLASSES = 2  # Neighbour classes in a partial answer
+_SELECTOR_FIELD = re.compile(r'"?(namespace|name)"?\s*:\s*"?([\w.-]+)"?')
+
+
+class FakeKorrel8r(FakeServer):
+    """korrel8r REST API over the same scenario records"""
+
+    def __init__(self, records: Dict[str, Dict], latency: float = 0.0, partial: bool = False):
+        super().__init__(latency)
+        self.records = records
+        self.partial = partial
+
+    def _start_records(self, queries: List[str]) -> List[Tuple[str, Dict]]:
+        found = []
+        for query in queries:
+            fields = dict(_SELECTOR_FIELD.findall(query.partition("{")[2]))
+            record = self.records.get(fields.get("name", ""))
+            if record and record["pod"]["metadata"]["namespace"] == fields.get("namespace"):
+                found.append((query, record))
+        return found
+
+    def graph(self, queries: List[str], goals: Optional[List[str]], rules: bool, zeros: bool) -> Dict:
+        nodes: Dict[str, Dict] = {}
+        edges: Dict[Tuple[str, str], Dict] = {}
+        for query, record in self._start_records(queries):
+            meta = record["pod"]["metadata"]
+            start = nodes.setdefault("k8s:Pod.v1", {"class": "k8s:Pod.v1", "count": 0, "queries": []})
+            start["count"] += 1
+            start["queries"].append({"query": query, "count": 1})
+            selector = json.dumps({"namespace": meta["namespace"], "name": meta["name"]}, separators=(",", ":"))
+            for goal, rule, count in _POD_NEIGHBOURS:
+                if goals is not None and goal not in goals:
+                    continue
+                n = count(record)
+                if not n and not zeros:
+                    continue
+                goal_query = {"query": f"{goal}:{selector}", "count": n}
+                node = nodes.setdefault(goal, {"class": goal, "count": 0, "queries": []})
+                node["count"] += n
+                node["queries"].append(goal_query)
+                edge = edges.setdefault(("k8s:Pod.v1", goal), {"start": "k8s:Pod.v1", "goal": goal, "rules": []})
+                if rules:
+                    named = next((r for r in edge["rules"] if r["name"] == rule), None)
+                    if named is None:
+                        edge["rules"].append({"name": rule, "queries": [goal_query]})
+                    else:
+                        named["queries"].append(goal_query)
+        for edge in edges.values():
+            if not edge["rules"]:
+                del edge["rules"]
+        return {"nodes": list(nodes.values()), "edges": list(edges.values())}
+
+    def get(self, handler: _Handler) -> None:
+        path, query = handler._query()
+        if path == KORREL8R_API + "/domains":
+            return handler.send(200, [{"name": name} for name in ("alert", "k8s", "log", "metric", "netflow",
+                                                                   "trace", "incident")])
+        if path == KORREL8R_API + "/objects":
+            found = self._start_records([query.get("query", "")])
+            return handler.send(200, [record["pod"] for _, record in found])
+        handler.send(404, {"error": f"no fake for {path}"})
+
+    def post(self, handler: _Handler) -> None:
+        path, query = handler._query()
+        body = handler._body()
+        start = body.get("start", {})
+        if path == KORREL8R_API + "/graphs/neighbours":
+            goals = None
+        elif path in (KORREL8R_API + "/graphs/goals", KORREL8R_API + "/lists/goals"):
+            goals = body.get("goals") or []
+        else:
+            return handler.send(404, {"error": f"no fake for {path}"})
+        queries = list(start.get("queries") or [])
+        for obj in start.get("objects") or []:
+            meta = obj.get("metadata", {})
+            queries.append(f'k8s:Pod.v1:{{"namespace":"{meta.get("namespace")}","name":"{meta.get("name")}"}}')
+        graph = self.graph(queries, goals, query.get("rules") == "true", query.get("zeros") == "true")
+        if path.startswith(KORREL8R_API + "/lists/"):
+            return handler.send(200, [node for node in graph["nodes"] if node["class"] in goals])
+        if self.partial and goals is None:
+            # Interrupted traversal: only the classes found before the limit was hit
+            kept = {"k8s:Pod.v1"} | {goal for goal, _, _ in _POD_NEIGHBOURS[:PARTIAL_CLASSES]}
+            graph = {"nodes": [n for n in graph["nodes"] if n["class"] in kept],
+                     "edges": [e for e in graph["edges"] if e["goal"] in kept]}
+            return handler.send(206, graph)
+        handler.send(200, graph)
+
+
+_ANSWER = ("**Root cause:** the container exits with code 1 because it cannot reach its database. "
+           "**Remediation:** check the service endpoint and credentials, then restart the pod. ").split()
+
+
+class FakeLLM(FakeServer):
+    """OpenAI-compatible chat completions endpoint with configurable latency"""
+
+    def __init__(self, first_token: float = 0.2, token_delay: float = 0.005, tokens: int = 200,
+                 failures: Optional[List[int]] = None):
+        super().__init__(0.0)
+        self.first_token = first_token
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.failures = list(failures or [])  # Statuses answered before the next success
+
+    @property
+    def endpoint(self) -> str:
+        return self.url + "/openai/v1/chat/completions"
+
+    def answer(self) -> List[str]:
+        return [(" " if i else "") + _ANSWER[i % len(_ANSWER)] for i in range(self.tokens)]
+
+    def post(self, handler: _Handler) -> None:
+        path, _ = handler._query()
+        body = handler._body()
+        if not path.endswith("/chat/completions"):
+            return handler.send(404, {"error": {"message": f"no fake for {path}"}})
+        with self._lock:
+            failure = self.failures.pop(0) if self.failures else None
+        if failure:
+            return handler.send(failure, {"error": {"message": f"fake failure {failure}"}})
+        time.sleep(self.first_token)
+        if not body.get("stream"):
+            time.sleep(self.token_delay * self.tokens)
+            return handler.send(200, {"choices": [{"index": 0, "finish_reason": "stop",
+                                                   "message": {"role": "assistant",
+                                                               "content": "".join(self.answer())}}]})
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def chunk(data: str) -> None:
+            payload = data.encode()
+            handler.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+            handler.wfile.flush()
+
+        for i, token in enumerate(self.answer()):
+            if i:
+                time.sleep(self.token_delay)
+            chunk("data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": token}}]}) + "\n\n")
+        chunk("data: [DONE]\n\n")
+        handler.wfile.write(b"0\r\n\r\n")
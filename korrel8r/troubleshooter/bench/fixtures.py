@@ -0,0 +1,152 @@
+"""
+Pod fixtures for the offline benchmarks
+=======================================
+Pods come from the scenarios in test-problematic-pods.yaml. Each scenario is
+given the status, events, logs and usage a cluster reports for that failure,
+as recorded from the test namespace, so the stand-in API server can replay a
+CrashLoopBackOff, an unschedulable pod, an image pull failure, a failing init
+container, a missing volume and a running pod with warnings.
+
+log_lines pads each log with repeated application lines, to benchmark larger
+logs with the same failure pattern.
+"""
+
+import copy
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import yaml
+
+SCENARIOS_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "test-problematic-pods.yaml")
+NODES = 3
+_ECHO = re.compile(r'echo "(?:\$\(date\): )?([^"]*)"')
+
+
+def _time(now: datetime, seconds_ago: int) -> str:
+    return (now - timedelta(seconds=seconds_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _waiting(name: str, image: str, reason: str, message: str = "", restarts: int = 0,
+             terminated: Optional[Dict] = None) -> Dict:
+    status = {"name": name, "image": image, "ready": False, "restartCount": restarts,
+              "state": {"waiting": {"reason": reason, "message": message}}}
+    if terminated:
+        status["lastState"] = {"terminated": terminated}
+    return status
+
+
+def _event(pod: Dict, now: datetime, type_: str, reason: str, message: str, count: int = 1,
+           seconds_ago: int = 30) -> Dict:
+    meta = pod["metadata"]
+    return {"metadata": {"name": f"{meta['name']}.{reason.lower()}", "namespace": meta["namespace"]},
+            "involvedObject": {"kind": "Pod", "name": meta["name"], "namespace": meta["namespace"]},
+            "type": type_, "reason": reason, "message": message, "count": count,
+            "firstTimestamp": _time(now, seconds_ago * count), "lastTimestamp": _time(now, seconds_ago)}
+
+
+def _echoed(container: Dict) -> List[str]:
+    """Lines a container script echoes"""
+    script = " ".join(container.get("command", []) + container.get("args", []))
+    return _ECHO.findall(script)
+
+
+def _record(pod: Dict, now: datetime) -> Dict:
+    """Status, events, logs and usage for one scenario pod"""
+    problem = pod["metadata"].get("labels", {}).get("problem-type", "")
+    spec = pod["spec"]
+    main = spec["containers"][0]
+    status: Dict = {"phase": "Pending", "startTime": _time(now, 3600),
+                    "conditions": [{"type": "PodScheduled", "status": "True"}]}
+    events = [_event(pod, now, "Normal", "Scheduled", f"Successfully assigned {pod['metadata']['namespace']}/"
+                     f"{pod['metadata']['name']} to worker-0", seconds_ago=3600)]
+    logs = _echoed(main)
+    usage: Optional[Dict] = None
+    if problem == "crashloop":
+        status.update(phase="Running", hostIP="10.0.0.10", podIP="10.128.0.12")
+        status["containerStatuses"] = [_waiting(
+            main["name"], main["image"], "CrashLoopBackOff", "back-off 5m0s restarting failed container",
+            restarts=14, terminated={"exitCode": 1, "reason": "Error", "finishedAt": _time(now, 60)})]
+        events += [_event(pod, now, "Normal", "Pulled", f'Container image "{main["image"]}" already present',
+                          count=14),
+                   _event(pod, now, "Warning", "BackOff", "Back-off restarting failed container "
+                          f"{main['name']} in pod {pod['metadata']['name']}", count=60, seconds_ago=10)]
+        logs.append("Application crashed with exit code 1")
+    elif problem == "pending":
+        status["conditions"] = [{"type": "PodScheduled", "status": "False", "reason": "Unschedulable",
+                                 "message": f"0/{NODES} nodes are available: {NODES} Insufficient cpu, "
+                                            f"{NODES} Insufficient memory."}]
+        events = [_event(pod, now, "Warning", "FailedScheduling", f"0/{NODES} nodes are available: {NODES} "
+                         f"Insufficient cpu, {NODES} Insufficient memory. preemption: 0/{NODES} nodes are "
+                         "available: 3 No preemption victims found for incoming pod.", count=25)]
+        logs = []
+    elif problem == "imagepull":
+        status["containerStatuses"] = [_waiting(
+            main["name"], main["image"], "ImagePullBackOff", f'Back-off pulling image "{main["image"]}"')]
+        events += [_event(pod, now, "Normal", "Pulling", f'Pulling image "{main["image"]}"', count=8),
+                   _event(pod, now, "Warning", "Failed", f'Failed to pull image "{main["image"]}": rpc error: '
+                          "code = Unknown desc = reading manifest v999 in docker.io/nonexistent/invalid-image: "
+                          "requested access to the resource is denied", count=8),
+                   _event(pod, now, "Warning", "Failed", "Error: ImagePullBackOff", count=120, seconds_ago=5)]
+        logs = []
+    elif problem == "init-failure":
+        init = spec["initContainers"][0]
+        status["initContainerStatuses"] = [_waiting(
+            init["name"], init["image"], "CrashLoopBackOff", "back-off 5m0s restarting failed container",
+            restarts=9, terminated={"exitCode": 1, "reason": "Error", "finishedAt": _time(now, 90)})]
+        status["containerStatuses"] = [_waiting(main["name"], main["image"], "PodInitializing")]
+        events += [_event(pod, now, "Warning", "BackOff", "Back-off restarting failed container "
+                          f"{init['name']} in pod {pod['metadata']['name']}", count=40, seconds_ago=15)]
+        logs = _echoed(init)
+    elif problem == "volume-mount":
+        status["containerStatuses"] = [_waiting(main["name"], main["image"], "ContainerCreating")]
+        events += [_event(pod, now, "Warning", "FailedMount", 'MountVolume.SetUp failed for volume '
+                          '"config-volume" : configmap "nonexistent-configmap" not found', count=30)]
+        logs = []
+    else:
+        status.update(phase="Running", hostIP="10.0.0.11", podIP="10.128.0.20",
+                      conditions=[{"type": "Ready", "status": "True"}, {"type": "PodScheduled", "status": "True"}])
+        status["containerStatuses"] = [{"name": main["name"], "image": main["image"], "ready": True,
+                                        "restartCount": 0, "state": {"running": {"startedAt": _time(now, 3600)}}}]
+        events += [_event(pod, now, "Normal", "Started", f"Started container {main['name']}", seconds_ago=3600)]
+        usage = {"containers": [{"name": main["name"], "usage": {"cpu": "48123456n", "memory": "58000Ki"}}]}
+    if status["phase"] == "Running" and usage is None:
+        usage = {"containers": [{"name": main["name"], "usage": {"cpu": "1000000n", "memory": "2048Ki"}}]}
+    pod = copy.deepcopy(pod)
+    pod["metadata"].update(uid=f"uid-{pod['metadata']['name']}", resourceVersion="1000",
+                           creationTimestamp=_time(now, 3600))
+    if problem != "pending":
+        pod["spec"].setdefault("nodeName", "worker-0")
+    pod["status"] = status
+    return {"pod": pod, "events": events, "logs": logs, "usage": usage}
+
+
+def load(path: str = SCENARIOS_FILE, log_lines: int = 0, now: Optional[datetime] = None) -> Dict[str, Dict]:
+    """Scenario records by pod name: pod object, events, log lines (timestamped) and metrics"""
+    now = now or datetime.now(timezone.utc)
+    with open(path) as f:
+        documents = [doc for doc in yaml.safe_load_all(f) if doc]
+    records = {}
+    for doc in documents:
+        if doc.get("kind") != "Pod":
+            continue
+        record = _record(doc, now)
+        lines = record["logs"]
+        if lines and log_lines > len(lines):
+            filler = ["Application running with warnings...", "GET /healthz 200 1ms",
+                      "retrying connection to redis://redis.example.com:6379 in 5s"]
+            lines += [filler[i % len(filler)] for i in range(log_lines - len(lines))]
+        start = now - timedelta(seconds=len(lines))
+        record["logs"] = [f"{(start + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')} {line}"
+                          for i, line in enumerate(lines)]
+        records[doc["metadata"]["name"]] = record
+    return records
+
+
+def nodes() -> List[Dict]:
+    """Ready worker nodes"""
+    return [{"metadata": {"name": f"worker-{i}", "labels": {"node-role.kubernetes.io/worker": ""}},
+             "status": {"conditions": [{"type": "Ready", "status": "True"}],
+                        "allocatable": {"cpu": "4", "memory": "16Gi"}}}
+            for i in range(NODES)]
@@ -0,0 +1,360 @@
+"""
+Microbenchmarks of the hot pure functions
+=========================================
+categorize_error, detect_log_anomalies, create_timeline_visualization and
+parse_analysis_output run on every analysis, on inputs that grow with the
+pod: a few lines for a healthy pod, millions for a chatty one, and
+troubleshooter output of several MB. Each is timed over synthetic inputs of
+increasing size, the way the UI scripts call them (they are loaded from the
+scripts, not from the troubleshooter package).
+
+Every benchmark takes --count samples; a sample repeats the call until it
+has run for --min-time, so small inputs are not lost in timer noise. The
+report gives time per call (median and spread), throughput in input lines or
+bytes per second, and the peak Python heap of one call as tracemalloc sees
+it (Arrow buffers are allocated outside it).
+
+Like `benchstat` on the Go side, results can be saved and compared: --save
+writes the samples to a file, --compare reads one back and prints the change
+per benchmark, with "~" where a Mann-Whitney U test finds no significant
+difference. With --fail-over, a significant slow-down beyond that percentage
+makes the exit status 1, for use as a release check.
+
+Usage:
+    python -m troubleshooter.bench.micro --save base.json      # before the change
+    python -m troubleshooter.bench.micro --compare base.json   # after it
+    python -m troubleshooter.bench.micro --sizes 10,1k,10M --run detect_log_anomalies
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from troubleshooter import bench
+
+LINE_SIZES = [10, 1000, 100_000]
+OUTPUT_SIZES = [64_000, 1_000_000, 4_000_000]  # Bytes
+COUNT = 6
+MIN_TIME = 0.1  # Seconds per sample
+ALPHA = 0.05
+_SUFFIXES = {"": 1, "k": 1000, "m": 1000 ** 2, "g": 1000 ** 3}
+
+# Log lines by weight: mostly routine traffic, with the failures the anomaly patterns look for
+_LOG_LINES = [
+    (40, "INFO GET /api/v1/items/{n} 200 {ms}ms"),
+    (20, "DEBUG cache hit for key session:{hex}"),
+    (8, "WARN slow query took {ms}ms on table orders"),
+    (6, "ERROR failed to process request {hex}: connection refused"),
+    (5, "retrying connection to redis://redis:6379 in {n}s (attempt {n})"),
+    (4, "ERROR context deadline exceeded: request timed out after {ms}ms"),
+    (3, "Readiness probe failed: HTTP probe failed with statuscode: 503"),
+    (2, "dial tcp: lookup db.internal on 172.30.0.10:53: no such host"),
+    (2, "Container restart count {n}, back-off restarting failed container"),
+    (1, "java.lang.OutOfMemoryError: out of memory, container OOMKilled"),
+    (1, "x509: certificate signed by unknown authority"),
+    (1, "open /data/wal/{hex}: no space left on device"),
+    (1, "panic: runtime error: invalid memory address or nil pointer dereference"),
+    (1, "open /etc/app/secret.yaml: permission denied"),
+]
+_EVENTS = [
+    ("Normal", "Scheduled", "Successfully assigned {ns}/{pod} to worker-{n}"),
+    ("Normal", "Pulled", 'Container image "quay.io/app/server:v{n}" already present on machine'),
+    ("Normal", "Started", "Started container server"),
+    ("Warning", "BackOff", "Back-off restarting failed container server in pod {pod}"),
+    ("Warning", "Unhealthy", "Readiness probe failed: Get http://10.128.{n}.{n}:8080/ready: connection refused"),
+    ("Warning", "FailedScheduling", "0/6 nodes are available: 3 Insufficient cpu, 3 Insufficient memory."),
+    ("Warning", "Failed", 'Failed to pull image "quay.io/app/server:v{n}": manifest unknown'),
+    ("Warning", "FailedMount", 'MountVolume.SetUp failed for volume "config" : configmap "app-config" not found'),
+]
+_FIELD = re.compile(r"\{(\w+)\}")
+
+
+def _fill(template: str, rng: random.Random, pod: str = "server-7d9f8b6c4-x2x9q") -> str:
+    values = {"n": lambda: str(rng.randint(1, 250)), "ms": lambda: str(rng.randint(1, 30000)),
+              "hex": lambda: f"{rng.getrandbits(48):012x}", "ns": lambda: "shop", "pod": lambda: pod}
+    return _FIELD.sub(lambda m: values[m.group(1)](), template)
+
+
+def _pool(weighted: List[Tuple[int, str]], rng: random.Random, size: int = 4096) -> List[str]:
+    """Distinct filled-in lines in proportion to their weights; picking from a pool keeps 10M-line logs fast to build"""
+    templates = [template for weight, template in weighted for _ in range(weight)]
+    return [_fill(rng.choice(templates), rng) for _ in range(size)]
+
+
+def synthetic_logs(lines: int, seed: int = 1) -> str:
+    """A timestamped container log of the given number of lines"""
+    rng = random.Random(seed)
+    pool = _pool(_LOG_LINES, rng)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    stamps = [(start + timedelta(seconds=s)).strftime("%Y-%m-%dT%H:%M:%S") for s in range(min(lines, 86400))]
+    picks = rng.choices(pool, k=lines)
+    return "\n".join(f"{stamps[i % len(stamps)]}.{i % 1000000:06d}Z {line}" for i, line in enumerate(picks))
+
+
+def synthetic_events(rows: int, seed: int = 1) -> str:
+    """`oc get events` output with the given number of rows"""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(min(rows, 4096) or 1):
+        type_, reason, message = rng.choice(_EVENTS)
+        pod = f"server-7d9f8b6c4-{rng.getrandbits(20):05x}"
+        age = f"{rng.randint(1, 59)}{rng.choice('smh')}"
+        pool.append(f"{age:<11}{type_:<10}{reason:<18}{'pod/' + pod:<32}{_fill(message, rng, pod)}")
+    lines = ["LAST SEEN  TYPE      REASON            OBJECT                          MESSAGE"]
+    lines += rng.choices(pool, k=rows)
+    return "\n".join(lines)
+
+
+def synthetic_output(size: int, seed: int = 1) -> str:
+    """Troubleshooter script output of about size bytes: step sections with events and logs, then the summary"""
+    rng = random.Random(seed)
+    logs = synthetic_logs(max(size // 90, 10), seed).split("\n")
+    events = synthetic_events(max(size // 120, 10), seed).split("\n")
+    steps = ["Gathering Pod Information", "Pod Events", "Retrieving Logs", "Korrel8r Correlation Analysis",
+             "Related Resources"]
+    parts: List[str] = []
+    length = 0
+    step = 0
+    while length < size:
+        source = events if step % 2 else logs
+        start = rng.randrange(len(source))
+        chunk = source[start:start + rng.randint(20, 400)]
+        section = f"📋 Step {step + 1}: {steps[step % len(steps)]}...\n" + "\n".join(chunk) + "\n"
+        parts.append(section)
+        length += len(section.encode())
+        step += 1
+    parts.append("🎯 ANALYSIS SUMMARY\n" + "\n".join(f"- finding {i}: {line}" for i, line in enumerate(events[:20])))
+    return "".join(parts)
+
+
+class Benchmark(NamedTuple):
+    """A function and the input of each size it is timed on"""
+
+    name: str
+    unit: str  # What size counts: "lines" or "bytes"
+    make_input: Callable[[int], object]
+    run: Callable[[object], object]
+
+
+def benchmarks(v1, v2) -> Dict[str, Benchmark]:
+    """The benchmarks, on the functions of the loaded v1 and v2 scripts"""
+
+    def categorize_lines(lines: List[str]) -> None:
+        for line in lines:
+            v2.categorize_error(line)
+
+    return {b.name: b for b in [
+        Benchmark("categorize_error", "lines", lambda n: synthetic_logs(n).split("\n"), categorize_lines),
+        Benchmark("detect_log_anomalies", "lines", synthetic_logs, v2.detect_log_anomalies),
+        Benchmark("create_timeline_visualization", "lines", synthetic_events, v2.create_timeline_visualization),
+        Benchmark("parse_analysis_output", "bytes", synthetic_output, v1.parse_analysis_output),
+    ]}
+
+
+def measure(func: Callable, arg: object, count: int = COUNT, min_time: float = MIN_TIME) -> Tuple[List[float], int]:
+    """Seconds per call for count samples, and the peak Python heap of one call in bytes"""
+    start = time.perf_counter()
+    func(arg)  # Warm-up, also sizes the samples
+    once = time.perf_counter() - start
+    calls = max(1, int(min_time / once)) if once > 0 else 1000
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func(arg)
+        samples.append((time.perf_counter() - start) / calls)
+    tracemalloc.start()
+    try:
+        func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return samples, peak
+
+
+def run(names: Optional[Sequence[str]] = None, sizes: Sequence[int] = LINE_SIZES,
+        output_sizes: Sequence[int] = OUTPUT_SIZES, count: int = COUNT, min_time: float = MIN_TIME,
+        progress: Callable[[str], None] = lambda name: None) -> Dict[str, Dict]:
+    """Results by "function/unit=size": size, unit, per-call samples and peak_bytes"""
+    from troubleshooter.bench import e2e
+
+    e2e.quiet_streamlit()
+    suite = benchmarks(e2e.load_script("ai-enhanced-troubleshooter.py", "troubleshooter_v1"),
+                       e2e.load_script("ai-enhanced-troubleshooter-v2.py", "troubleshooter_v2"))
+    unknown = set(names or []) - set(suite)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {sorted(unknown)}, choose from {sorted(suite)}")
+    results = {}
+    for benchmark in (suite[name] for name in names or suite):
+        for size in output_sizes if benchmark.unit == "bytes" else sizes:
+            key = f"{benchmark.name}/{benchmark.unit}={_format_size(size)}"
+            progress(key)
+            samples, peak = measure(benchmark.run, benchmark.make_input(size), count, min_time)
+            results[key] = {"size": size, "unit": benchmark.unit, "samples": samples, "peak_bytes": peak}
+    return results
+
+
+def _parse_size(text: str) -> int:
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([kmg]?)", text.strip().lower())
+    if not match:
+        raise argparse.ArgumentTypeError(f"bad size {text!r}, expected a number like 1000, 64k or 10M")
+    return int(float(match.group(1)) * _SUFFIXES[match.group(2)])
+
+
+def _parse_sizes(text: str) -> List[int]:
+    return [_parse_size(part) for part in text.split(",") if part.strip()]
+
+
+def _format_size(size: int) -> str:
+    for suffix, scale in (("G", 1000 ** 3), ("M", 1000 ** 2), ("k", 1000)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{suffix}"
+    return str(size)
+
+
+def _digits(value: float) -> str:
+    """Three significant digits without switching to exponent notation"""
+    return f"{value:.0f}" if value >= 100 else f"{value:.3g}"
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return _digits(seconds / scale) + unit
+    return _digits(seconds / 1e-9) + "ns"
+
+
+def _format_bytes(size: float) -> str:
+    for unit, scale in (("GiB", 1 << 30), ("MiB", 1 << 20), ("KiB", 1 << 10)):
+        if size >= scale:
+            return _digits(size / scale) + unit
+    return f"{size:.0f}B"
+
+
+def _spread(samples: Sequence[float]) -> float:
+    """Largest deviation from the median, as a fraction of it"""
+    median = bench.percentile(samples, 50)
+    return max(abs(s - median) for s in samples) / median if median else 0.0
+
+
+def format_results(results: Dict[str, Dict]) -> str:
+    """Time per call, throughput and peak heap per benchmark as an aligned text table"""
+    rows = [("benchmark", "time/op", "±", "throughput", "peak heap")]
+    for key, result in results.items():
+        median = bench.percentile(result["samples"], 50)
+        rate = result["size"] / median if median else float("inf")
+        throughput = (f"{_format_bytes(rate)}/s" if result["unit"] == "bytes" else
+                      f"{_digits(rate / 1e6)}M lines/s" if rate >= 1e6 else f"{_digits(rate / 1e3)}k lines/s")
+        rows.append((key, _format_time(median), f"{_spread(result['samples']):.0%}", throughput,
+                     _format_bytes(result["peak_bytes"])))
+    return _table(rows)
+
+
+def _table(rows: List[Sequence[str]]) -> str:
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join("  ".join(cell.ljust(w) if i == 0 else cell.rjust(w) for i, (cell, w) in
+                               enumerate(zip(row, widths))) for row in rows)
+
+
+def mann_whitney_p(a: Sequence[float], b: Sequence[float]) -> float:
+    """Two-sided p-value of a Mann-Whitney U test, normal approximation with tie correction"""
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return 1.0
+    ranked = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    ranks = [0.0] * len(ranked)
+    ties = 0.0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        ties += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+    u = sum(r for r, (_, group) in zip(ranks, ranked) if group == 0) - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return math.erfc(max(z, 0) / math.sqrt(2))
+
+
+def compare(old: Dict[str, Dict], new: Dict[str, Dict], alpha: float = ALPHA) -> Tuple[str, List[Dict]]:
+    """benchstat-style comparison table, and the change of each benchmark present in both"""
+    rows = [("benchmark", "old time/op", "new time/op", "delta", "old heap", "new heap", "delta")]
+    changes = []
+    ratios = []
+    for key in new:
+        if key not in old:
+            continue
+        before, after = bench.percentile(old[key]["samples"], 50), bench.percentile(new[key]["samples"], 50)
+        p = mann_whitney_p(old[key]["samples"], new[key]["samples"])
+        delta = (after - before) / before if before else 0.0
+        significant = p < alpha
+        heap_before, heap_after = old[key]["peak_bytes"], new[key]["peak_bytes"]
+        heap_delta = (heap_after - heap_before) / heap_before if heap_before else 0.0
+        rows.append((key, _format_time(before), _format_time(after),
+                     f"{delta:+.1%} (p={p:.3f})" if significant else f"~ (p={p:.3f})",
+                     _format_bytes(heap_before), _format_bytes(heap_after), f"{heap_delta:+.1%}"))
+        changes.append({"benchmark": key, "delta": delta, "p": p, "significant": significant,
+                        "heap_delta": heap_delta})
+        if before and after:
+            ratios.append(after / before)
+    if ratios:
+        geomean = math.exp(sum(math.log(r) for r in ratios) / len(ratios)) - 1
+        rows.append(("[geomean]", "", "", f"{geomean:+.1%}", "", "", ""))
+    return _table(rows), changes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time the hot pure functions on synthetic inputs")
+    parser.add_argument("--run", action="append", dest="names", help="benchmark name, repeatable (default all)")
+    parser.add_argument("--sizes", type=_parse_sizes, default=LINE_SIZES,
+                        help="log lines and event rows, comma-separated, k/M suffixes (default 10,1k,100k)")
+    parser.add_argument("--output-sizes", type=_parse_sizes, default=OUTPUT_SIZES,
+                        help="troubleshooter output bytes, comma-separated (default 64k,1M,4M)")
+    parser.add_argument("--count", type=int, default=COUNT, help="samples per benchmark")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="seconds per sample")
+    parser.add_argument("--save", help="write the results to this file, as a baseline")
+    parser.add_argument("--compare", help="compare with the baseline in this file")
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="significance level of the comparison")
+    parser.add_argument("--fail-over", type=float, metavar="PERCENT",
+                        help="exit 1 if a benchmark is significantly slower than the baseline by more than this")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    results = run(args.names, args.sizes, args.output_sizes, args.count, args.min_time,
+                  progress=lambda key: print(f"running {key}", file=sys.stderr))
+    print(format_results(results))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"created": datetime.now(timezone.utc).isoformat(), "python": sys.version.split()[0],
+                       "results": results}, f, indent=1)
+    if baseline is None:
+        return 0
+    table, changes = compare(baseline, results, args.alpha)
+    print()
+    print(table)
+    if args.fail_over is not None:
+        regressions = [c for c in changes if c["significant"] and c["delta"] * 100 > args.fail_over]
+        for change in regressions:
+            print(f"REGRESSION {change['benchmark']}: {change['delta']:+.1%}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Keyword table categorizer for error text
+========================================
+categorize_error() lowercased its input and then ran one `in` check per
+category keyword and three more keyword scans for severity, once per string.
+Categorizer builds one table once, mapping each keyword to the category rank
+and severity rank it implies, and classifies a text in a single pass over that
+table: both answers come out of the same scan, and keywords that cannot
+improve on what was already found are not searched for. categorize_errors()
+classifies a batch, looking at each distinct text only once.
+
+Results are identical to the original rules: the first category in
+ERROR_CATEGORIES order with a matching keyword wins (CONFIG if none), and
+severity is the most severe level with a matching word (INFO if none).
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ERROR_CATEGORIES = {
+    "RESOURCE": {"name": "Resource Issues", "icon": "💾", "patterns": ["insufficient", "resource", "memory", "cpu", "disk"]},
+    "NETWORK": {"name": "Network Issues", "icon": "🌐", "patterns": ["network", "dns", "connection", "timeout", "unreachable"]},
+    "STORAGE": {"name": "Storage Issues", "icon": "💿", "patterns": ["volume", "mount", "pvc", "storage", "disk"]},
+    "IMAGE": {"name": "Image Issues", "icon": "📦", "patterns": ["image", "pull", "registry", "manifest"]},
+    "PERMISSION": {"name": "Permission Issues", "icon": "🔐", "patterns": ["permission", "forbidden", "unauthorized", "rbac"]},
+    "CONFIG": {"name": "Configuration Issues", "icon": "⚙️", "patterns": ["config", "environment", "secret", "configmap"]},
+    "INIT": {"name": "Initialization Issues", "icon": "🔄", "patterns": ["init", "startup", "readiness", "liveness"]},
+    "SCHEDULING": {"name": "Scheduling Issues", "icon": "📅", "patterns": ["schedule", "node", "affinity", "taint", "toleration"]}
+}
+
+# Most severe first; the first level with a matching word wins.
+SEVERITY_KEYWORDS = {
+    "CRITICAL": ["failed", "error", "crash", "critical", "fatal", "emergency"],
+    "WARNING": ["warning", "warn", "deprecated", "retry", "backoff"],
+    "SUCCESS": ["success", "completed", "ready", "healthy"],
+}
+
+DEFAULT_CATEGORY = "CONFIG"
+DEFAULT_SEVERITY = "INFO"
+
+
+class Categorizer:
+    """Assigns a category and a severity to error texts from one keyword table"""
+
+    def __init__(self, categories: Optional[Dict[str, Dict]] = None,
+                 severities: Optional[Dict[str, List[str]]] = None,
+                 default_category: str = DEFAULT_CATEGORY, default_severity: str = DEFAULT_SEVERITY):
+        categories = ERROR_CATEGORIES if categories is None else categories
+        severities = SEVERITY_KEYWORDS if severities is None else severities
+        self.categories = list(categories)
+        self.severities = list(severities)
+        self.default_category = default_category
+        self.default_severity = default_severity
+        # Keywords of each category and severity, in rank order
+        self.category_keywords = [[k.lower() for k in info["patterns"]] for info in categories.values()]
+        self.severity_keywords = [[k.lower() for k in words] for words in severities.values()]
+        # keyword -> (category rank, severity rank), lower rank wins, len() means no opinion
+        no_category, no_severity = len(self.categories), len(self.severities)
+        table: Dict[str, List[int]] = {}
+        for rank, keywords in enumerate(self.category_keywords):
+            for keyword in keywords:
+                entry = table.setdefault(keyword, [no_category, no_severity])
+                entry[0] = min(entry[0], rank)
+        for rank, keywords in enumerate(self.severity_keywords):
+            for keyword in keywords:
+                entry = table.setdefault(keyword, [no_category, no_severity])
+                entry[1] = min(entry[1], rank)
+        # Strongest keywords first, so a text is usually settled after a few checks
+        self._table: List[Tuple[str, int, int]] = sorted(((k, c, s) for k, (c, s) in table.items()),
+                                                         key=lambda entry: min(entry[1], entry[2]))
+
+    def categorize(self, text: str) -> Tuple[str, str]:
+        """(category, severity) of one text"""
+        text = text.lower()
+        category, severity = len(self.categories), len(self.severities)
+        for keyword, cat, sev in self._table:
+            if (cat < category or sev < severity) and keyword in text:
+                category, severity = min(category, cat), min(severity, sev)
+                if not category and not severity:
+                    break
+        return self._names(category, severity)
+
+    def _names(self, category: int, severity: int) -> Tuple[str, str]:
+        return (self.categories[category] if category < len(self.categories) else self.default_category,
+                self.severities[severity] if severity < len(self.severities) else self.default_severity)
+
+    def categorize_many(self, texts: Iterable[str]) -> List[Tuple[str, str]]:
+        """(category, severity) of each text, in order"""
+        texts = list(texts)
+        # Events and log lines repeat a lot; classify each distinct text once
+        results = {text: self.categorize(text) for text in dict.fromkeys(texts)}
+        return [results[text] for text in texts]
+
+
+default_categorizer = Categorizer()
+
+
+def categorize_error(error_text: str) -> Tuple[str, str]:
+    """Categorize error and determine severity"""
+    return default_categorizer.categorize(error_text)
+
+
+def categorize_errors(error_texts: Iterable[str]) -> List[Tuple[str, str]]:
+    """Categorize many errors at once, returning (category, severity) for each"""
+    return default_categorizer.categorize_many(error_texts)
@@ -0,0 +1,524 @@
+"""
+Kubernetes data collector shared by the AI troubleshooters
+==========================================================
+One process-wide, connection-pooled API client replaces the `oc` subprocess
+that used to be forked for every lookup. The `oc` CLI is kept as a fallback
+backend for environments where no API credentials can be found.
+
+Backend selection (first match wins):
+- TROUBLESHOOTER_BACKEND=oc forces the oc CLI backend
+- KUBE_API_SERVER (with optional KUBE_TOKEN, KUBE_CA_FILE and
+  KUBE_INSECURE_SKIP_TLS_VERIFY), e.g. a local fake API server or `oc proxy`
+- the in-cluster service account of the pod we run in
+- the current oc/kubectl context, read once with `oc config view --minify --raw`
+"""
+
+import base64
+import json
+import os
+import socket
+import subprocess
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+SERVICE_ACCOUNT_DIR = "/var/run/secrets/kubernetes.io/serviceaccount"
+DEFAULT_TIMEOUT = 30
+
+
+class CollectorError(Exception):
+    """Raised when a backend cannot fetch the requested data"""
+
+
+class LineStream:
+    """Lines of a followed log; close() may be called from any thread and frees the response or process at once"""
+
+    def __init__(self, lines: Iterator[str], close: Callable[[], None]):
+        self._lines = lines
+        self._close = close
+
+    def __iter__(self) -> "LineStream":
+        return self
+
+    def __next__(self) -> str:
+        return next(self._lines)
+
+    def close(self) -> None:
+        self._close()
+
+
+class APIBackend:
+    """Talks to the Kubernetes API server over a single pooled HTTP session"""
+
+    name = "api"
+
+    def __init__(self, server: str, token: Optional[str] = None, verify=True, cert=None,
+                 timeout: float = DEFAULT_TIMEOUT, pool_size: int = 16):
+        self.server = server.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.verify = verify
+        if verify is False:
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        if cert:
+            self.session.cert = cert
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self.session.headers["Accept"] = "application/json"
+
+    def request(self, path: str, params: Optional[Dict] = None, stream: bool = False,
+                timeout=None) -> requests.Response:
+        """GET an API path, raising CollectorError on transport or HTTP errors"""
+        try:
+            response = self.session.get(self.server + path, params=params, stream=stream,
+                                        timeout=timeout or self.timeout)
+        except requests.RequestException as e:
+            raise CollectorError(str(e)) from e
+        if response.status_code != 200:
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            raise CollectorError(f"{response.status_code} {response.reason}: {message}")
+        return response
+
+    def get_json(self, path: str, params: Optional[Dict] = None) -> Dict:
+        return self.request(path, params).json()
+
+    def watch(self, path: str, resource_version: str, timeout_seconds: int = 300) -> Iterator[Dict]:
+        """Yield watch events for a collection path until the server ends the watch"""
+        params = {"watch": "1", "resourceVersion": resource_version, "allowWatchBookmarks": "true",
+                  "timeoutSeconds": timeout_seconds}
+        response = self.request(path, params, stream=True, timeout=(self.timeout, timeout_seconds + 30))
+        with response:
+            try:
+                for line in response.iter_lines(chunk_size=None):
+                    if line:
+                        yield json.loads(line)
+            except requests.RequestException as e:
+                raise CollectorError(str(e)) from e
+
+    def list_namespaces(self) -> List[Dict]:
+        return self.get_json("/api/v1/namespaces").get("items", [])
+
+    def list_pods(self, namespace: str, label_selector: Optional[str] = None) -> List[Dict]:
+        params = {"labelSelector": label_selector} if label_selector else None
+        return self.get_json(f"/api/v1/namespaces/{namespace}/pods", params).get("items", [])
+
+    def get_pod(self, namespace: str, name: str) -> Dict:
+        return self.get_json(f"/api/v1/namespaces/{namespace}/pods/{name}")
+
+    def list_events(self, namespace: str, involved_object: Optional[str] = None) -> List[Dict]:
+        params = {"fieldSelector": f"involvedObject.name={involved_object}"} if involved_object else None
+        return self.get_json(f"/api/v1/namespaces/{namespace}/events", params).get("items", [])
+
+    def list_nodes(self) -> List[Dict]:
+        return self.get_json("/api/v1/nodes").get("items", [])
+
+    def get_pod_logs(self, namespace: str, name: str, container: Optional[str] = None,
+                     tail: Optional[int] = None, previous: bool = False, timestamps: bool = False,
+                     since_time: Optional[str] = None, timeout: Optional[float] = None) -> str:
+        params = {}
+        if container:
+            params["container"] = container
+        if tail is not None:
+            params["tailLines"] = tail
+        if previous:
+            params["previous"] = "true"
+        if timestamps:
+            params["timestamps"] = "true"
+        if since_time:
+            params["sinceTime"] = since_time
+        return self.request(f"/api/v1/namespaces/{namespace}/pods/{name}/log", params, timeout=timeout).text
+
+    def follow_pod_logs(self, namespace: str, name: str, container: Optional[str] = None,
+                        tail: Optional[int] = None, idle_timeout: float = 300) -> LineStream:
+        """Log lines as they are written until the container stops; idle_timeout seconds without output is an error"""
+        params = {"follow": "true"}
+        if container:
+            params["container"] = container
+        if tail is not None:
+            params["tailLines"] = tail
+        response = self.request(f"/api/v1/namespaces/{namespace}/pods/{name}/log", params, stream=True,
+                                timeout=(self.timeout, idle_timeout))
+
+        def lines() -> Iterator[str]:
+            with response:
+                try:
+                    for line in response.iter_lines(chunk_size=None):
+                        yield line.decode("utf-8", "replace")
+                except requests.RequestException as e:
+                    raise CollectorError(str(e)) from e
+
+        def close() -> None:
+            # Closing the response alone waits for a read blocked in another thread; a socket shutdown ends it
+            sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass  # Already closed
+            response.close()
+
+        return LineStream(lines(), close)
+
+    def get_pod_metrics(self, namespace: str, name: str) -> Dict:
+        return self.get_json(f"/apis/metrics.k8s.io/v1beta1/namespaces/{namespace}/pods/{name}")
+
+    def describe(self, kind: str, name: str, namespace: Optional[str] = None) -> str:
+        # `describe` is assembled client-side by oc, there is no API equivalent.
+        return OcBackend(timeout=self.timeout).describe(kind, name, namespace)
+
+
+class OcBackend:
+    """Fallback backend that shells out to the `oc` CLI for every call"""
+
+    name = "oc"
+
+    def __init__(self, binary: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT):
+        self.binary = binary or os.environ.get("OC_BINARY", "oc")
+        self.timeout = timeout
+
+    def run(self, args: List[str], timeout: Optional[float] = None) -> str:
+        """Run oc with args, raising CollectorError on failure"""
+        try:
+            result = subprocess.run([self.binary] + args, capture_output=True, text=True,
+                                    timeout=timeout or self.timeout)
+        except subprocess.TimeoutExpired:
+            raise CollectorError("Command timed out")
+        except OSError as e:
+            raise CollectorError(str(e)) from e
+        if result.returncode != 0:
+            raise CollectorError(result.stderr.strip() or f"oc exited with {result.returncode}")
+        return result.stdout
+
+    def get_json(self, args: List[str]) -> Dict:
+        try:
+            return json.loads(self.run(args + ["-o", "json"]))
+        except ValueError as e:
+            raise CollectorError(f"Invalid JSON from oc: {e}") from e
+
+    def list_namespaces(self) -> List[Dict]:
+        return self.get_json(["get", "namespaces"]).get("items", [])
+
+    def list_pods(self, namespace: str, label_selector: Optional[str] = None) -> List[Dict]:
+        args = ["get", "pods", "-n", namespace]
+        if label_selector:
+            args += ["-l", label_selector]
+        return self.get_json(args).get("items", [])
+
+    def get_pod(self, namespace: str, name: str) -> Dict:
+        return self.get_json(["get", "pod", name, "-n", namespace])
+
+    def list_events(self, namespace: str, involved_object: Optional[str] = None) -> List[Dict]:
+        args = ["get", "events", "-n", namespace]
+        if involved_object:
+            args += ["--field-selector", f"involvedObject.name={involved_object}"]
+        return self.get_json(args).get("items", [])
+
+    def list_nodes(self) -> List[Dict]:
+        return self.get_json(["get", "nodes"]).get("items", [])
+
+    def get_pod_logs(self, namespace: str, name: str, container: Optional[str] = None,
+                     tail: Optional[int] = None, previous: bool = False, timestamps: bool = False,
+                     since_time: Optional[str] = None, timeout: Optional[float] = None) -> str:
+        args = ["logs", name, "-n", namespace]
+        if container:
+            args += ["-c", container]
+        if tail is not None:
+            args.append(f"--tail={tail}")
+        if previous:
+            args.append("--previous")
+        if timestamps:
+            args.append("--timestamps")
+        if since_time:
+            args.append(f"--since-time={since_time}")
+        return self.run(args, timeout)
+
+    def follow_pod_logs(self, namespace: str, name: str, container: Optional[str] = None,
+                        tail: Optional[int] = None) -> LineStream:
+        args = [self.binary, "logs", "-f", name, "-n", namespace]
+        if container:
+            args += ["-c", container]
+        if tail is not None:
+            args.append(f"--tail={tail}")
+        try:
+            process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                       errors="replace")
+        except OSError as e:
+            raise CollectorError(str(e)) from e
+
+        def terminate() -> None:
+            if process.poll() is None:
+                process.terminate()
+
+        def lines() -> Iterator[str]:
+            try:
+                for line in process.stdout:
+                    yield line.rstrip("\n")
+                if process.wait() != 0:
+                    raise CollectorError(process.stderr.read().strip() or f"oc exited with {process.returncode}")
+            finally:
+                terminate()
+                process.wait()
+
+        return LineStream(lines(), terminate)
+
+    def get_pod_metrics(self, namespace: str, name: str) -> Dict:
+        try:
+            return json.loads(self.run(["get", "--raw",
+                                        f"/apis/metrics.k8s.io/v1beta1/namespaces/{namespace}/pods/{name}"]))
+        except ValueError as e:
+            raise CollectorError(f"Invalid JSON from oc: {e}") from e
+
+    def describe(self, kind: str, name: str, namespace: Optional[str] = None) -> str:
+        args = ["describe", kind, name]
+        if namespace:
+            args += ["-n", namespace]
+        return self.run(args)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide backend, creating it on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _select_backend()
+    return _backend
+
+
+def set_backend(backend) -> None:
+    """Replace the process-wide backend, e.g. with a fake API server; None re-selects on next use"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _select_backend():
+    if os.environ.get("TROUBLESHOOTER_BACKEND", "").lower() == "oc":
+        return OcBackend()
+
+    server = os.environ.get("KUBE_API_SERVER")
+    if server:
+        verify = os.environ.get("KUBE_CA_FILE", True)
+        if os.environ.get("KUBE_INSECURE_SKIP_TLS_VERIFY", "").lower() in ("1", "true", "yes"):
+            verify = False
+        return APIBackend(server, os.environ.get("KUBE_TOKEN"), verify=verify)
+
+    host, port = os.environ.get("KUBERNETES_SERVICE_HOST"), os.environ.get("KUBERNETES_SERVICE_PORT")
+    token_file = os.path.join(SERVICE_ACCOUNT_DIR, "token")
+    if host and port and os.path.exists(token_file):
+        with open(token_file) as f:
+            token = f.read().strip()
+        ca_file = os.path.join(SERVICE_ACCOUNT_DIR, "ca.crt")
+        return APIBackend(f"https://{host}:{port}", token,
+                          verify=ca_file if os.path.exists(ca_file) else True)
+
+    try:
+        return _kubeconfig_backend() or OcBackend()
+    except (CollectorError, ValueError, KeyError, IndexError):
+        return OcBackend()
+
+
+def _kubeconfig_backend() -> Optional[APIBackend]:
+    """Build an API backend from the current oc context, None if it has no usable credentials"""
+    config = json.loads(OcBackend().run(["config", "view", "--minify", "--raw", "-o", "json"]))
+    cluster = config["clusters"][0]["cluster"]
+    user = config["users"][0].get("user", {})
+
+    verify = True
+    if cluster.get("insecure-skip-tls-verify"):
+        verify = False
+    elif cluster.get("certificate-authority-data"):
+        verify = _write_temp(cluster["certificate-authority-data"], ".crt")
+    elif cluster.get("certificate-authority"):
+        verify = cluster["certificate-authority"]
+
+    if user.get("token"):
+        return APIBackend(cluster["server"], user["token"], verify=verify)
+    if user.get("client-certificate-data") and user.get("client-key-data"):
+        cert = (_write_temp(user["client-certificate-data"], ".crt"),
+                _write_temp(user["client-key-data"], ".key"))
+        return APIBackend(cluster["server"], verify=verify, cert=cert)
+    if user.get("client-certificate") and user.get("client-key"):
+        return APIBackend(cluster["server"], verify=verify,
+                          cert=(user["client-certificate"], user["client-key"]))
+    return None  # exec or auth-provider plugins: leave those to oc
+
+
+def _write_temp(data: str, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(prefix="troubleshooter-", suffix=suffix, delete=False) as f:
+        f.write(base64.b64decode(data))
+    os.chmod(f.name, 0o600)
+    return f.name
+
+
+def get_namespaces() -> List[str]:
+    """Sorted namespace names"""
+    return sorted(ns["metadata"]["name"] for ns in get_backend().list_namespaces())
+
+
+def get_pods(namespace: str, label_selector: Optional[str] = None) -> List[Dict]:
+    """Pod objects in a namespace"""
+    return get_backend().list_pods(namespace, label_selector)
+
+
+def get_pods_in_namespace(namespace: str) -> List[str]:
+    """Sorted pod names in a namespace"""
+    return sorted(pod["metadata"]["name"] for pod in get_pods(namespace))
+
+
+def get_pod(namespace: str, pod: str) -> Dict:
+    """Pod object"""
+    return get_backend().get_pod(namespace, pod)
+
+
+def get_pod_status(namespace: str, pod: str) -> str:
+    """Pod phase, e.g. Running or Pending"""
+    return get_pod(namespace, pod).get("status", {}).get("phase", "Unknown")
+
+
+def get_nodes() -> List[Dict]:
+    """Node objects"""
+    return get_backend().list_nodes()
+
+
+def get_events(namespace: str, pod: Optional[str] = None) -> List[Dict]:
+    """Events in a namespace, optionally only those for one pod, oldest first"""
+    return sorted(get_backend().list_events(namespace, pod), key=event_timestamp)
+
+
+def get_pod_logs(namespace: str, pod: str, container: Optional[str] = None,
+                 tail: Optional[int] = None, previous: bool = False, timestamps: bool = False,
+                 since_time: Optional[str] = None, timeout: Optional[float] = None) -> str:
+    """Container logs, each line prefixed with its RFC 3339 timestamp if timestamps is set.
+
+    timeout, in seconds, replaces the backend's own request timeout.
+    """
+    return get_backend().get_pod_logs(namespace, pod, container, tail, previous, timestamps, since_time, timeout)
+
+
+def follow_pod_logs(namespace: str, pod: str, container: Optional[str] = None,
+                    tail: Optional[int] = None) -> LineStream:
+    """Container log lines as they are written, like `oc logs -f`; close() the stream to stop following"""
+    return get_backend().follow_pod_logs(namespace, pod, container, tail)
+
+
+def get_pod_usage(namespace: str, pod: str) -> Dict[str, str]:
+    """Current CPU and memory usage in `oc adm top` units, N/A without metrics"""
+    try:
+        containers = get_backend().get_pod_metrics(namespace, pod).get("containers", [])
+    except CollectorError:
+        return {"cpu": "N/A", "memory": "N/A"}
+    cpu = sum(parse_quantity(c.get("usage", {}).get("cpu", "0")) for c in containers)
+    memory = sum(parse_quantity(c.get("usage", {}).get("memory", "0")) for c in containers)
+    return {"cpu": f"{int(round(cpu * 1000))}m", "memory": f"{int(memory // 2**20)}Mi"}
+
+
+def describe_pod(namespace: str, pod: str) -> str:
+    """`oc describe pod` text"""
+    return get_backend().describe("pod", pod, namespace)
+
+
+def describe_node(node: str) -> str:
+    """`oc describe node` text"""
+    return get_backend().describe("node", node)
+
+
+def node_ready(node: Dict) -> bool:
+    """True if the node has a Ready=True condition"""
+    return any(c.get("type") == "Ready" and c.get("status") == "True"
+               for c in node.get("status", {}).get("conditions", []))
+
+
+def pod_display_status(pod: Dict) -> str:
+    """Pod status as shown in the STATUS column of `oc get pods`"""
+    if pod.get("metadata", {}).get("deletionTimestamp"):
+        return "Terminating"
+    status = pod.get("status", {})
+    reason = status.get("reason") or status.get("phase", "Unknown")
+    for cs in status.get("initContainerStatuses", []):
+        state = cs.get("state", {})
+        if state.get("terminated", {}).get("exitCode", 0) != 0:
+            return "Init:" + (state["terminated"].get("reason") or "Error")
+        if state.get("waiting", {}).get("reason") not in (None, "PodInitializing"):
+            return "Init:" + state["waiting"]["reason"]
+    for cs in reversed(status.get("containerStatuses", [])):
+        state = cs.get("state", {})
+        if state.get("waiting", {}).get("reason"):
+            reason = state["waiting"]["reason"]
+        elif state.get("terminated", {}).get("reason"):
+            reason = state["terminated"]["reason"]
+    return reason
+
+
+def event_timestamp(event: Dict) -> str:
+    """Best available timestamp of an event as an RFC 3339 string"""
+    return (event.get("lastTimestamp") or event.get("eventTime") or
+            event.get("metadata", {}).get("creationTimestamp") or "")
+
+
+def format_age(timestamp: str, now: Optional[datetime] = None) -> str:
+    """Short age of an RFC 3339 timestamp, like the LAST SEEN column of oc"""
+    if not timestamp:
+        return "<unknown>"
+    try:
+        then = datetime.strptime(timestamp[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return "<unknown>"
+    seconds = max(0, int(((now or datetime.now(timezone.utc)) - then).total_seconds()))
+    if seconds < 120:
+        return f"{seconds}s"
+    minutes = seconds // 60
+    if minutes < 10:
+        return f"{minutes}m{seconds % 60}s"
+    if minutes < 180:
+        return f"{minutes}m"
+    hours = minutes // 60
+    if hours < 8:
+        return f"{hours}h{minutes % 60}m"
+    if hours < 48:
+        return f"{hours}h"
+    days = hours // 24
+    return f"{days}d{hours % 24}h" if days < 8 else f"{days}d"
+
+
+def format_events(events: List[Dict]) -> str:
+    """Render events as the table printed by `oc get events -n NAMESPACE`"""
+    rows = [("LAST SEEN", "TYPE", "REASON", "OBJECT", "MESSAGE")]
+    for event in events:
+        obj = event.get("involvedObject", {})
+        rows.append((format_age(event_timestamp(event)), event.get("type", ""), event.get("reason", ""),
+                     f"{obj.get('kind', '').lower()}/{obj.get('name', '')}",
+                     " ".join(event.get("message", "").split())))
+    widths = [max(len(row[i]) for row in rows) for i in range(4)]
+    return "\n".join("   ".join(row[i].ljust(widths[i]) for i in range(4)) + "   " + row[4]
+                     for row in rows) + "\n"
+
+
+_QUANTITY_SUFFIXES = {
+    "n": 1e-9, "u": 1e-6, "m": 1e-3, "": 1, "k": 1e3, "M": 1e6, "G": 1e9, "T": 1e12, "P": 1e15, "E": 1e18,
+    "Ki": 2**10, "Mi": 2**20, "Gi": 2**30, "Ti": 2**40, "Pi": 2**50, "Ei": 2**60,
+}
+
+
+def parse_quantity(quantity) -> float:
+    """Parse a Kubernetes resource quantity such as 250m, 1.5 or 128Mi"""
+    text = str(quantity).strip()
+    for suffix in ("Ki", "Mi", "Gi", "Ti", "Pi", "Ei", "n", "u", "m", "k", "M", "G", "T", "P", "E"):
+        if text.endswith(suffix):
+            return float(text[:-len(suffix)]) * _QUANTITY_SUFFIXES[suffix]
+    return float(text or 0)
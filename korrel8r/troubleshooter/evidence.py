@@ -0,0 +1,245 @@
+"""
+Fetch-once evidence bundle for a single pod analysis
+====================================================
+An analysis used to fetch the same pod several times in different formats:
+`oc describe pod`, `oc get pod -o json` for resources, a jsonpath query for
+the phase. EvidenceBundle fetches the pod object, its events and its current
+usage once (in parallel) and derives the describe text, status, resources and
+conditions locally, so every consumer reads from the same snapshot.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from troubleshooter import collector
+
+
+class EvidenceBundle:
+    """Pod object, events and usage for one pod, with derived views"""
+
+    def __init__(self, namespace: str, pod_name: str, pod: Optional[Dict] = None,
+                 events: Optional[List[Dict]] = None, usage: Optional[Dict[str, str]] = None,
+                 error: Optional[str] = None):
+        self.namespace = namespace
+        self.pod_name = pod_name
+        self.pod = pod or {}
+        self.events = events or []
+        self.usage = usage or {"cpu": "N/A", "memory": "N/A"}
+        self.error = error
+
+    @classmethod
+    def fetch(cls, namespace: str, pod_name: str) -> "EvidenceBundle":
+        """Fetch the pod, its events and its usage in parallel"""
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            pod = executor.submit(collector.get_pod, namespace, pod_name)
+            events = executor.submit(collector.get_events, namespace, pod_name)
+            usage = executor.submit(collector.get_pod_usage, namespace, pod_name)
+        bundle = cls(namespace, pod_name, usage=usage.result())
+        try:
+            bundle.pod = pod.result()
+        except collector.CollectorError as e:
+            bundle.error = str(e)
+        try:
+            bundle.events = events.result()
+        except collector.CollectorError:
+            pass  # Events are best effort, the pod is what matters
+        return bundle
+
+    @property
+    def spec(self) -> Dict:
+        return self.pod.get("spec", {})
+
+    @property
+    def pod_status(self) -> Dict:
+        return self.pod.get("status", {})
+
+    def status(self) -> str:
+        """Pod phase"""
+        return self.pod_status.get("phase", "Unknown")
+
+    def display_status(self) -> str:
+        """Status as shown by `oc get pods`, e.g. CrashLoopBackOff"""
+        return collector.pod_display_status(self.pod) if self.pod else "Unknown"
+
+    def conditions(self) -> List[Dict]:
+        return self.pod_status.get("conditions", [])
+
+    def node_name(self) -> Optional[str]:
+        return self.spec.get("nodeName")
+
+    def owner_references(self) -> List[Dict]:
+        return self.pod.get("metadata", {}).get("ownerReferences", [])
+
+    def restart_count(self) -> int:
+        return sum(cs.get("restartCount", 0) for cs in self.pod_status.get("containerStatuses", []))
+
+    def resources(self) -> Dict:
+        """Requests, limits and current usage in the shape of analyze_resource_consumption()"""
+        if self.error:
+            return {"error": f"Failed to get pod info: {self.error}"}
+        containers = self.spec.get("containers", [])
+        resource_info = {
+            "requests": {"cpu": "0", "memory": "0"},
+            "limits": {"cpu": "0", "memory": "0"},
+            "containers": len(containers)
+        }
+        for container in containers:
+            resources = container.get("resources", {})
+            for kind in ("requests", "limits"):
+                for resource in ("cpu", "memory"):
+                    if resource in resources.get(kind, {}):
+                        resource_info[kind][resource] = resources[kind][resource]
+        resource_info["current"] = dict(self.usage)
+        return resource_info
+
+    def failure_text(self) -> str:
+        """What the pod says about its failure, for categorize_error: status, container state reasons and
+        messages, failing condition messages and warning event messages"""
+        texts = [self.display_status()]
+        for cs in self.pod_status.get("initContainerStatuses", []) + self.pod_status.get("containerStatuses", []):
+            for state in (cs.get("state", {}), cs.get("lastState", {})):
+                for detail in state.values():
+                    if isinstance(detail, dict):
+                        texts += [detail.get("reason", ""), detail.get("message", "")]
+        texts += [c.get("message", "") for c in self.conditions() if c.get("status") == "False"]
+        texts += [e.get("message", "") for e in self.events if e.get("type") == "Warning"]
+        return "\n".join(filter(None, texts))
+
+    def events_table(self) -> str:
+        """Events as an `oc get events` table, empty if there are none"""
+        return collector.format_events(self.events) if self.events else ""
+
+    def describe(self) -> str:
+        """Text equivalent to `oc describe pod`, built from the fetched objects"""
+        if self.error:
+            return f"Error: {self.error}"
+        metadata, spec, status = self.pod.get("metadata", {}), self.spec, self.pod_status
+        lines = [
+            f"Name:             {metadata.get('name', self.pod_name)}",
+            f"Namespace:        {metadata.get('namespace', self.namespace)}",
+            f"Priority:         {spec.get('priority', 0)}",
+            f"Service Account:  {spec.get('serviceAccountName', 'default')}",
+            f"Node:             {self.node_name() or '<none>'}" + (f"/{status['hostIP']}" if status.get("hostIP") else ""),
+            f"Start Time:       {status.get('startTime', '<unset>')}",
+        ]
+        lines += _labelled("Labels:           ", metadata.get("labels", {}))
+        lines += [f"Status:           {'Terminating' if metadata.get('deletionTimestamp') else self.status()}"]
+        if status.get("reason"):
+            lines.append(f"Reason:           {status['reason']}")
+        if status.get("message"):
+            lines.append(f"Message:          {status['message']}")
+        lines.append(f"IP:               {status.get('podIP', '')}")
+        for owner in self.owner_references():
+            if owner.get("controller"):
+                lines.append(f"Controlled By:    {owner.get('kind')}/{owner.get('name')}")
+
+        statuses = {cs.get("name"): cs for cs in status.get("initContainerStatuses", [])}
+        if spec.get("initContainers"):
+            lines.append("Init Containers:")
+            for container in spec["initContainers"]:
+                lines += _describe_container(container, statuses.get(container.get("name"), {}))
+        statuses = {cs.get("name"): cs for cs in status.get("containerStatuses", [])}
+        lines.append("Containers:")
+        for container in spec.get("containers", []):
+            lines += _describe_container(container, statuses.get(container.get("name"), {}))
+
+        lines.append("Conditions:")
+        lines.append("  Type              Status")
+        for condition in self.conditions():
+            lines.append(f"  {condition.get('type', ''):<17} {condition.get('status', '')}")
+        lines.append("Volumes:")
+        for volume in spec.get("volumes", []):
+            kinds = [k for k in volume if k != "name"]
+            lines.append(f"  {volume.get('name')}:")
+            lines.append(f"    Type:  {kinds[0] if kinds else 'unknown'}")
+        lines.append(f"QoS Class:        {status.get('qosClass', '')}")
+        lines += _labelled("Node-Selectors:   ", spec.get("nodeSelector", {}))
+        tolerations = [_toleration(t) for t in spec.get("tolerations", [])]
+        lines.append("Tolerations:      " + ("\n                  ".join(tolerations) if tolerations else "<none>"))
+        lines.append("Events:" + ("\n" + _indent(self.events_table()) if self.events else "           <none>"))
+        return "\n".join(lines) + "\n"
+
+
+def _labelled(title: str, values: Dict) -> List[str]:
+    if not values:
+        return [f"{title}<none>"]
+    pad = " " * len(title)
+    return [(title if i == 0 else pad) + f"{k}={v}" for i, (k, v) in enumerate(sorted(values.items()))]
+
+
+def _toleration(toleration: Dict) -> str:
+    text = toleration.get("key", "")
+    if toleration.get("operator") == "Exists":
+        text += " op=Exists"
+    elif toleration.get("value"):
+        text += f"={toleration['value']}"
+    if toleration.get("effect"):
+        text += f":{toleration['effect']}"
+    if toleration.get("tolerationSeconds") is not None:
+        text += f" for {toleration['tolerationSeconds']}s"
+    return text or "op=Exists"
+
+
+def _state(state: Dict) -> List[str]:
+    for kind, details in state.items():
+        lines = [f"{kind.capitalize()}"]
+        for key in ("reason", "message", "exitCode", "startedAt", "finishedAt"):
+            if key in details:
+                label = {"exitCode": "Exit Code", "startedAt": "Started", "finishedAt": "Finished"}.get(key, key.capitalize())
+                lines.append(f"  {label}:  {details[key]}")
+        return lines
+    return []
+
+
+def _describe_container(container: Dict, status: Dict) -> List[str]:
+    lines = [f"  {container.get('name')}:",
+             f"    Image:          {container.get('image', '')}"]
+    if container.get("command"):
+        lines.append(f"    Command:        {' '.join(container['command'])}")
+    if container.get("args"):
+        lines.append(f"    Args:           {' '.join(a.strip() for a in container['args'])}")
+    for port in container.get("ports", []):
+        lines.append(f"    Port:           {port.get('containerPort')}/{port.get('protocol', 'TCP')}")
+    state = _state(status.get("state", {}))
+    if state:
+        lines.append(f"    State:          {state[0]}")
+        lines += [f"      {line.strip()}" for line in state[1:]]
+    last_state = _state(status.get("lastState", {}))
+    if last_state:
+        lines.append(f"    Last State:     {last_state[0]}")
+        lines += [f"      {line.strip()}" for line in last_state[1:]]
+    if status:
+        lines.append(f"    Ready:          {status.get('ready', False)}")
+        lines.append(f"    Restart Count:  {status.get('restartCount', 0)}")
+    resources = container.get("resources", {})
+    for kind in ("limits", "requests"):
+        if resources.get(kind):
+            lines.append(f"    {kind.capitalize()}:")
+            lines += [f"      {k}:  {v}" for k, v in sorted(resources[kind].items())]
+    for probe in ("livenessProbe", "readinessProbe", "startupProbe"):
+        if container.get(probe):
+            lines.append(f"    {probe[:-5].capitalize()}:  {_probe(container[probe])}")
+    env = container.get("env", [])
+    lines.append("    Environment:    " + ("<none>" if not env else ""))
+    lines += [f"      {e.get('name')}:  {e['value'] if 'value' in e else '<set from source>'}" for e in env]
+    mounts = container.get("volumeMounts", [])
+    lines.append("    Mounts:" + ("         <none>" if not mounts else ""))
+    lines += [f"      {m.get('mountPath')} from {m.get('name')} ({'ro' if m.get('readOnly') else 'rw'})" for m in mounts]
+    return lines
+
+
+def _probe(probe: Dict) -> str:
+    if "httpGet" in probe:
+        action = f"http-get {probe['httpGet'].get('path', '/')} on port {probe['httpGet'].get('port')}"
+    elif "tcpSocket" in probe:
+        action = f"tcp-socket :{probe['tcpSocket'].get('port')}"
+    elif "exec" in probe:
+        action = f"exec {probe['exec'].get('command', [])}"
+    else:
+        action = "unknown"
+    return (f"{action} delay={probe.get('initialDelaySeconds', 0)}s timeout={probe.get('timeoutSeconds', 1)}s "
+            f"period={probe.get('periodSeconds', 10)}s #failure={probe.get('failureThreshold', 3)}")
+
+
+def _indent(text: str) -> str:
+    return "\n".join("  " + line for line in text.rstrip("\n").split("\n"))
@@ -0,0 +1,137 @@
+"""
+Adjacency index over a korrel8r graph
+=====================================
+A correlation result was json.dumps'd into the prompt, and any view that
+wanted "logs reachable from this pod" or "alerts within 2 hops" would have
+had to walk the raw JSON again. GraphIndex loads a Graph once into compact
+arrays: class names are interned and numbered, each node is an integer, and
+edges are stored CSR-style (an offsets array per node into one targets
+array), forwards and backwards. Breadth-first search, goal filtering and
+grouping by domain then run over small integer arrays, in microseconds, as
+many times as the UI tabs and the prompt builder need.
+"""
+
+import sys
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from troubleshooter import korrel8r
+
+QUERIES_PER_CLASS = 3  # Example queries kept per class in digest()
+
+
+def _csr(rows: List[List[int]]) -> Tuple[array, array]:
+    """(offsets, targets) of adjacency lists, each list sorted and without duplicates"""
+    offsets, targets = array("i", [0]), array("i")
+    for row in rows:
+        targets.extend(sorted(set(row)))
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+class GraphIndex:
+    """Integer-indexed, CSR adjacency view of one korrel8r Graph"""
+
+    def __init__(self, graph: korrel8r.Graph):
+        self.graph = graph
+        self.partial = graph.partial
+        self.classes: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for name in [n.class_name for n in graph.nodes] + [c for e in graph.edges for c in (e.start, e.goal)]:
+            self._intern(name)
+        domains: Dict[str, int] = {}
+        self.domains: List[str] = []
+        self.domain_ids = array("i")
+        for name in self.classes:
+            domain = sys.intern(korrel8r.domain_of(name))
+            if domain not in domains:
+                domains[domain] = len(self.domains)
+                self.domains.append(domain)
+            self.domain_ids.append(domains[domain])
+        self.counts = array("q", [0] * len(self.classes))
+        self.nodes: List[Optional[korrel8r.Node]] = [None] * len(self.classes)
+        for node in graph.nodes:
+            self.counts[self.ids[node.class_name]] = node.count
+            self.nodes[self.ids[node.class_name]] = node
+        forward: List[List[int]] = [[] for _ in self.classes]
+        backward: List[List[int]] = [[] for _ in self.classes]
+        for edge in graph.edges:
+            start, goal = self.ids[edge.start], self.ids[edge.goal]
+            forward[start].append(goal)
+            backward[goal].append(start)
+        self.offsets, self.targets = _csr(forward)
+        self.reverse_offsets, self.reverse_targets = _csr(backward)
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "GraphIndex":
+        return cls(korrel8r.Graph.from_json(data))
+
+    def _intern(self, name: str) -> int:
+        if name not in self.ids:
+            self.ids[name] = len(self.classes)
+            self.classes.append(sys.intern(name))
+        return self.ids[name]
+
+    def __len__(self) -> int:
+        return len(self.classes)
+
+    def __contains__(self, class_name: str) -> bool:
+        return class_name in self.ids
+
+    def domain(self, node: int) -> str:
+        return self.domains[self.domain_ids[node]]
+
+    def successors(self, node: int) -> Sequence[int]:
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def predecessors(self, node: int) -> Sequence[int]:
+        return self.reverse_targets[self.reverse_offsets[node]:self.reverse_offsets[node + 1]]
+
+    def bfs(self, starts: Iterable[str], max_depth: Optional[int] = None, reverse: bool = False) -> Dict[int, int]:
+        """Hops from the nearest start class to every node reached, following edges backwards if reverse"""
+        offsets, targets = (self.reverse_offsets, self.reverse_targets) if reverse else (self.offsets, self.targets)
+        hops = {self.ids[s]: 0 for s in starts if s in self.ids}
+        queue = deque(hops)
+        while queue:
+            node = queue.popleft()
+            depth = hops[node]
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for i in range(offsets[node], offsets[node + 1]):
+                target = targets[i]
+                if target not in hops:
+                    hops[target] = depth + 1
+                    queue.append(target)
+        return hops
+
+    def reachable(self, start: str, max_depth: Optional[int] = None, domain: Optional[str] = None,
+                  goals: Optional[Iterable[str]] = None, with_results: bool = True) -> List[str]:
+        """Classes reachable from start, nearest first, optionally only of one domain or on a path to goals"""
+        hops = self.bfs([start], max_depth)
+        if goals is not None:
+            on_path = self.bfs(goals, reverse=True)
+            hops = {node: depth for node, depth in hops.items() if node in on_path}
+        return [self.classes[node] for node, _ in sorted(hops.items(), key=lambda item: (item[1], item[0]))
+                if (domain is None or self.domain(node) == domain) and (not with_results or self.counts[node])]
+
+    def by_domain(self, classes: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """Classes grouped by domain, all classes if none given"""
+        groups: Dict[str, List[str]] = {}
+        for name in self.classes if classes is None else classes:
+            groups.setdefault(self.domain(self.ids[name]), []).append(name)
+        return groups
+
+    def digest(self, start: str, max_depth: Optional[int] = None,
+               queries: int = QUERIES_PER_CLASS) -> Dict[str, List[Dict]]:
+        """What start leads to, by domain: each class with results, its count, hops away and example queries"""
+        hops = self.bfs([start], max_depth)
+        digest: Dict[str, List[Dict]] = {}
+        for node, depth in sorted(hops.items(), key=lambda item: (item[1], item[0])):
+            if not depth or not self.counts[node]:
+                continue
+            found = self.nodes[node]
+            examples = [q.query for q in sorted(found.queries, key=lambda q: -(q.count or 0))[:queries]] if found else []
+            digest.setdefault(self.domain(node), []).append(
+                {"class": self.classes[node], "count": self.counts[node], "hops": depth, "queries": examples})
+        return digest
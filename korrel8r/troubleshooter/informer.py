@@ -0,0 +1,196 @@
+"""
+Watch-based informer cache for namespaces, pods and pod phases
+==============================================================
+Streamlit reruns the whole script on every widget click, so the sidebars used
+to LIST namespaces and pods and GET the selected pod on every interaction.
+The informers here do one LIST per resource and then keep a WATCH open,
+maintaining an in-memory index of namespace -> pod -> phase that the sidebars
+read without touching the API server.
+
+Informers need the API backend of the collector; with the oc fallback backend,
+or when TROUBLESHOOTER_INFORMERS=0, the lookup functions below go straight to
+the collector instead. They also fall back at once while an informer's LIST
+fails (e.g. 403 for namespace-scoped RBAC), and once its LIST or WATCH has
+failed STALE_AFTER times in a row, rather than serving a cache that stopped
+following the cluster.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional
+
+from troubleshooter import collector
+
+SYNC_TIMEOUT = 5  # Seconds a reader waits for the first LIST before falling back
+WATCH_TIMEOUT = 300  # Seconds before the server ends a watch and we resume it
+RETRY_BACKOFF = (1, 2, 5, 10, 30)
+STALE_AFTER = 3  # Failures in a row after which the cache is no longer served
+
+
+class Informer:
+    """Lists a collection once, then follows a watch to keep a projection of each object"""
+
+    def __init__(self, backend: collector.APIBackend, path: str, project=lambda obj: None):
+        self.backend = backend
+        self.path = path
+        self.project = project
+        self.error: Optional[str] = None
+        self._items: Dict[str, Dict[str, object]] = {}  # namespace -> name -> projection
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._tried = threading.Event()  # The first LIST succeeded or failed
+        self._stopped = threading.Event()
+        self._resource_version: Optional[str] = None
+        self._thread = threading.Thread(target=self._run, name=f"informer:{path}", daemon=True)
+
+    def start(self) -> "Informer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def wait_synced(self, timeout: float = SYNC_TIMEOUT) -> bool:
+        """Wait for the first list attempt, True if the cache is usable"""
+        self._tried.wait(timeout)
+        return self._synced.is_set()
+
+    def names(self, namespace: str = "") -> List[str]:
+        """Sorted object names in a namespace, "" for cluster-scoped objects"""
+        with self._lock:
+            return sorted(self._items.get(namespace, {}))
+
+    def get(self, namespace: str, name: str):
+        """Projection of one object, None if it is not in the cache"""
+        with self._lock:
+            return self._items.get(namespace, {}).get(name)
+
+    def _store(self, items: Dict[str, Dict[str, object]], obj: Dict, deleted: bool = False) -> None:
+        metadata = obj.get("metadata", {})
+        namespace, name = metadata.get("namespace", ""), metadata.get("name", "")
+        if deleted:
+            objects = items.get(namespace, {})
+            objects.pop(name, None)
+            if not objects:
+                items.pop(namespace, None)
+        else:
+            items.setdefault(namespace, {})[name] = self.project(obj)
+
+    def _run(self) -> None:
+        failures = 0
+        while not self._stopped.is_set():
+            try:
+                if self._resource_version is None:
+                    self._list()
+                self._watch()
+                failures = 0
+            except (collector.CollectorError, ValueError) as e:
+                self.error = str(e)
+                self._resource_version = None
+                self._tried.set()
+                if failures + 1 >= STALE_AFTER:
+                    self._synced.clear()  # Readers go to the collector until a LIST succeeds again
+                self._stopped.wait(RETRY_BACKOFF[min(failures, len(RETRY_BACKOFF) - 1)])
+                failures += 1
+
+    def _list(self) -> None:
+        result = self.backend.get_json(self.path)
+        items: Dict[str, Dict[str, object]] = {}
+        for obj in result.get("items", []):
+            self._store(items, obj)
+        with self._lock:
+            self._items = items
+        self._resource_version = result.get("metadata", {}).get("resourceVersion", "")
+        self.error = None
+        self._synced.set()
+        self._tried.set()
+
+    def _watch(self) -> None:
+        for event in self.backend.watch(self.path, self._resource_version, WATCH_TIMEOUT):
+            if self._stopped.is_set():
+                return
+            kind, obj = event.get("type"), event.get("object", {})
+            if kind == "ERROR":
+                # Usually 410 Gone: our resourceVersion is too old, start over with a fresh list.
+                self._resource_version = None
+                return
+            if kind in ("ADDED", "MODIFIED", "DELETED"):
+                with self._lock:
+                    self._store(self._items, obj, deleted=kind == "DELETED")
+            self._resource_version = obj.get("metadata", {}).get("resourceVersion", self._resource_version)
+
+
+class ClusterIndex:
+    """Namespaces and pod phases for the whole cluster, kept current by two watches"""
+
+    def __init__(self, backend: collector.APIBackend):
+        self.backend = backend
+        self.namespace_informer = Informer(backend, "/api/v1/namespaces").start()
+        self.pod_informer = Informer(backend, "/api/v1/pods", project=_pod_phase).start()
+
+    def stop(self) -> None:
+        self.namespace_informer.stop()
+        self.pod_informer.stop()
+
+    def namespaces(self, timeout: float = SYNC_TIMEOUT) -> Optional[List[str]]:
+        """Sorted namespace names, None if the cache is not synced"""
+        if not self.namespace_informer.wait_synced(timeout):
+            return None
+        return self.namespace_informer.names()
+
+    def pods(self, namespace: str, timeout: float = SYNC_TIMEOUT) -> Optional[List[str]]:
+        """Sorted pod names in a namespace, None if the cache is not synced"""
+        if not self.pod_informer.wait_synced(timeout):
+            return None
+        return self.pod_informer.names(namespace)
+
+    def phase(self, namespace: str, pod: str, timeout: float = SYNC_TIMEOUT) -> Optional[str]:
+        """Phase of a pod, None if the cache is not synced or has not seen the pod"""
+        if not self.pod_informer.wait_synced(timeout):
+            return None
+        return self.pod_informer.get(namespace, pod)
+
+
+def _pod_phase(pod: Dict) -> str:
+    return pod.get("status", {}).get("phase", "Unknown")
+
+
+_index: Optional[ClusterIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[ClusterIndex]:
+    """Return the process-wide index for the current collector backend, None if informers are unavailable"""
+    global _index
+    if os.environ.get("TROUBLESHOOTER_INFORMERS", "1").lower() in ("0", "false", "no"):
+        return None
+    backend = collector.get_backend()
+    if not isinstance(backend, collector.APIBackend):
+        return None
+    with _index_lock:
+        if _index is None or _index.backend is not backend:
+            if _index is not None:
+                _index.stop()  # The collector switched clusters
+            _index = ClusterIndex(backend)
+        return _index
+
+
+def get_namespaces() -> List[str]:
+    """Sorted namespace names from the informer cache, or from the collector"""
+    index = get_index()
+    namespaces = index.namespaces() if index else None
+    return namespaces if namespaces is not None else collector.get_namespaces()
+
+
+def get_pods_in_namespace(namespace: str) -> List[str]:
+    """Sorted pod names in a namespace from the informer cache, or from the collector"""
+    index = get_index()
+    pods = index.pods(namespace) if index else None
+    return pods if pods is not None else collector.get_pods_in_namespace(namespace)
+
+
+def get_pod_status(namespace: str, pod: str) -> str:
+    """Pod phase from the informer cache, or from the collector for pods it has not seen"""
+    index = get_index()
+    phase = index.phase(namespace, pod) if index else None
+    return phase if phase is not None else collector.get_pod_status(namespace, pod)
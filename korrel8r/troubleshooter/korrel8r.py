@@ -0,0 +1,559 @@
+"""
+Typed korrel8r REST client
+==========================
+The CLI used to GET /objects and then a /neighbours path that does not exist,
+with a `query` parameter, each on its own connection, and swallowed every
+error. The graph endpoints of doc/korrel8r-openapi.yaml take a POST with a
+JSON body instead: a Neighbours search (start objects and a depth) or a Goals
+search (start objects and goal classes), with GraphOptions as query
+parameters. One such request returns the whole cross-domain neighbourhood of
+a pod (events, logs, alerts, metrics, its node) as a Graph.
+
+Korrel8rClient builds those bodies from Start, Neighbours and Goals, sends
+them over one pooled session and parses the response into Graph, Node, Edge,
+Rule and QueryCount. Transport errors, HTTP errors and malformed responses
+all raise Korrel8rError, with the server's error message when it sent one.
+
+A Start holds any number of queries, so the *_each methods correlate many
+pods with one request (one server traversal) and split_graph() divides the
+result per start query. The graph does not say which start a result came
+from, so a query is attributed to the starts whose namespace and name it
+mentions, which is how the k8s, log, alert, metric and event rules build
+queries from a pod. Queries that name no start, or several (a shared node,
+a second hop), are returned separately as the shared part.
+
+korrel8r answers 206 with a partial graph when a traversal is interrupted by
+store timeouts or limits. Such a graph is returned, with partial set, rather
+than treated as an error. neighbours_progressive() goes further: it hands
+back the partial graph at once and, in the background, asks for each
+missing class of FOLLOW_UP_GOALS with its own, narrower goals search,
+merging the answers into the graph as they arrive.
+
+Given a cache (see korrel8rcache.QueryCache), the client serves /objects,
+graph and goal-list requests from it and stores every complete answer. A
+Start can carry the resourceVersion of its start objects, which is part of
+the cache key but never sent.
+"""
+
+import json
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+import urllib3
+import yaml
+from requests.adapters import HTTPAdapter
+
+API_PATH = "/api/v1alpha1"
+POD_CLASS = "k8s:Pod.v1"
+TIMEOUT = 10  # Seconds
+DEPTH = 2  # Pod -> logs, alerts, events, node -> what those lead to
+_TOKEN = re.compile(r"[\w.-]+")  # Kubernetes names are DNS labels and subdomains
+# Signals worth a narrower search of their own when a neighbourhood search comes back partial
+FOLLOW_UP_GOALS = ["log:application", "log:infrastructure", "alert:alert", "k8s:Event.v1", "metric:metric",
+                   "trace:span"]
+FOLLOW_UP_WORKERS = 4
+
+
+class Korrel8rError(Exception):
+    """A korrel8r request failed; status is the HTTP status if there was a response"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def pod_query(namespace: str, name: str) -> str:
+    """Query for one pod"""
+    return f"{POD_CLASS}:" + json.dumps({"namespace": namespace, "name": name}, separators=(",", ":"))
+
+
+def split_query(query: str) -> Tuple[str, str]:
+    """(class, selector) of a DOMAIN:CLASS:SELECTOR query"""
+    domain, _, rest = query.partition(":")
+    name, _, selector = rest.partition(":")
+    return f"{domain}:{name}", selector
+
+
+def domain_of(class_name: str) -> str:
+    return class_name.partition(":")[0]
+
+
+def _identity(query: str) -> Optional[Tuple[str, str]]:
+    """(namespace, name) of the selector of a start query, None if it names nothing"""
+    try:
+        selector = yaml.safe_load(split_query(query)[1])
+    except yaml.YAMLError:
+        return None
+    if not isinstance(selector, dict) or not selector.get("name"):
+        return None
+    return str(selector.get("namespace") or ""), str(selector["name"])
+
+
+class GraphOptions:
+    """Options controlling the form of a returned graph, sent as query parameters"""
+
+    def __init__(self, rules: bool = False, zeros: bool = False):
+        self.rules = rules  # Include the rules followed on each edge
+        self.zeros = zeros  # Include queries that returned nothing
+
+    def params(self) -> Dict[str, str]:
+        return {name: "true" for name, value in (("rules", self.rules), ("zeros", self.zeros)) if value}
+
+
+class Start:
+    """Starting objects of a search, given as queries and/or serialized objects of one class"""
+
+    def __init__(self, queries: Optional[List[str]] = None, objects: Optional[List[Dict]] = None,
+                 class_name: Optional[str] = None, constraint: Optional[Dict] = None,
+                 versions: Optional[Dict[str, str]] = None):
+        self.queries = list(queries or [])
+        self.objects = list(objects or [])
+        self.class_name = class_name
+        self.constraint = constraint  # start, end (RFC 3339), limit, timeout (Go duration)
+        self.versions = dict(versions or {})  # resourceVersion per start query, for caching only
+
+    @classmethod
+    def pods(cls, namespace: str, names: List[str], constraint: Optional[Dict] = None,
+             versions: Optional[Dict[str, str]] = None) -> "Start":
+        """Start at the named pods; versions maps pod names to their resourceVersion"""
+        versions = versions or {}
+        return cls([pod_query(namespace, name) for name in names], constraint=constraint,
+                   versions={pod_query(namespace, name): versions[name] for name in names if versions.get(name)})
+
+    def to_json(self) -> Dict:
+        body: Dict = {}
+        if self.class_name:
+            body["class"] = self.class_name
+        if self.queries:
+            body["queries"] = self.queries
+        if self.objects:
+            body["objects"] = self.objects
+        if self.constraint:
+            body["constraint"] = self.constraint
+        return body
+
+
+class Neighbours:
+    """Body of a neighbourhood search: everything within depth edges of the start objects"""
+
+    def __init__(self, start: Start, depth: int = DEPTH):
+        self.start = start
+        self.depth = depth
+
+    def to_json(self) -> Dict:
+        return {"start": self.start.to_json(), "depth": self.depth}
+
+
+class Goals:
+    """Body of a goals search: the paths from the start objects to objects of the goal classes"""
+
+    def __init__(self, start: Start, goals: List[str]):
+        self.start = start
+        self.goals = list(goals)
+
+    def to_json(self) -> Dict:
+        return {"start": self.start.to_json(), "goals": self.goals}
+
+
+class QueryCount:
+    """A query and its number of results, None if it was not run"""
+
+    def __init__(self, query: str, count: Optional[int] = None):
+        self.query = query
+        self.count = count
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "QueryCount":
+        return cls(data["query"], data.get("count"))
+
+    def to_json(self) -> Dict:
+        return {"query": self.query} if self.count is None else {"query": self.query, "count": self.count}
+
+
+class Rule:
+    """A rule followed along an edge, with the queries it generated"""
+
+    def __init__(self, name: str, queries: Optional[List[QueryCount]] = None):
+        self.name = name
+        self.queries = queries or []
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "Rule":
+        return cls(data["name"], [QueryCount.from_json(q) for q in data.get("queries") or []])
+
+    def to_json(self) -> Dict:
+        body: Dict = {"name": self.name}
+        if self.queries:
+            body["queries"] = [q.to_json() for q in self.queries]
+        return body
+
+
+class Node:
+    """Results for one class: total count and the queries that produced them"""
+
+    def __init__(self, class_name: str, count: int = 0, queries: Optional[List[QueryCount]] = None):
+        self.class_name = class_name
+        self.count = count
+        self.queries = queries or []
+
+    @property
+    def domain(self) -> str:
+        return domain_of(self.class_name)
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "Node":
+        return cls(data["class"], data.get("count") or 0, [QueryCount.from_json(q) for q in data.get("queries") or []])
+
+    def to_json(self) -> Dict:
+        body: Dict = {"class": self.class_name, "count": self.count}
+        if self.queries:
+            body["queries"] = [q.to_json() for q in self.queries]
+        return body
+
+
+class Edge:
+    """Directed edge between two classes, with the rules followed if requested"""
+
+    def __init__(self, start: str, goal: str, rules: Optional[List[Rule]] = None):
+        self.start = start
+        self.goal = goal
+        self.rules = rules or []
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "Edge":
+        return cls(data["start"], data["goal"], [Rule.from_json(r) for r in data.get("rules") or []])
+
+    def to_json(self) -> Dict:
+        body: Dict = {"start": self.start, "goal": self.goal}
+        if self.rules:
+            body["rules"] = [r.to_json() for r in self.rules]
+        return body
+
+
+class Graph:
+    """Correlation graph: one node per class, edges between classes; partial if the search was interrupted"""
+
+    def __init__(self, nodes: Optional[List[Node]] = None, edges: Optional[List[Edge]] = None,
+                 partial: bool = False):
+        self.nodes = nodes or []
+        self.edges = edges or []
+        self.partial = partial
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "Graph":
+        return cls([Node.from_json(n) for n in data.get("nodes") or []],
+                   [Edge.from_json(e) for e in data.get("edges") or []])
+
+    def to_json(self) -> Dict:
+        return {"nodes": [n.to_json() for n in self.nodes], "edges": [e.to_json() for e in self.edges]}
+
+    def node(self, class_name: str) -> Optional[Node]:
+        return next((n for n in self.nodes if n.class_name == class_name), None)
+
+    def by_domain(self) -> Dict[str, List[Node]]:
+        """Nodes with results, grouped by domain"""
+        domains: Dict[str, List[Node]] = {}
+        for node in self.nodes:
+            if node.count:
+                domains.setdefault(node.domain, []).append(node)
+        return domains
+
+    def summary(self) -> Dict[str, int]:
+        """Result count per class, for prompts and tables"""
+        return {node.class_name: node.count for node in self.nodes if node.count}
+
+    def merge(self, other: "Graph") -> "Graph":
+        """Union of two graphs; a query found in both counts once, with its larger count"""
+        nodes: Dict[str, Dict[str, QueryCount]] = {}
+        for node in self.nodes + other.nodes:
+            queries = nodes.setdefault(node.class_name, {})
+            for q in node.queries:
+                known = queries.get(q.query)
+                if known is None or (q.count or 0) > (known.count or 0):
+                    queries[q.query] = q
+        counts = {node.class_name: node.count for node in self.nodes}
+        for node in other.nodes:
+            counts[node.class_name] = max(counts.get(node.class_name, 0), node.count)
+        merged_nodes = [Node(name, sum(q.count or 0 for q in queries.values()) if queries else counts[name],
+                             list(queries.values())) for name, queries in nodes.items()]
+        edges: Dict[Tuple[str, str], Dict[str, Dict[str, QueryCount]]] = {}
+        for edge in self.edges + other.edges:
+            rules = edges.setdefault((edge.start, edge.goal), {})
+            for rule in edge.rules:
+                queries = rules.setdefault(rule.name, {})
+                for q in rule.queries:
+                    queries.setdefault(q.query, q)
+        merged_edges = [Edge(start, goal, [Rule(name, list(queries.values())) for name, queries in rules.items()])
+                        for (start, goal), rules in edges.items()]
+        return Graph(merged_nodes, merged_edges, self.partial and other.partial)
+
+
+def _subgraph(graph: Graph, queries: Dict[str, List[QueryCount]], rule_queries: Dict[Tuple[str, str, str], List],
+              dangling: bool = False) -> Graph:
+    """The part of graph made of the given queries per class and per (start, goal, rule), with counts recomputed.
+
+    Edges need both ends in the part, or only the goal if dangling is set.
+    """
+    nodes = [Node(node.class_name, sum(q.count or 0 for q in queries[node.class_name]), queries[node.class_name])
+             for node in graph.nodes if queries.get(node.class_name)]
+    classes = {node.class_name for node in nodes}
+    edges = []
+    for edge in graph.edges:
+        if edge.goal in classes and (dangling or edge.start in classes):
+            rules = [Rule(r.name, rule_queries.get((edge.start, edge.goal, r.name), [])) for r in edge.rules]
+            edges.append(Edge(edge.start, edge.goal,
+                              [r for r, original in zip(rules, edge.rules) if r.queries or not original.queries]))
+    return Graph(nodes, edges, graph.partial)
+
+
+def split_graph(graph: Graph, starts: List[str]) -> Tuple[Dict[str, Graph], Graph]:
+    """The graph of each start query, and the shared part that cannot be attributed to a single start"""
+    by_name: Dict[str, List[Tuple[str, str]]] = {}
+    for start in starts:
+        identity = _identity(start)
+        if identity:
+            by_name.setdefault(identity[1], []).append((start, identity[0]))
+    start_set = set(starts)
+    owners: Dict[str, Optional[str]] = {}
+
+    def owner(query: str) -> Optional[str]:
+        """The only start a query belongs to, None if it is shared"""
+        if query not in owners:
+            # Names are whole tokens: pod "app" must not claim the results of pod "app-0"
+            tokens = set(_TOKEN.findall(query))
+            found = {start for name in tokens & by_name.keys() for start, namespace in by_name[name]
+                     if not namespace or namespace in tokens}
+            if query in start_set:
+                found = {query}
+            owners[query] = found.pop() if len(found) == 1 else None
+        return owners[query]
+
+    # One pass over the queries, each bucketed under its start or None
+    node_queries: Dict[Optional[str], Dict[str, List[QueryCount]]] = {}
+    for node in graph.nodes:
+        for q in node.queries:
+            node_queries.setdefault(owner(q.query), {}).setdefault(node.class_name, []).append(q)
+    rule_queries: Dict[Optional[str], Dict[Tuple[str, str, str], List[QueryCount]]] = {}
+    for edge in graph.edges:
+        for rule in edge.rules:
+            for q in rule.queries:
+                rule_queries.setdefault(owner(q.query), {}).setdefault((edge.start, edge.goal, rule.name), []).append(q)
+    per_start = {start: _subgraph(graph, node_queries.get(start, {}), rule_queries.get(start, {}))
+                 for start in starts}
+    shared = _subgraph(graph, node_queries.get(None, {}), rule_queries.get(None, {}), dangling=True)
+    return per_start, shared
+
+
+class ProgressiveGraph:
+    """A graph that may still be growing: the first answer, merged with follow-up searches as they complete"""
+
+    def __init__(self, graph: Graph, on_update: Optional[Callable[[Graph], None]] = None):
+        self._graph = graph
+        self._lock = threading.Lock()
+        self._futures: List[Future] = []
+        self.on_update = on_update
+        self.errors: List[str] = []
+
+    @property
+    def graph(self) -> Graph:
+        """Everything found so far"""
+        with self._lock:
+            return self._graph
+
+    def follow(self, future: "Future[Graph]") -> None:
+        """Merge the graph of a follow-up search when it arrives"""
+        self._futures.append(future)
+        future.add_done_callback(self._merge)
+
+    def _merge(self, future: "Future[Graph]") -> None:
+        try:
+            found = future.result()
+        except Exception as e:  # A failed follow-up only means the graph stays partial
+            with self._lock:
+                self.errors.append(str(e))
+            return
+        with self._lock:
+            # Stays partial: the follow-ups only cover the classes they were asked for
+            self._graph = self._graph.merge(Graph(found.nodes, found.edges, True))
+            graph = self._graph
+        if self.on_update:
+            self.on_update(graph)
+
+    def done(self) -> bool:
+        return all(f.done() for f in self._futures)
+
+    def wait(self, timeout: Optional[float] = None) -> Graph:
+        """The graph once the follow-ups finish or the timeout passes"""
+        wait(self._futures, timeout)
+        return self.graph
+
+    def cancel(self) -> None:
+        """Drop the follow-ups that have not started"""
+        for future in self._futures:
+            future.cancel()
+
+
+class Korrel8rClient:
+    """Client of one korrel8r server over a single pooled HTTP session"""
+
+    def __init__(self, url: str, token: Optional[str] = None, verify=True, timeout: float = TIMEOUT,
+                 pool_size: int = 8, cache=None):
+        self.url = url.rstrip("/")
+        self.cache = cache  # A korrel8rcache.QueryCache, or None
+        if not self.url.endswith(API_PATH):
+            self.url += API_PATH
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.verify = verify
+        if verify is False:
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self.session.headers["Accept"] = "application/json"
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Background pool of the follow-up searches, started on first use"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=FOLLOW_UP_WORKERS, thread_name_prefix="korrel8r")
+            return self._executor
+
+    def request(self, method: str, path: str, params: Optional[Dict] = None, body: Optional[Dict] = None,
+                timeout: Optional[float] = None):
+        """Send a request and return the decoded JSON response, raising Korrel8rError on failure"""
+        return self._request(method, path, params, body, timeout)[0]
+
+    def _request(self, method: str, path: str, params: Optional[Dict] = None, body: Optional[Dict] = None,
+                 timeout: Optional[float] = None, partial_ok: bool = False) -> Tuple[object, bool]:
+        """Decoded JSON response and whether it is a 206 partial result (only accepted if partial_ok)"""
+        try:
+            response = self.session.request(method, self.url + path, params=params, json=body,
+                                            timeout=timeout or self.timeout)
+        except requests.RequestException as e:
+            raise Korrel8rError(str(e)) from e
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        partial = partial_ok and response.status_code == 206
+        if response.status_code != 200 and not partial:
+            message = data.get("error") if isinstance(data, dict) else None
+            raise Korrel8rError(f"{response.status_code} {response.reason}: {message or response.text[:200]}",
+                                response.status_code)
+        if data is None:
+            raise Korrel8rError(f"unexpected response: {response.text[:200]}", response.status_code)
+        return data, partial
+
+    def _cached(self, path: str, params: Optional[Dict], body: Optional[Dict], versions: Optional[Dict[str, str]],
+                fetch: Callable[[], Tuple[object, bool]]) -> Tuple[object, bool]:
+        """fetch()'s (data, partial), or the cached data; complete answers are stored"""
+        if self.cache is None:
+            return fetch()
+        url = self.url + path  # Servers differ in stores and rules
+        data = self.cache.lookup(url, params, body, versions)
+        if data is not None:
+            return data, False
+        data, partial = fetch()
+        if not partial:
+            self.cache.store(url, params, body, versions, data)
+        return data, partial
+
+    def domains(self) -> List[str]:
+        """Names of the configured domains"""
+        return [domain["name"] for domain in self.request("GET", "/domains")]
+
+    def objects(self, query: str, version: Optional[str] = None) -> List[Dict]:
+        """Objects matching a query; version is the resourceVersion of the object it names, for caching"""
+        params = {"query": query}
+        return self._cached("/objects", params, None, {query: version} if version else None,
+                            lambda: self._request("GET", "/objects", params))[0]
+
+    def neighbours(self, start: Start, depth: int = DEPTH, options: Optional[GraphOptions] = None,
+                   timeout: Optional[float] = None) -> Graph:
+        """Neighbourhood graph of the start objects, up to depth edges away; partial if korrel8r answered 206"""
+        return self._graph("/graphs/neighbours", Neighbours(start, depth).to_json(), options, timeout, start.versions)
+
+    def neighbours_progressive(self, start: Start, depth: int = DEPTH, options: Optional[GraphOptions] = None,
+                               timeout: Optional[float] = None, follow_up: Optional[List[str]] = None,
+                               on_update: Optional[Callable[[Graph], None]] = None) -> ProgressiveGraph:
+        """The neighbourhood graph at once, completed in the background if it came back partial.
+
+        For a partial graph, each class of follow_up (default FOLLOW_UP_GOALS) without results is searched
+        for with its own goals request, and on_update() is called with the merged graph after each one.
+        """
+        progressive = ProgressiveGraph(self.neighbours(start, depth, options, timeout), on_update)
+        graph = progressive.graph
+        if graph.partial:
+            found = graph.summary()
+            for goal in (FOLLOW_UP_GOALS if follow_up is None else follow_up):
+                if goal not in found:
+                    progressive.follow(self.executor.submit(self.goals, start, [goal], options, timeout))
+        return progressive
+
+    def goals(self, start: Start, goals: List[str], options: Optional[GraphOptions] = None,
+              timeout: Optional[float] = None) -> Graph:
+        """Graph of the paths from the start objects to the goal classes"""
+        return self._graph("/graphs/goals", Goals(start, goals).to_json(), options, timeout, start.versions)
+
+    def list_goals(self, start: Start, goals: List[str], timeout: Optional[float] = None) -> List[Node]:
+        """Nodes of the goal classes reachable from the start objects"""
+        body = Goals(start, goals).to_json()
+        data = self._cached("/lists/goals", None, body, start.versions,
+                            lambda: self._request("POST", "/lists/goals", body=body, timeout=timeout))[0]
+        try:
+            return [Node.from_json(node) for node in data]
+        except (AttributeError, KeyError, TypeError) as e:
+            raise Korrel8rError(f"malformed node list: {e}") from e
+
+    def neighbours_each(self, starts: List[str], depth: int = DEPTH, options: Optional[GraphOptions] = None,
+                        timeout: Optional[float] = None,
+                        versions: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, Graph], Graph]:
+        """Neighbourhood graph of each start query from a single request, and the shared part (see split_graph)"""
+        return split_graph(self.neighbours(Start(starts, versions=versions), depth, options, timeout), starts)
+
+    def goals_each(self, starts: List[str], goals: List[str], options: Optional[GraphOptions] = None,
+                   timeout: Optional[float] = None,
+                   versions: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, Graph], Graph]:
+        """Goals graph of each start query from a single request, and the shared part (see split_graph)"""
+        return split_graph(self.goals(Start(starts, versions=versions), goals, options, timeout), starts)
+
+    def list_goals_each(self, starts: List[str], goals: List[str], timeout: Optional[float] = None,
+                        versions: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, List[Node]], List[Node]]:
+        """Goal nodes of each start query from a single request, and the shared nodes (see split_graph)"""
+        per_start, shared = split_graph(Graph(self.list_goals(Start(starts, versions=versions), goals, timeout)),
+                                        starts)
+        return {start: graph.nodes for start, graph in per_start.items()}, shared.nodes
+
+    def _graph(self, path: str, body: Dict, options: Optional[GraphOptions], timeout: Optional[float],
+               versions: Optional[Dict[str, str]] = None) -> Graph:
+        params = (options or GraphOptions()).params()
+        data, partial = self._cached(path, params, body, versions,
+                                     lambda: self._request("POST", path, params, body, timeout, True))
+        try:
+            graph = Graph.from_json(data)
+            graph.partial = partial
+            return graph
+        except (AttributeError, KeyError, TypeError) as e:
+            raise Korrel8rError(f"malformed graph: {e}") from e
+
+
+_clients: Dict[Tuple[str, Optional[str]], Korrel8rClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url: str, token: Optional[str] = None, verify=True) -> Korrel8rClient:
+    """The process-wide client of a server and token, created on first use"""
+    with _clients_lock:
+        client = _clients.get((url, token))
+        if client is None:
+            client = _clients[(url, token)] = Korrel8rClient(url, token, verify)
+        return client
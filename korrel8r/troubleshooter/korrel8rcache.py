@@ -0,0 +1,132 @@
+"""
+On-disk cache of korrel8r responses
+===================================
+Analysing the same pod again sent korrel8r the same searches, and the server
+fanned out to Loki, Prometheus and Alertmanager all over again, loading a
+korrel8r deployment the whole team shares. QueryCache keeps /objects, graph
+and goal-list responses in a local SQLite database, so a re-analysis gets its
+correlation back in milliseconds, across processes and restarts.
+
+An entry is keyed by the request path, options and body with every query
+normalized (selector keys sorted, whitespace dropped, start queries and goals
+in order), plus the resourceVersion of each start object when the caller
+knows it: a pod that changed in any way gets a fresh search. Signals change
+at different rates, so an entry lives for the shortest TTL of the classes in
+the request and its response: seconds for logs, alerts and events, minutes
+for Kubernetes topology (TTLS). Expired entries are dropped, and the least
+recently used ones go once the stored responses exceed max_bytes, as in
+every sqlitecache.SQLiteCache. Partial (206) results are never stored.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional, Set
+
+import yaml
+
+from troubleshooter import korrel8r, sqlitecache
+
+MAX_BYTES = 16 * 1024 * 1024
+FILENAME = "korrel8r-responses.sqlite3"
+# Seconds a response stays fresh, by class or else by domain
+TTLS = {
+    "log": 30, "alert": 30, "k8s:Event.v1": 30, "metric": 60, "trace": 60, "netflow": 60, "incident": 60,
+    "k8s": 300,
+}
+DEFAULT_TTL = 60
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,
+    expires REAL NOT NULL, accessed REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def normalize_query(query: str) -> str:
+    """query with its selector in canonical JSON, so equivalent spellings share an entry"""
+    class_name, selector = korrel8r.split_query(query.strip())
+    try:
+        parsed = yaml.safe_load(selector)
+    except yaml.YAMLError:
+        return query.strip()
+    if not isinstance(parsed, (dict, list)):
+        return query.strip()
+    return f"{class_name}:" + json.dumps(parsed, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _normalize_body(body: Optional[Dict]) -> Optional[Dict]:
+    if not body:
+        return body
+    body = dict(body)
+    if isinstance(body.get("start"), dict):
+        start = dict(body["start"])
+        if start.get("queries"):
+            start["queries"] = sorted(normalize_query(q) for q in start["queries"])
+        body["start"] = start
+    if body.get("goals"):
+        body["goals"] = sorted(body["goals"])
+    return body
+
+
+def request_key(path: str, params: Optional[Dict], body: Optional[Dict],
+                versions: Optional[Dict[str, str]] = None) -> str:
+    """SHA-256 of the normalized request and the resourceVersions of its start objects"""
+    params = dict(params or {})
+    if "query" in params:
+        params["query"] = normalize_query(params["query"])
+    material = json.dumps([path, params, _normalize_body(body),
+                           {normalize_query(q): v for q, v in (versions or {}).items() if v}],
+                          sort_keys=True, default=str)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def classes(params: Optional[Dict], body: Optional[Dict], data: Any) -> Set[str]:
+    """Classes a request asks about or its response holds"""
+    found = set()
+    if params and params.get("query"):
+        found.add(korrel8r.split_query(params["query"])[0])
+    start = (body or {}).get("start") or {}
+    found.update(korrel8r.split_query(q)[0] for q in start.get("queries", []))
+    if start.get("class"):
+        found.add(start["class"])
+    found.update((body or {}).get("goals", []))
+    nodes = data.get("nodes") if isinstance(data, dict) else data
+    if isinstance(nodes, list):
+        found.update(n["class"] for n in nodes if isinstance(n, dict) and isinstance(n.get("class"), str))
+    return found
+
+
+def ttl(class_names: Set[str]) -> float:
+    """Seconds until the fastest changing of the classes is stale"""
+    return min((TTLS.get(c, TTLS.get(korrel8r.domain_of(c), DEFAULT_TTL)) for c in class_names),
+               default=DEFAULT_TTL)
+
+
+class QueryCache(sqlitecache.SQLiteCache):
+    """SQLite store of korrel8r responses with per-entry expiry and size based eviction"""
+
+    SCHEMA = _SCHEMA
+    STALE = "expires <= ?"
+
+    def __init__(self, path: str, max_bytes: int = MAX_BYTES):
+        super().__init__(path, max_bytes)
+
+    def lookup(self, path: str, params: Optional[Dict], body: Optional[Dict],
+               versions: Optional[Dict[str, str]] = None) -> Any:
+        """The cached decoded response, None on a miss"""
+        response = self.fetch(request_key(path, params, body, versions))
+        return json.loads(response) if response is not None else None
+
+    def store(self, path: str, params: Optional[Dict], body: Optional[Dict],
+              versions: Optional[Dict[str, str]], data: Any) -> None:
+        """Store a complete response until its TTL runs out, and evict what no longer fits"""
+        response = json.dumps(data, separators=(",", ":"))
+        now = time.time()
+        self.insert((request_key(path, params, body, versions), response, len(response.encode()),
+                     now + ttl(classes(params, body, data)), now))
+
+
+def get_cache() -> QueryCache:
+    """The process-wide cache, created on first use"""
+    return sqlitecache.shared(QueryCache, FILENAME)
@@ -0,0 +1,195 @@
+"""
+Chat completion client for OpenAI-compatible endpoints
+======================================================
+The AI call sites each used a bare `requests.post()`: a new TCP and TLS
+handshake per analysis, and a 429 or 5xx from the provider rendered as if it
+were the analysis. LLMClient keeps one pooled Session per endpoint and key for
+the life of the process, so connections are reused across analyses and across
+Streamlit sessions, and retries what is worth retrying:
+
+- 429, 408 and 5xx responses, connection errors and timeouts are retried with
+  full-jitter exponential backoff, or after the Retry-After the server asked for,
+- each attempt has its own timeout and all attempts together a deadline; a
+  Retry-After that would overrun the deadline fails at once instead of waiting.
+
+Streaming: stream() asks for `"stream": true` and returns the content deltas
+as the server sends them as server-sent events (`data: {...}` lines, ending
+with `data: [DONE]`), so the first words render well under a second after the
+model starts answering. The request is sent, retried and its status checked
+when stream() is called; the body is read lazily as the iterator is consumed.
+Errors while reading surface as LLMError from the iterator.
+"""
+
+import json
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TIMEOUT = 30  # Seconds per attempt: to connect, and between bytes of the response
+DEADLINE = 90  # Seconds for all attempts of one call
+RETRIES = 4
+BACKOFF = 0.5  # First backoff ceiling in seconds, doubled per attempt
+MAX_BACKOFF = 20
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class LLMError(Exception):
+    """The completion endpoint refused the request or broke off the stream"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def chat_payload(model: str, messages: List[Dict], max_tokens: int, temperature: float,
+                 stream: bool = False) -> Dict:
+    return {"model": model, "messages": messages, "max_tokens": max_tokens,
+            "temperature": temperature, "stream": stream}
+
+
+class LLMClient:
+    """Pooled, retrying client of one chat completions endpoint"""
+
+    def __init__(self, endpoint: str, api_key: Optional[str] = None, timeout: float = TIMEOUT,
+                 deadline: float = DEADLINE, retries: int = RETRIES, backoff: float = BACKOFF,
+                 max_backoff: float = MAX_BACKOFF, pool_size: int = 8):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+    def post(self, payload: Dict, stream: bool = False) -> requests.Response:
+        """POST a request, retrying transient failures, and return the 200 response"""
+        start = time.monotonic()
+        headers = {"Accept": "text/event-stream"} if stream else None
+        for attempt in range(self.retries + 1):
+            remaining = self.deadline - (time.monotonic() - start)
+            try:
+                response = self.session.post(self.endpoint, json=payload, headers=headers, stream=stream,
+                                             timeout=max(0.1, min(self.timeout, remaining)))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, delay = LLMError(str(e)), None
+            except requests.RequestException as e:
+                raise LLMError(str(e)) from e
+            else:
+                if response.status_code == 200:
+                    return response
+                error = LLMError(f"{response.status_code} - {response.text}", response.status_code)
+                delay = _retry_after(response.headers.get("Retry-After"))
+                response.close()
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+            if attempt == self.retries:
+                break
+            if delay is None:
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if time.monotonic() - start + delay >= self.deadline:
+                break
+            time.sleep(delay)
+        raise error
+
+    def complete(self, payload: Dict) -> str:
+        """Content of a chat completion"""
+        response = self.post(dict(payload, stream=False))
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError) as e:
+            raise LLMError(f"unexpected response: {response.text[:200]}") from e
+
+    def stream(self, payload: Dict) -> Iterator[str]:
+        """Send a streamed chat completion request, returning an iterator of content deltas"""
+        return _deltas(self.post(dict(payload, stream=True), stream=True))
+
+
+def iter_sse(lines: Iterable[str]) -> Iterator[str]:
+    """Data of each server-sent event, given the lines of the stream"""
+    data: List[str] = []
+    for line in lines:
+        if not line:  # A blank line ends the event
+            if data:
+                yield "\n".join(data)
+                data = []
+        elif line.startswith("data:"):
+            value = line[5:]
+            data.append(value[1:] if value.startswith(" ") else value)
+        # Comments (":"), event, id and retry fields carry nothing we need
+    if data:
+        yield "\n".join(data)
+
+
+def _deltas(response: requests.Response) -> Iterator[str]:
+    response.encoding = "utf-8"  # Event streams are always UTF-8, whatever Content-Type says
+    with response:
+        try:
+            for data in iter_sse(response.iter_lines(decode_unicode=True)):
+                if data.strip() == "[DONE]":
+                    return
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    raise LLMError(str(chunk["error"].get("message", chunk["error"])
+                                       if isinstance(chunk["error"], dict) else chunk["error"]))
+                for choice in chunk.get("choices", []):
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield content
+        except (requests.RequestException, ValueError) as e:
+            raise LLMError(f"stream interrupted: {e}") from e
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, in delta-seconds or HTTP-date form"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def safe_stream(deltas: Iterator[str], error_prefix: str) -> Iterator[str]:
+    """The deltas, ending with an error message instead of raising if the stream breaks off"""
+    try:
+        yield from deltas
+    except LLMError as e:
+        yield f"\n\n{error_prefix}: {e}"
+
+
+_clients: Dict[Tuple[str, Optional[str]], LLMClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(endpoint: str, api_key: Optional[str] = None) -> LLMClient:
+    """The process-wide client of an endpoint and key, created on first use"""
+    with _clients_lock:
+        client = _clients.get((endpoint, api_key))
+        if client is None:
+            client = _clients[(endpoint, api_key)] = LLMClient(endpoint, api_key)
+        return client
+
+
+def complete(endpoint: str, api_key: Optional[str], payload: Dict) -> str:
+    """Content of a chat completion, through the shared client of the endpoint"""
+    return get_client(endpoint, api_key).complete(payload)
+
+
+def stream_chat(endpoint: str, api_key: Optional[str], payload: Dict) -> Iterator[str]:
+    """Content deltas of a streamed chat completion, through the shared client of the endpoint"""
+    return get_client(endpoint, api_key).stream(payload)
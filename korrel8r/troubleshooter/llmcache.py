@@ -0,0 +1,131 @@
+"""
+Content-addressed on-disk cache of AI analyses
+==============================================
+Running the analysis twice on an unchanged pod, or two engineers looking at
+the same incident, paid for a full LLM round trip each time. ResponseCache
+keeps answers in a local SQLite database keyed by a SHA-256 of the normalized
+evidence, the model and the prompt version, so a repeat comes back in
+milliseconds, across Streamlit sessions and restarts.
+
+Normalization keeps what identifies the problem and drops what changes from
+one look to the next: resourceVersion, uids, timestamps, restart and event
+counts, IPs, and in free text (messages, log lines, or evidence given as one
+text) every timestamp, number and duration (ages such as "5m10s"). Other
+values, such as resource limits, env values, probe settings and images, are
+kept verbatim. A pod that keeps failing the same way therefore maps to the
+same entry, while a different spec, status reason, event reason or anomaly
+does not.
+
+Entries older than max_age are dropped. Storage, size based eviction and hit
+and miss counts are those of every sqlitecache.SQLiteCache.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from troubleshooter import llm, sqlitecache, templates
+
+MAX_BYTES = 64 * 1024 * 1024
+MAX_AGE = 7 * 24 * 3600  # Seconds
+FILENAME = "llm-responses.sqlite3"
+# Fields that change without the problem changing
+VOLATILE_FIELDS = frozenset({
+    "resourceVersion", "uid", "creationTimestamp", "deletionTimestamp", "generation", "managedFields",
+    "selfLink", "startTime", "startedAt", "finishedAt", "lastTransitionTime", "lastProbeTime",
+    "firstTimestamp", "lastTimestamp", "eventTime", "containerID", "imageID", "restartCount", "count",
+    "podIP", "podIPs", "hostIP", "hostIPs",
+})
+# Fields holding free text, whose variable tokens are masked
+FREE_TEXT_FIELDS = frozenset({"message", "log", "logs", "lines"})
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL,
+    size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def normalize(value: Any, free_text: bool = True) -> Any:
+    """value with volatile fields dropped and variable tokens of its free text masked.
+
+    A bare string or list of strings is free text; inside a dict only FREE_TEXT_FIELDS are.
+    """
+    if isinstance(value, dict):
+        return {k: normalize(v, k in FREE_TEXT_FIELDS) for k, v in sorted(value.items()) if k not in VOLATILE_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v, free_text) for v in value]
+    if isinstance(value, str) and free_text:
+        return "\n".join(filter(None, (templates.mask(line) for line in value.splitlines())))
+    return value
+
+
+def pod_evidence(pod: Dict, events: List[Dict], anomalies: List[Dict]) -> Dict:
+    """What identifies a pod problem: its spec and status, event reasons and anomaly types"""
+    return {
+        "pod": {"metadata": {k: pod.get("metadata", {}).get(k) for k in ("name", "namespace", "labels")},
+                "spec": pod.get("spec", {}), "status": pod.get("status", {})},
+        "events": sorted({(e.get("type", ""), e.get("reason", "")) for e in events}),
+        "anomalies": sorted({(a.get("type", ""), a.get("severity", "")) for a in anomalies}),
+    }
+
+
+def evidence_key(evidence: Any, model: str, prompt_version: str) -> str:
+    """SHA-256 of the normalized evidence, model and prompt version"""
+    material = json.dumps([prompt_version, model, normalize(evidence)], sort_keys=True, default=str)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class ResponseCache(sqlitecache.SQLiteCache):
+    """SQLite store of LLM answers with age and size based eviction"""
+
+    SCHEMA = _SCHEMA
+    STALE = "created <= ?"
+
+    def __init__(self, path: str, max_bytes: int = MAX_BYTES, max_age: float = MAX_AGE):
+        super().__init__(path, max_bytes)
+        self.max_age = max_age
+
+    def horizon(self, now: float) -> float:
+        return now - self.max_age
+
+    def get(self, key: str) -> Optional[str]:
+        """The cached answer, None on a miss"""
+        return self.fetch(key)
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Store an answer and evict what no longer fits"""
+        now = time.time()
+        self.insert((key, model, response, len(response.encode()), now, now))
+
+    def record(self, key: str, model: str, deltas: Iterator[str]) -> Iterator[str]:
+        """Pass a streamed answer through, storing it once it has arrived completely"""
+        chunks = []
+        for delta in deltas:
+            chunks.append(delta)
+            yield delta
+        self.put(key, model, "".join(chunks))
+
+
+def get_cache() -> ResponseCache:
+    """The process-wide cache, created on first use"""
+    return sqlitecache.shared(ResponseCache, FILENAME)
+
+
+def cached_completion(endpoint: str, api_key: Optional[str], payload: Dict, evidence: Any,
+                      prompt_version: str, stream: bool = False) -> Union[str, Iterator[str]]:
+    """The cached answer for this evidence, or a fresh one from the endpoint that is cached once complete.
+
+    A hit is returned as a str even when stream is set. Raises LLMError like llm.complete().
+    """
+    cache = get_cache()
+    key = evidence_key(evidence, payload["model"], prompt_version)
+    answer = cache.get(key)
+    if answer is not None:
+        return answer
+    if stream:
+        return cache.record(key, payload["model"], llm.stream_chat(endpoint, api_key, payload))
+    answer = llm.complete(endpoint, api_key, payload)
+    cache.put(key, payload["model"], answer)
+    return answer
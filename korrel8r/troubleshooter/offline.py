@@ -0,0 +1,131 @@
+"""
+Offline analysis of log files and must-gather archives
+======================================================
+must-gather dumps carry container logs of several GB, while the online
+functions expect the whole log as one str. analyze_file() memory-maps a log
+and feeds it through the same anomaly scanner and categorizer in chunks that
+end on a line boundary, so only one chunk at a time is ever decoded into a
+Python string. Pages are dropped from the mapping once their chunk is done,
+which keeps peak RSS flat whatever the file size.
+
+Anomaly patterns match within a line, so summing per-chunk counts gives the
+same anomalies as detect_log_anomalies() over the whole text, and line
+categories are the ones categorize_error() would give each line.
+
+Files are analyzed in parallel worker processes, each with its own flat RSS.
+
+Usage:
+    python -m troubleshooter.offline must-gather.local.1234/ [more files or dirs]
+"""
+
+import argparse
+import mmap
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterator, List, Optional
+
+from troubleshooter import anomaly, categorize, frames
+
+CHUNK_SIZE = 8 * 1024 * 1024
+# Container logs in a must-gather: namespaces/NS/pods/POD/CONTAINER/CONTAINER/logs/current.log
+LOG_SUFFIXES = (".log",)
+
+
+def iter_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Yield the decoded text of a file in chunks of about chunk_size bytes that end on a newline"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            start = 0
+            while start < size:
+                end = min(start + chunk_size, size)
+                if end < size:
+                    newline = mm.rfind(b"\n", start, end)
+                    if newline < 0:  # A line longer than a chunk, extend to its end
+                        newline = mm.find(b"\n", end)
+                    end = size if newline < 0 else newline + 1
+                yield mm[start:end].decode("utf-8", "replace")
+                _release(mm, start, end)
+                start = end
+
+
+def _release(mm: mmap.mmap, start: int, end: int) -> None:
+    """Drop the pages of a processed range from our RSS; the page cache keeps them if memory allows"""
+    if not hasattr(mm, "madvise"):
+        return
+    first = start - start % mmap.PAGESIZE
+    last = end - end % mmap.PAGESIZE
+    if last > first:
+        mm.madvise(mmap.MADV_DONTNEED, first, last - first)
+
+
+def analyze_file(path: str, scanner: Optional[anomaly.LogScanner] = None,
+                 categorizer: Optional[categorize.Categorizer] = None,
+                 chunk_size: int = CHUNK_SIZE) -> Dict:
+    """Anomalies and line categories of one log file, without loading it into memory"""
+    scanner = scanner or anomaly.default_scanner
+    counts = dict.fromkeys(scanner.patterns, 0)
+    categories: Counter = Counter()
+    severities: Counter = Counter()
+    lines = 0
+    for chunk in iter_chunks(path, chunk_size):
+        scanner.count(chunk, counts)
+        classified = frames.classify(frames.logs_frame(chunk, timestamps=False), "line", categorizer)
+        categories.update({str(k): int(v) for k, v in classified["category"].value_counts().items() if v})
+        severities.update({str(k): int(v) for k, v in classified["severity"].value_counts().items() if v})
+        lines += len(classified)
+    return {
+        "path": path,
+        "lines": lines,
+        "anomalies": scanner.anomalies(counts),
+        "by_category": dict(categories.most_common()),
+        "by_severity": dict(severities.most_common()),
+    }
+
+
+def find_logs(root: str) -> List[str]:
+    """Log files under a must-gather directory, or root itself if it is a file"""
+    if os.path.isfile(root):
+        return [root]
+    found = []
+    for directory, _, files in os.walk(root):
+        found += [os.path.join(directory, name) for name in files if name.endswith(LOG_SUFFIXES)]
+    return sorted(found)
+
+
+def analyze_paths(paths: List[str], workers: int = 1, chunk_size: int = CHUNK_SIZE) -> List[Dict]:
+    """analyze_file() for every log file under the given files and directories, files in parallel processes"""
+    files = [path for root in paths for path in find_logs(root)]
+    if workers <= 1 or len(files) <= 1:
+        return [analyze_file(path, chunk_size=chunk_size) for path in files]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(partial(analyze_file, chunk_size=chunk_size), files))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Detect log anomalies in must-gather archives or log files")
+    parser.add_argument("paths", nargs="+", help="must-gather directories or log files")
+    parser.add_argument("--all", action="store_true", help="also list files without anomalies")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="files analyzed in parallel")
+    args = parser.parse_args(argv)
+
+    for result in analyze_paths(args.paths, workers=args.workers):
+        if not result["anomalies"] and not args.all:
+            continue
+        print(f"\n📄 {result['path']} ({result['lines']} lines)")
+        for item in result["anomalies"]:
+            print(f"  {item['severity']:<8} {item['type']:<20} {item['count']:>8}  {item['description']}")
+        print("  Severity: " + ", ".join(f"{k}={v}" for k, v in result["by_severity"].items()))
+        print("  Category: " + ", ".join(f"{k}={v}" for k, v in result["by_category"].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
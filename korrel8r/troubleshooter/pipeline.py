@@ -0,0 +1,93 @@
+"""
+Dependency-driven asyncio pipeline for analysis steps
+=====================================================
+Each step is a blocking function plus the names of the steps whose results it
+needs; a name ending in "?" marks a dependency the step can do without. Steps
+run in worker threads as soon as their dependencies are done, so independent
+collection steps overlap and a dependent step (e.g. the AI call) starts the
+moment its own inputs are ready. Results are reported through a
+callback on the event loop thread as they arrive, which lets Streamlit render
+each tab progressively. The callback holds up every other step while it runs,
+so it must only render what it is given: a streamed result (e.g. the AI
+answer) is consumed after run() returns, not inside the callback.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+Steps = Dict[str, Tuple[Callable[..., Any], Sequence[str]]]
+ResultCallback = Callable[[str, Any, float], None]
+
+
+class StepFailed(Exception):
+    """Stands in for the result of a step that raised, timed out or lost a dependency"""
+
+
+async def run_pipeline(steps: Steps, on_result: Optional[ResultCallback] = None,
+                       timeout: Optional[float] = None, max_workers: int = 8) -> Dict[str, Any]:
+    """Run steps concurrently, returning {name: result or StepFailed}.
+
+    A step function is called with the results of its dependencies as positional
+    arguments, in the order they are listed. A step is skipped when a dependency
+    fails, unless that dependency is listed as "name?": it is then passed the
+    StepFailed and decides itself. on_result(name, result, seconds) is
+    called once per step, in completion order; dependent steps go ahead even
+    if it raises, and the first such error is raised once every step is done.
+    Steps still running at the timeout are abandoned to their worker threads
+    and reported as StepFailed.
+    """
+    unknown = {dep.rstrip("?") for _, deps in steps.values() for dep in deps} - set(steps)
+    if unknown:
+        raise ValueError(f"Unknown pipeline dependencies: {sorted(unknown)}")
+
+    results: Dict[str, Any] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+    finished = {name: asyncio.Event() for name in steps}
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+    loop = asyncio.get_running_loop()
+    start = time.monotonic()
+
+    def report(name: str, result: Any) -> None:
+        results[name] = result
+        finished[name].set()
+        if on_result:
+            on_result(name, result, time.monotonic() - start)
+
+    async def run_step(name: str) -> None:
+        func, deps = steps[name]
+        args = []
+        for dep in deps:
+            optional, dep = dep.endswith("?"), dep.rstrip("?")
+            await finished[dep].wait()
+            if isinstance(results[dep], StepFailed) and not optional:
+                report(name, StepFailed(f"{name} skipped: {results[dep]}"))
+                return
+            args.append(results[dep])
+        try:
+            result = await loop.run_in_executor(executor, func, *args)
+        except Exception as e:
+            result = StepFailed(f"{name} failed: {e}")
+        report(name, result)
+
+    for name in steps:
+        tasks[name] = asyncio.ensure_future(run_step(name))
+    try:
+        _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for name, task in tasks.items():
+            if task in pending:
+                task.cancel()
+                report(name, StepFailed(f"{name} did not finish within {timeout}s"))
+    finally:
+        executor.shutdown(wait=False)
+    for task in tasks.values():
+        if task.done() and not task.cancelled() and task.exception():
+            raise task.exception()
+    return results
+
+
+def run(steps: Steps, on_result: Optional[ResultCallback] = None,
+        timeout: Optional[float] = None, max_workers: int = 8) -> Dict[str, Any]:
+    """Blocking wrapper around run_pipeline for synchronous callers such as Streamlit scripts"""
+    return asyncio.run(run_pipeline(steps, on_result, timeout, max_workers))
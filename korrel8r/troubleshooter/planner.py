@@ -0,0 +1,161 @@
+"""
+Rule-aware korrel8r query planner
+=================================
+The troubleshooters sent korrel8r one k8s:Pod.v1 start query and asked for
+its whole neighbourhood, so every analysis paid for log, alert, metric, trace
+and topology searches whether or not they could say anything about the
+failure. The rules korrel8r follows ship with it in etc/korrel8r/rules, so the
+classes a pod can lead to, and in how many hops, are known up front.
+
+RulePlanner loads those files once, expands their aliases and domain-wide
+starts and goals into concrete classes, and indexes the result as a
+class-to-class graph (a graphindex.GraphIndex, one edge per start and goal
+class pair, labelled with its rules). goals() turns an error category from
+categorize_error into the signals worth fetching for it (CATEGORY_GOALS,
+most useful first), keeps those the rules can reach from the start class
+within max_hops, nearest first, and picks the log class the same way the log
+rules do for the namespace. The caller then sends one narrow /graphs/goals
+search in place of a neighbourhood search.
+
+Class names are compared by domain and, for k8s, by kind only, since rules
+write k8s:Pod, k8s:Pod. and k8s:Pod.v1 for the same class.
+
+Location: TROUBLESHOOTER_KORREL8R_RULES, else etc/korrel8r/rules next to the
+scripts.
+"""
+
+import glob
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+from troubleshooter import graphindex, korrel8r
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "etc", "korrel8r", "rules")
+MAX_HOPS = korrel8r.DEPTH
+# Classes of the domains whose rules name no class, so match them all
+DOMAIN_CLASSES = {
+    "log": ["application", "infrastructure", "audit"], "alert": ["alert"], "metric": ["metric"],
+    "trace": ["span"], "incident": ["incident"], "netflow": ["network"],
+}
+# Signals that explain each kind of failure, most useful first; "log:" is the namespace's log class
+CATEGORY_GOALS = {
+    "RESOURCE": ["metric:metric", "alert:alert", "k8s:Node.v1", "k8s:Event.v1"],
+    "NETWORK": ["log:", "netflow:network", "alert:alert", "k8s:Event.v1"],
+    "STORAGE": ["k8s:Event.v1", "k8s:PersistentVolumeClaim.v1", "alert:alert"],
+    "IMAGE": ["k8s:Event.v1"],
+    "PERMISSION": ["log:", "k8s:Event.v1", "k8s:ServiceAccount.v1"],
+    "CONFIG": ["log:", "k8s:Event.v1"],
+    "INIT": ["log:", "k8s:Event.v1", "alert:alert"],
+    "SCHEDULING": ["k8s:Event.v1", "k8s:Node.v1", "alert:alert"],
+}
+DEFAULT_GOALS = ["log:", "k8s:Event.v1", "alert:alert"]
+# Namespaces whose logs the log rules query as infrastructure, as logTypeForNamespace does
+_INFRA_NAMESPACE = re.compile(r"^(default|(openshift|kube)(-.*)?)$")
+
+
+def rule_class(class_name: str) -> str:
+    """DOMAIN:CLASS as the planner compares it: k8s classes by kind only"""
+    domain, _, name = class_name.partition(":")
+    return f"{domain}:{name.split('.')[0]}" if domain == "k8s" else class_name
+
+
+def log_class(namespace: str) -> str:
+    """The log class the log rules use for a namespace"""
+    return "log:infrastructure" if _INFRA_NAMESPACE.match(namespace or "") else "log:application"
+
+
+class RulePlanner:
+    """Class graph of a korrel8r rule set, and the goal classes worth a search per error category"""
+
+    def __init__(self, rules: Iterable[Dict], aliases: Iterable[Dict] = ()):
+        self.rules = list(rules)
+        self.aliases: Dict[Tuple[str, str], List[str]] = {
+            (a.get("domain", ""), a.get("name", "")): list(a.get("classes") or []) for a in aliases}
+        domains: Dict[str, Set[str]] = {d: {f"{d}:{c}" for c in classes} for d, classes in DOMAIN_CLASSES.items()}
+        for rule in self.rules:
+            for end in (rule.get("start") or {}, rule.get("goal") or {}):
+                domains.setdefault(end.get("domain", ""), set()).update(self._named(end))
+        self.domain_classes = {d: sorted(classes) for d, classes in domains.items()}
+        edges: Dict[Tuple[str, str], korrel8r.Edge] = {}
+        for rule in self.rules:
+            for start in self._classes(rule.get("start") or {}):
+                for goal in self._classes(rule.get("goal") or {}):
+                    edge = edges.setdefault((start, goal), korrel8r.Edge(start, goal, []))
+                    edge.rules.append(korrel8r.Rule(rule.get("name", "")))
+        classes = sorted({c for cs in self.domain_classes.values() for c in cs})
+        self.index = graphindex.GraphIndex(korrel8r.Graph([korrel8r.Node(c) for c in classes], list(edges.values())))
+
+    @classmethod
+    def from_directory(cls, directory: str = RULES_DIR) -> "RulePlanner":
+        """Planner over every rule and alias of the *.yaml files of a directory, each rule once"""
+        rules: Dict[str, Dict] = {}
+        aliases: List[Dict] = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.yaml"))):
+            with open(path) as f:
+                config = yaml.safe_load(f) or {}
+            for rule in config.get("rules") or []:
+                rules.setdefault(rule.get("name", ""), rule)
+            aliases += config.get("aliases") or []
+        return cls(rules.values(), aliases)
+
+    def _named(self, end: Dict) -> Set[str]:
+        """Classes a rule start or goal names, with aliases expanded"""
+        domain = end.get("domain", "")
+        names: Set[str] = set()
+        for name in end.get("classes") or []:
+            for expanded in self.aliases.get((domain, name), [name]):
+                names.add(rule_class(f"{domain}:{expanded}"))
+        return names
+
+    def _classes(self, end: Dict) -> List[str]:
+        """Classes a rule start or goal stands for: the ones named, else all of its domain"""
+        return sorted(self._named(end)) or self.domain_classes.get(end.get("domain", ""), [])
+
+    def hops(self, start: str, max_hops: Optional[int] = None) -> Dict[str, int]:
+        """Rule hops from the start class to each class the rules reach"""
+        reached = self.index.bfs([rule_class(start)], max_hops)
+        return {self.index.classes[node]: depth for node, depth in reached.items()}
+
+    def rules_from(self, start: str, goal: str) -> List[str]:
+        """Names of the rules leading directly from one class to another"""
+        for edge in self.index.graph.edges:
+            if edge.start == rule_class(start) and edge.goal == rule_class(goal):
+                return [rule.name for rule in edge.rules]
+        return []
+
+    def goals(self, category: str, namespace: str = "", start: str = korrel8r.POD_CLASS,
+              max_hops: int = MAX_HOPS) -> List[str]:
+        """Goal classes worth a search for an error category: reachable within max_hops, nearest first"""
+        return self._reachable(CATEGORY_GOALS.get(category, DEFAULT_GOALS), namespace, start, max_hops)
+
+    def any_goals(self, namespace: str = "", start: str = korrel8r.POD_CLASS, max_hops: int = MAX_HOPS) -> List[str]:
+        """Goal classes worth a search for some error category, for a search sent before the category is known"""
+        candidates = list(dict.fromkeys(goal for goals in [DEFAULT_GOALS, *CATEGORY_GOALS.values()] for goal in goals))
+        return self._reachable(candidates, namespace, start, max_hops)
+
+    def _reachable(self, candidates: List[str], namespace: str, start: str, max_hops: int) -> List[str]:
+        hops = self.hops(start, max_hops)
+        candidates = [log_class(namespace) if goal == "log:" else goal for goal in candidates]
+        reachable = [(hops[rule_class(goal)], rank, goal) for rank, goal in enumerate(candidates)
+                     if hops.get(rule_class(goal))]  # 0 hops is the start class itself
+        return [goal for _, _, goal in sorted(reachable)]
+
+
+_planner: Optional[RulePlanner] = None
+_planner_lock = threading.Lock()
+
+
+def get_planner() -> RulePlanner:
+    """The process-wide planner, loaded on first use; without readable rules it plans no goals"""
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            try:
+                _planner = RulePlanner.from_directory(os.environ.get("TROUBLESHOOTER_KORREL8R_RULES") or RULES_DIR)
+            except (OSError, yaml.YAMLError, AttributeError, TypeError):
+                _planner = RulePlanner([])  # Callers fall back to a neighbourhood search
+        return _planner
@@ -0,0 +1,135 @@
+"""
+Token-budgeted prompt builder
+=============================
+The AI prompts concatenated the full describe text, indented JSON dumps and
+raw logs with no size cap, so a busy pod produced prompts that ran into the
+request timeout or the model context limit. PromptBuilder assembles a prompt
+from sections under a token budget:
+
+- tokens are estimated locally (no tokenizer download, no API call),
+- JSON values are written without indentation and without empty fields,
+- sections are ranked by relevance: the priority the caller gives them, raised
+  when they contain critical lines,
+- when the total is over budget the least relevant sections are truncated
+  first, keeping their most severe lines in their original order, and dropped
+  once too little of them would remain.
+
+The prompt therefore has a predictable upper size whatever the evidence.
+"""
+
+import json
+import re
+from typing import Any, List, Optional
+
+from troubleshooter import categorize
+
+BUDGET = 6000  # Prompt tokens, leaving room for the answer in an 8k context
+MIN_SECTION = 40  # A section truncated below this many tokens is dropped instead
+# BPE vocabularies hold most short words and word pieces of about four characters
+_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+_SEVERITY_RANK = {"CRITICAL": 0, "WARNING": 1}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text, erring on the high side for logs and JSON"""
+    return len(_TOKEN.findall(text))
+
+
+def _prune(value: Any) -> Any:
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [v for v in (_prune(v) for v in value) if v not in (None, "", [], {})]
+    return value
+
+
+def compact_json(value: Any) -> str:
+    """JSON without indentation, whitespace or empty fields"""
+    return json.dumps(_prune(value), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class Section:
+    """One titled block of evidence"""
+
+    __slots__ = ("title", "body", "priority", "relevance", "tokens")
+
+    def __init__(self, title: str, body: str, priority: int):
+        self.title = title
+        self.body = body.strip()
+        self.priority = priority
+        self.tokens = estimate_tokens(self.render())
+        severities = {severity for _, severity in categorize.categorize_errors(self.body.splitlines())}
+        # Evidence of a failure outranks a section of the same priority without one
+        self.relevance = priority + (1 if "CRITICAL" in severities else 0)
+
+    def render(self) -> str:
+        return f"{self.title}:\n{self.body}"
+
+
+class PromptBuilder:
+    """Collects evidence sections and renders them within a token budget"""
+
+    def __init__(self, budget: int = BUDGET):
+        self.budget = budget
+        self.sections: List[Section] = []
+
+    def add(self, title: str, content: Any, priority: int = 1) -> "PromptBuilder":
+        """Add a section; content that is not a str is written as compact JSON. Higher priority is kept longer"""
+        body = content if isinstance(content, str) else compact_json(content)
+        if body.strip() and body.strip() not in ("[]", "{}"):
+            self.sections.append(Section(title, body, priority))
+        return self
+
+    def build(self, header: str = "", footer: str = "") -> str:
+        """The prompt: header, sections in the order added, footer, within the budget where possible"""
+        header, footer = header.strip(), footer.strip()
+        available = self.budget - estimate_tokens(header) - estimate_tokens(footer)
+        bodies = {id(section): section.render() for section in self.sections}
+        total = sum(section.tokens for section in self.sections)
+        # Least relevant first; among equals, the later section goes first
+        for section in sorted(reversed(self.sections), key=lambda s: s.relevance):
+            if total <= available:
+                break
+            keep = section.tokens - (total - available)
+            text = _truncate(section, keep) if keep >= MIN_SECTION else None
+            total -= section.tokens - (estimate_tokens(text) if text else 0)
+            bodies[id(section)] = text
+        parts = [header] + [bodies[id(s)] for s in self.sections if bodies[id(s)]] + [footer]
+        return "\n\n".join(part for part in parts if part)
+
+    @property
+    def tokens(self) -> int:
+        """Estimated tokens of all sections before any truncation"""
+        return sum(section.tokens for section in self.sections)
+
+
+def _truncate(section: Section, tokens: int) -> Optional[str]:
+    """The section with its most severe lines that fit in tokens, in their original order"""
+    lines = section.body.splitlines()
+    title = f"{section.title} (truncated):"
+    used = estimate_tokens(title) + estimate_tokens(f"[... {len(lines)} more lines]")
+    severities = categorize.categorize_errors(lines)
+    order = sorted(range(len(lines)), key=lambda i: (_SEVERITY_RANK.get(severities[i][1], 2), i))
+    kept = []
+    for i in order:
+        cost = estimate_tokens(lines[i]) + 1
+        if used + cost > tokens:
+            if kept or len(lines) > 1:
+                continue
+            # A single long line (e.g. compact JSON): keep its head
+            line, room = lines[i], tokens - used - 4
+            while cost > room and line:
+                line = line[:len(line) * room // cost]
+                cost = estimate_tokens(line) + 1
+            lines[i] = line + " [...]"
+            cost += 3
+        kept.append(i)
+        used += cost
+    if not kept:
+        return None
+    kept.sort()
+    body = [lines[i] for i in kept]
+    if len(kept) < len(lines):
+        body.append(f"[... {len(lines) - len(kept)} more lines]")
+    return "\n".join([title] + body)
@@ -0,0 +1,243 @@
+"""
+Sliding-window anomaly rates from timestamped pod logs
+======================================================
+detect_log_anomalies() applies absolute thresholds to whatever `--tail` window
+was fetched, so its answer changes with the tail size and ignores time.
+RateDetector reads `oc logs --timestamps` output, counts the anomaly patterns
+per second of log time, and keeps each pattern in sliding windows with running
+totals: adding a second and expiring old ones is O(1) amortized. It reports
+rates per minute over the window and the busiest minute (burst) per pattern,
+and flags patterns whose burst reaches the pattern threshold within a minute.
+
+Detectors are kept per pod for the life of the process. A re-analysis asks for
+log lines since the last timestamp seen, skips the ones already counted, and
+feeds only the rest. Each detector also keeps the last RECENT lines without
+their timestamps, so the same fetch serves as the pod log for the anomaly
+scan and the AI prompt.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from troubleshooter import anomaly, collector
+
+WINDOW = 600  # Seconds of log time the rates cover
+MINUTE = 60
+TAIL = 1000  # Lines fetched the first time a pod is analyzed
+RECENT = 100  # Lines kept as the pod log, as a `--tail 100` fetch would return them
+MAX_PODS = 64  # Detectors kept, least recently used are dropped
+
+Instant = Tuple[int, int]  # (epoch seconds, nanoseconds)
+
+
+class SlidingWindow:
+    """Total of counts added over the last `window` seconds, kept in one-second buckets"""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self.total = 0
+        self._buckets: deque = deque()  # [second, count], oldest first
+
+    def add(self, second: int, count: int) -> None:
+        if self._buckets and self._buckets[-1][0] >= second:
+            self._buckets[-1][1] += count  # Same second, or a line out of order
+        else:
+            self._buckets.append([second, count])
+        self.total += count
+        self.advance(second)
+
+    def advance(self, now: int) -> None:
+        """Expire buckets that fell out of the window at time now"""
+        horizon = now - self.window
+        while self._buckets and self._buckets[0][0] <= horizon:
+            self.total -= self._buckets.popleft()[1]
+
+
+class PatternRate:
+    """Window total, last minute and busiest minute within the window of one pattern"""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = SlidingWindow(window)
+        self.minute = SlidingWindow(MINUTE)
+        self._peaks: deque = deque()  # (second, one-minute total), totals decreasing: a sliding maximum
+
+    def add(self, second: int, count: int) -> None:
+        self.window.add(second, count)
+        self.minute.add(second, count)
+        while self._peaks and self._peaks[-1][1] <= self.minute.total:
+            self._peaks.pop()
+        self._peaks.append((second, self.minute.total))
+        self._expire(second)
+
+    def advance(self, now: int) -> None:
+        self.window.advance(now)
+        self.minute.advance(now)
+        self._expire(now)
+
+    def _expire(self, now: int) -> None:
+        while self._peaks and self._peaks[0][0] <= now - self.window.window:
+            self._peaks.popleft()
+
+    def peak(self) -> Tuple[int, int]:
+        """(second, count) of the busiest minute in the window, (0, 0) if there was none"""
+        return self._peaks[0] if self._peaks else (0, 0)
+
+
+class RateDetector:
+    """Incremental per-pattern log rates for one pod"""
+
+    def __init__(self, scanner: Optional[anomaly.LogScanner] = None, window: int = WINDOW):
+        self.scanner = scanner or anomaly.default_scanner
+        self.window = window
+        self.lines = PatternRate(window)
+        self.patterns = {name: PatternRate(window) for name in self.scanner.patterns}
+        self.first: Optional[int] = None
+        self.last: Optional[Instant] = None
+        self.recent: deque = deque(maxlen=RECENT)
+        self.lock = threading.Lock()
+        self._repeats = 0  # Lines counted at exactly self.last, which a re-fetch sends again
+
+    def since_time(self) -> Optional[str]:
+        """RFC 3339 time to resume the log from, None before the first feed"""
+        if self.last is None:
+            return None
+        return datetime.fromtimestamp(self.last[0], timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def feed(self, logs: str) -> int:
+        """Count the lines of `--timestamps` log output not seen before, returning how many there were"""
+        new = 0
+        second: Optional[int] = None
+        pending: List[str] = []
+        # Lines up to where the previous feed stopped were counted already
+        resume, repeats = self.last, self._repeats
+        skipped_at_last, skipping = 0, False
+        for line in logs.splitlines():
+            stamp, _, text = line.partition(" ")
+            instant = _parse_timestamp(stamp)
+            if instant is None:  # No timestamp, e.g. a wrapped line: it goes with the line before
+                if second is not None and not skipping:
+                    pending.append(line)
+                    self.recent.append(line)
+                    new += 1
+                continue
+            skipping = resume is not None and (
+                instant < resume or (instant == resume and skipped_at_last < repeats))
+            if skipping:
+                if instant == resume:
+                    skipped_at_last += 1
+                continue
+            if instant[0] != second:
+                self._flush(second, pending)
+                second, pending = instant[0], []
+            pending.append(text)
+            self.recent.append(text)
+            new += 1
+            if instant == self.last:
+                self._repeats += 1
+            else:
+                self.last, self._repeats = instant, 1
+        self._flush(second, pending)
+        return new
+
+    def _flush(self, second: Optional[int], lines: List[str]) -> None:
+        if second is None or not lines:
+            return
+        if self.first is None:
+            self.first = second
+        counts = self.scanner.count("\n".join(lines))
+        self.lines.add(second, len(lines))
+        for name, rate in self.patterns.items():
+            if counts.get(name):
+                rate.add(second, counts[name])
+            else:
+                rate.advance(second)
+
+    def report(self) -> Dict:
+        """Rates per minute over the window, bursts and rate-based anomalies"""
+        if self.last is None:
+            return {"window_seconds": self.window, "lines": 0, "rates": [], "anomalies": []}
+        now = self.last[0]
+        minutes = max(MINUTE, min(self.window, now - self.first + 1)) / MINUTE
+        rates, anomalies = [], []
+        for name, rate in self.patterns.items():
+            config = self.scanner.patterns[name]
+            peak_at, peak = rate.peak()
+            rates.append({
+                "type": name,
+                "count": rate.window.total,
+                "per_minute": round(rate.window.total / minutes, 2),
+                "last_minute": rate.minute.total,
+                "peak_per_minute": peak,
+                "peak_at": _format(peak_at) if peak else None,
+            })
+            if peak >= config["threshold"]:
+                anomalies.append({
+                    "type": name,
+                    "count": peak,
+                    "description": f"{config['description']} ({peak} in one minute)",
+                    "severity": "WARNING" if peak < config["threshold"] * 2 else "CRITICAL"
+                })
+        return {
+            "window_seconds": self.window,
+            "lines": self.lines.window.total,
+            "lines_per_minute": round(self.lines.window.total / minutes, 2),
+            "last_timestamp": _format(now),
+            "rates": rates,
+            "anomalies": anomalies,
+        }
+
+
+_minute_epochs: Dict[str, int] = {}
+
+
+def _parse_timestamp(stamp: str) -> Optional[Instant]:
+    """Parse an RFC 3339 UTC timestamp as written by `oc logs --timestamps`"""
+    if len(stamp) < 20 or stamp[10] != "T" or stamp[-1] != "Z":
+        return None
+    minute = stamp[:16]
+    base = _minute_epochs.get(minute)
+    try:
+        if base is None:
+            if len(_minute_epochs) > 10000:
+                _minute_epochs.clear()
+            base = int(datetime.strptime(minute, "%Y-%m-%dT%H:%M").replace(tzinfo=timezone.utc).timestamp())
+            _minute_epochs[minute] = base
+        fraction = stamp[20:-1] if stamp[19] == "." else ""
+        return base + int(stamp[17:19]), int(fraction[:9].ljust(9, "0")) if fraction else 0
+    except ValueError:
+        return None
+
+
+def _format(second: int) -> str:
+    return datetime.fromtimestamp(second, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+_detectors: "OrderedDict[Tuple[str, str], RateDetector]" = OrderedDict()
+_detectors_lock = threading.Lock()
+
+
+def get_detector(namespace: str, pod: str) -> RateDetector:
+    """The process-wide detector of a pod, created on first use"""
+    with _detectors_lock:
+        key = (namespace, pod)
+        detector = _detectors.pop(key, None) or RateDetector()
+        _detectors[key] = detector
+        while len(_detectors) > MAX_PODS:
+            _detectors.popitem(last=False)
+        return detector
+
+
+def analyze_pod(namespace: str, pod: str, tail: int = TAIL) -> Dict:
+    """Fetch the log lines of a pod written since the last analysis and report its rates, and its recent log"""
+    detector = get_detector(namespace, pod)
+    with detector.lock:
+        since = detector.since_time()
+        logs = collector.get_pod_logs(namespace, pod, tail=None if since else tail, timestamps=True,
+                                      since_time=since)
+        new_lines = detector.feed(logs)
+        report = detector.report()
+        report["logs"] = "".join(line + "\n" for line in detector.recent)
+    report["new_lines"] = new_lines
+    return report
@@ -0,0 +1,135 @@
+"""
+SQLite response store shared by the on-disk caches
+==================================================
+The AI answer cache (llmcache) and the korrel8r response cache
+(korrel8rcache) keep their entries the same way: one row per key in a local
+SQLite database in WAL mode, so several processes can share it, with the
+stored size and last access of each row and hit, miss and eviction counters
+next to them. SQLiteCache holds that part: lookups, writes that drop stale
+rows and evict the least recently used ones once the stored responses
+exceed max_bytes, stats() and clear(). Any SQLite error makes that call a
+miss, or stores nothing, rather than failing the caller.
+
+A subclass gives the table (SCHEMA, with at least key, response, size and
+accessed columns) and the condition under which a row is stale (STALE, on
+the value of horizon()), and builds its own keys and rows.
+
+Location: TROUBLESHOOTER_CACHE_DIR, else ~/.cache/korrel8r-troubleshooter.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Sequence, Type, TypeVar
+
+_COUNTERS = "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+
+
+class SQLiteCache:
+    """SQLite table of responses by key, with hit, miss and eviction counts and size based eviction"""
+
+    SCHEMA = ""
+    STALE = ""  # SQL condition on a row that is no longer served, given horizon()
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def horizon(self, now: float) -> float:
+        """The value STALE compares rows with at time now"""
+        return now
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(self.SCHEMA + _COUNTERS)
+            self._db = db
+        return self._db
+
+    def _count(self, db: sqlite3.Connection, name: str, value: int = 1) -> None:
+        db.execute("INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                   (name, value))
+
+    def fetch(self, key: str) -> Optional[str]:
+        """The stored response, None on a miss"""
+        now = time.time()
+        try:
+            with self.lock:
+                db = self._connect()
+                row = db.execute(f"SELECT response FROM responses WHERE key = ? AND NOT ({self.STALE})",
+                                 (key, self.horizon(now))).fetchone()
+                if row:
+                    db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                self._count(db, "hits" if row else "misses")
+        except (sqlite3.Error, OSError):
+            return None
+        return row[0] if row else None
+
+    def insert(self, row: Sequence) -> None:
+        """Store a row, drop the stale ones and evict what no longer fits"""
+        try:
+            with self.lock:
+                db = self._connect()
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    db.execute(f"INSERT OR REPLACE INTO responses VALUES ({', '.join('?' * len(row))})", row)
+                    db.execute(f"DELETE FROM responses WHERE {self.STALE}", (self.horizon(time.time()),))
+                    self._evict(db)
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+        except (sqlite3.Error, OSError):
+            pass
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._count(db, "evictions", len(doomed))
+
+    def stats(self) -> Dict:
+        """Entries, stored bytes and hit, miss and eviction counts"""
+        try:
+            with self.lock:
+                db = self._connect()
+                entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+                counters = dict(db.execute("SELECT name, value FROM counters"))
+        except (sqlite3.Error, OSError) as e:
+            return {"error": str(e)}
+        return {"path": self.path, "entries": entries, "bytes": size, "hits": counters.get("hits", 0),
+                "misses": counters.get("misses", 0), "evictions": counters.get("evictions", 0)}
+
+    def clear(self) -> None:
+        with self.lock:
+            db = self._connect()
+            db.execute("DELETE FROM responses")
+            db.execute("DELETE FROM counters")
+
+
+Cache = TypeVar("Cache", bound=SQLiteCache)
+_caches: Dict[str, SQLiteCache] = {}
+_caches_lock = threading.Lock()
+
+
+def shared(cls: Type[Cache], filename: str) -> Cache:
+    """The process-wide cache kept in filename of the cache directory, created on first use"""
+    with _caches_lock:
+        if filename not in _caches:
+            directory = os.environ.get("TROUBLESHOOTER_CACHE_DIR") or os.path.join(
+                os.path.expanduser("~"), ".cache", "korrel8r-troubleshooter")
+            _caches[filename] = cls(os.path.join(directory, filename))
+        return _caches[filename]
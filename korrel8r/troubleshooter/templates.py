@@ -0,0 +1,161 @@
+"""
+Drain-style log template mining for compact prompts
+===================================================
+Logs were pasted into the AI prompts verbatim, so hundreds of near-identical
+retry lines or stack frames cost tokens without adding signal. TemplateMiner
+clusters lines into templates as they stream in, following Drain (He et al.,
+ICWS 2017): a fixed-depth tree routes a line by token count and its first
+tokens to a few candidate clusters, the most similar one above a threshold
+absorbs it, and positions where the lines differ become <*>. Each cluster
+keeps a count and a few example values for its wildcards.
+
+summarize() renders "count × template" lines for a prompt, and compact_text()
+collapses only the repeated lines of a larger text (e.g. troubleshooting
+script output) while keeping everything else verbatim and in order.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+WILDCARD = "<*>"
+# Leading RFC 3339 timestamp, as written by `oc logs --timestamps` and most structured loggers
+_TIMESTAMP = re.compile(r"^\s*\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d(?:[.,]\d+)?(?:Z|[+-]\d\d:?\d\d)?\s+")
+# Tokens that are values rather than words: numbers, sizes, durations, hex ids, UUIDs, IPs
+_VARIABLE = re.compile(r"^\(?x?(?:[-+]?\d[\d.,:_]*[a-z%µ]{0,3}|(?:\d+(?:ms|[smhd]))+|0x[0-9a-f]+|[0-9a-f]{8,}"
+                       r"|[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}|\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?)[,;)]?$", re.I)
+
+
+def mask(line: str) -> str:
+    """A line with its leading timestamp removed and its variable tokens replaced by <*>"""
+    return " ".join(WILDCARD if _VARIABLE.match(token) else token
+                    for token in _TIMESTAMP.sub("", line, count=1).split())
+
+
+class LogCluster:
+    """One template with its line count and example wildcard values"""
+
+    __slots__ = ("tokens", "count", "examples")
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.count = 0
+        self.examples: List[str] = []
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+
+class TemplateMiner:
+    """Streaming Drain clustering of log lines into templates
+
+    >>> miner = TemplateMiner().feed(f"10.0.0.{i} 200 {i * 3}ms GET /api/v1/pods" for i in range(50))
+    >>> [(c.count, c.template) for c in miner.clusters]
+    [(50, '<*> <*> <*> GET /api/v1/pods')]
+    """
+
+    def __init__(self, depth: int = 4, similarity: float = 0.5, max_children: int = 100,
+                 max_clusters: int = 1000, max_examples: int = 3):
+        self.depth = max(depth, 3)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.max_examples = max_examples
+        self.lines = 0
+        self.dropped = 0  # Lines that matched nothing once max_clusters was reached
+        self.clusters: List[LogCluster] = []
+        self._root: Dict[int, Dict] = {}
+
+    def add(self, line: str) -> Optional[LogCluster]:
+        """Cluster one line, returning its cluster (None for blank lines or when full)"""
+        raw = _TIMESTAMP.sub("", line, count=1).split()
+        if not raw:
+            return None
+        self.lines += 1
+        tokens = [WILDCARD if _VARIABLE.match(token) else token for token in raw]
+        leaf = self._leaf(tokens)
+        cluster = self._match(leaf, tokens)
+        if cluster is None:
+            if len(self.clusters) >= self.max_clusters:
+                self.dropped += 1
+                return None
+            cluster = LogCluster(tokens)
+            leaf.append(cluster)
+            self.clusters.append(cluster)
+        else:
+            cluster.tokens = [a if a == b else WILDCARD for a, b in zip(cluster.tokens, tokens)]
+        cluster.count += 1
+        if len(cluster.examples) < self.max_examples:
+            values = " ".join(r for r, t in zip(raw, cluster.tokens) if t == WILDCARD)
+            if values and values not in cluster.examples:
+                cluster.examples.append(values)
+        return cluster
+
+    def feed(self, lines: Iterable[str]) -> "TemplateMiner":
+        """Cluster every line of an iterable (or the lines of a str)"""
+        for line in (lines.splitlines() if isinstance(lines, str) else lines):
+            self.add(line)
+        return self
+
+    def _leaf(self, tokens: List[str]) -> List[LogCluster]:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            if any(c.isdigit() for c in token):
+                token = WILDCARD
+            if token not in node:
+                if len(node) >= self.max_children:
+                    token = WILDCARD
+                node = node.setdefault(token, {})
+            else:
+                node = node[token]
+        return node.setdefault(None, [])
+
+    def _match(self, leaf: List[LogCluster], tokens: List[str]) -> Optional[LogCluster]:
+        best, best_score = None, -1.0
+        for cluster in leaf:
+            # A value masked in both lines is the same template token, not a wildcard the cluster had to widen
+            same = sum(a == b for a, b in zip(cluster.tokens, tokens))
+            # Ties go to the more specific template, as in Drain
+            score = same / len(tokens) - cluster.tokens.count(WILDCARD) * 1e-6
+            if score > best_score:
+                best, best_score = cluster, score
+        if best is not None and best_score + 1e-3 >= self.similarity:
+            return best
+        return None
+
+    def top(self, n: Optional[int] = None) -> List[LogCluster]:
+        """Clusters by descending count"""
+        return sorted(self.clusters, key=lambda c: -c.count)[:n]
+
+    def summarize(self, max_templates: int = 30) -> str:
+        """"count × template" lines for a prompt, most frequent first"""
+        if not self.lines:
+            return "No log lines"
+        clusters = self.top(max_templates)
+        lines = [f"{self.lines} lines -> {len(self.clusters)} templates"
+                 + (f" (top {len(clusters)} shown)" if len(clusters) < len(self.clusters) else "")]
+        for cluster in clusters:
+            example = f"  [e.g. {'; '.join(cluster.examples)}]" if cluster.examples and cluster.count > 1 else ""
+            lines.append(f"{cluster.count:>6} × {cluster.template}{example}")
+        return "\n".join(lines)
+
+
+def summarize_logs(logs: str, max_templates: int = 30) -> str:
+    """Template summary of a log for an AI prompt"""
+    return TemplateMiner().feed(logs).summarize(max_templates)
+
+
+def compact_text(text: str, min_count: int = 5) -> str:
+    """Replace lines that repeat (as a template) at least min_count times with one "count × template" line"""
+    miner = TemplateMiner()
+    lines = text.splitlines()
+    clusters = [miner.add(line) for line in lines]
+    output, emitted = [], set()
+    for line, cluster in zip(lines, clusters):
+        if cluster is None or cluster.count < min_count:
+            output.append(line)
+        elif id(cluster) not in emitted:
+            emitted.add(id(cluster))
+            indent = line[:len(line) - len(line.lstrip())]
+            output.append(f"{indent}[{cluster.count} × similar] {cluster.template}")
+    return "\n".join(output)
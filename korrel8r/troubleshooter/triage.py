@@ -0,0 +1,266 @@
+"""
+Namespace-wide triage
+=====================
+The UIs and the CLI analyze one pod per click, which does not scale to an
+incident with dozens of failing pods. triage() lists the namespace's pods and
+events once, selects the pods that are not Running, not ready or restarting a
+lot, and fetches their logs concurrently on a bounded pool. Pods that fail the
+same way (same status, container exit reasons, warning event reasons and log
+anomaly types) form one FailureGroup, and each group gets a single LLM call
+on its representative pod, so forty replicas crashing on the same missing
+ConfigMap cost one analysis instead of forty.
+
+With a korrel8r client, the selected pods are correlated with one goals
+request per distinct set of goal classes the rule planner picks for their
+failure categories (see planner.RulePlanner.goals and
+korrel8r.Korrel8rClient.goals_each), and each pod's related signals go into
+its group's prompt. Without a plan, one neighbours request covers them all.
+
+Groups are ranked by severity, then by pods affected, then by restarts;
+summary_frame() gives the ranked table the UIs and the CLI show.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from troubleshooter import anomaly, categorize, collector, graphindex, korrel8r, llmcache, planner, prompt, templates
+from troubleshooter.evidence import EvidenceBundle
+
+WORKERS = 8  # Concurrent log fetches and LLM calls
+RESTART_THRESHOLD = 5  # Restarts that make a Running pod worth a look
+LOG_TAIL = 200
+HEALTHY = ("Running", "Completed", "Succeeded")
+SEVERITY_RANK = {"CRITICAL": 0, "WARNING": 1, "INFO": 2, "SUCCESS": 3}
+_MARKUP = re.compile(r"[*_#`>]+")
+_LIST_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-•])\s*")
+
+Signature = Tuple[Tuple[str, ...], ...]
+
+
+def restart_count(pod: Dict) -> int:
+    """Restarts of all init and app containers"""
+    status = pod.get("status", {})
+    return sum(cs.get("restartCount", 0)
+               for cs in status.get("initContainerStatuses", []) + status.get("containerStatuses", []))
+
+
+def needs_triage(pod: Dict, restart_threshold: int = RESTART_THRESHOLD) -> bool:
+    """True for pods that are not Running or Completed, have unready containers, or restart a lot"""
+    status = collector.pod_display_status(pod)
+    if status not in HEALTHY:
+        return True
+    if status != "Running":
+        return False
+    statuses = pod.get("status", {}).get("containerStatuses", [])
+    return restart_count(pod) >= restart_threshold or not all(cs.get("ready") for cs in statuses)
+
+
+class PodTriage:
+    """Evidence for one selected pod and the failure signature derived from it"""
+
+    def __init__(self, bundle: EvidenceBundle, logs: str = "", logs_error: Optional[str] = None):
+        self.bundle = bundle
+        self.logs = logs
+        self.logs_error = logs_error
+        self.correlation: Optional[korrel8r.Graph] = None
+        self.anomalies = anomaly.detect_log_anomalies(logs) if logs else []
+        self.status = collector.pod_display_status(bundle.pod)
+        self.restarts = restart_count(bundle.pod)
+        self.warnings = [e for e in bundle.events if e.get("type") == "Warning"]
+        self.category, self.severity = categorize.categorize_error(bundle.failure_text())
+        if self.severity not in ("CRITICAL", "WARNING"):
+            self.severity = "WARNING"  # Selected pods are unhealthy even if no keyword says so
+
+    @property
+    def name(self) -> str:
+        return self.bundle.pod_name
+
+    def signature(self) -> Signature:
+        """What identifies the failure, independent of pod name, counts and times"""
+        status = self.bundle.pod_status
+        exits = set()
+        for cs in status.get("initContainerStatuses", []) + status.get("containerStatuses", []):
+            terminated = cs.get("lastState", {}).get("terminated") or cs.get("state", {}).get("terminated")
+            if terminated:
+                exits.add(f"{terminated.get('reason') or 'Terminated'}:{terminated.get('exitCode', '')}")
+        return ((self.status,), tuple(sorted(exits)),
+                tuple(sorted({e.get("reason", "") for e in self.warnings})),
+                tuple(sorted({a["type"] for a in self.anomalies})))
+
+
+class FailureGroup:
+    """Pods sharing one failure signature, with the AI analysis of the group"""
+
+    def __init__(self, signature: Signature, pods: List[PodTriage]):
+        self.signature = signature
+        self.pods = pods
+        self.analysis: Optional[str] = None
+
+    @property
+    def representative(self) -> PodTriage:
+        """The pod with the most restarts, whose evidence is sent for analysis"""
+        return max(self.pods, key=lambda p: (p.restarts, len(p.logs)))
+
+    @property
+    def severity(self) -> str:
+        return min((p.severity for p in self.pods), key=lambda s: SEVERITY_RANK.get(s, len(SEVERITY_RANK)))
+
+    @property
+    def category(self) -> str:
+        return self.representative.category
+
+    @property
+    def restarts(self) -> int:
+        return sum(p.restarts for p in self.pods)
+
+    def describe(self) -> str:
+        """The signature as one line, e.g. "CrashLoopBackOff · Error:1 · BackOff · repeated_errors" """
+        return " · ".join(", ".join(part) for part in self.signature if part)
+
+    def rank_key(self) -> Tuple:
+        return SEVERITY_RANK.get(self.severity, len(SEVERITY_RANK)), -len(self.pods), -self.restarts
+
+    def evidence(self) -> Dict:
+        """Cache key material for the group analysis"""
+        pod = self.representative
+        return {"signature": self.signature,
+                "pod": llmcache.pod_evidence(pod.bundle.pod, pod.bundle.events, pod.anomalies)}
+
+    def build_prompt(self, budget: int = prompt.BUDGET) -> str:
+        """Analysis prompt for the whole group, built on its representative pod"""
+        pod = self.representative
+        builder = prompt.PromptBuilder(budget)
+        builder.add("FAILURE SIGNATURE", self.describe(), priority=4)
+        builder.add("AFFECTED PODS", ", ".join(p.name for p in self.pods), priority=3)
+        builder.add("DETECTED ANOMALIES", pod.anomalies, priority=4)
+        builder.add("EVENTS", pod.bundle.events_table(), priority=3)
+        builder.add("LOG TEMPLATES (count × line pattern, <*> marks varying values)",
+                    templates.summarize_logs(pod.logs) if pod.logs else pod.logs_error or "", priority=3)
+        builder.add("KORREL8R CORRELATION (classes with results by domain, hops from the pod"
+                    + (", partial: the search was interrupted)" if pod.correlation and pod.correlation.partial else ")"),
+                    graphindex.GraphIndex(pod.correlation).digest(korrel8r.POD_CLASS) if pod.correlation else "",
+                    priority=2)
+        builder.add("POD INFORMATION", pod.bundle.describe(), priority=2)
+        return builder.build(
+            header=f"""
+NAMESPACE TRIAGE: {len(self.pods)} pod(s) in {pod.bundle.namespace} fail the same way.
+Representative pod: {pod.name} (status {pod.status}, {pod.restarts} restarts)
+""",
+            footer="""
+Give, for the whole group:
+1. ROOT CAUSE in one or two sentences (first line)
+2. REMEDIATION with exact commands
+3. Whether the other affected pods need anything different
+""")
+
+
+def collect(namespace: str, workers: int = WORKERS,
+            restart_threshold: int = RESTART_THRESHOLD) -> List[PodTriage]:
+    """Evidence for the unhealthy pods of a namespace: one pod and one event list, logs fetched concurrently"""
+    pods = [pod for pod in collector.get_pods(namespace) if needs_triage(pod, restart_threshold)]
+    if not pods:
+        return []
+    events: Dict[str, List[Dict]] = {}
+    try:
+        for event in collector.get_events(namespace):
+            involved = event.get("involvedObject", {})
+            if involved.get("kind", "Pod") == "Pod":
+                events.setdefault(involved.get("name", ""), []).append(event)
+    except collector.CollectorError:
+        pass  # Events are best effort, like in EvidenceBundle.fetch
+
+    def fetch(pod: Dict) -> PodTriage:
+        name = pod["metadata"]["name"]
+        bundle = EvidenceBundle(namespace, name, pod=pod, events=events.get(name, []))
+        try:
+            return PodTriage(bundle, collector.get_pod_logs(namespace, name, tail=LOG_TAIL))
+        except collector.CollectorError as e:
+            return PodTriage(bundle, logs_error=f"No logs: {e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return list(executor.map(fetch, pods))
+
+
+def correlate(pods: List[PodTriage], client: korrel8r.Korrel8rClient,
+              rule_planner: Optional[planner.RulePlanner] = None) -> None:
+    """Set the korrel8r correlation of every pod: one goals request per planned goal set, else one neighbours
+    request for all of them"""
+    plans: Dict[Tuple[str, ...], Dict[str, PodTriage]] = {}
+    for pod in pods:
+        goals = tuple(rule_planner.goals(pod.category, pod.bundle.namespace)) if rule_planner else ()
+        plans.setdefault(goals, {})[korrel8r.pod_query(pod.bundle.namespace, pod.name)] = pod
+    for goals, starts in plans.items():
+        versions = {start: pod.bundle.pod.get("metadata", {}).get("resourceVersion") for start, pod in starts.items()}
+        try:
+            if goals:
+                graphs, _ = client.goals_each(list(starts), list(goals), versions=versions)
+            else:
+                graphs, _ = client.neighbours_each(list(starts), versions=versions)
+        except korrel8r.Korrel8rError:
+            continue  # Correlation is best effort, the pod evidence is what matters
+        for start, pod in starts.items():
+            pod.correlation = graphs[start]
+
+
+def group(pods: List[PodTriage]) -> List[FailureGroup]:
+    """Pods grouped by failure signature, most urgent group first"""
+    groups: Dict[Signature, List[PodTriage]] = {}
+    for pod in pods:
+        groups.setdefault(pod.signature(), []).append(pod)
+    return sorted((FailureGroup(signature, members) for signature, members in groups.items()),
+                  key=FailureGroup.rank_key)
+
+
+def analyze(groups: List[FailureGroup], analyze_group: Callable[[FailureGroup], str],
+            workers: int = WORKERS) -> None:
+    """Set the analysis of every group, one analyze_group() call per group, concurrently"""
+
+    def run(failure: FailureGroup) -> None:
+        try:
+            failure.analysis = analyze_group(failure)
+        except Exception as e:
+            failure.analysis = f"AI analysis failed: {e}"
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(run, groups))
+
+
+def triage(namespace: str, analyze_group: Optional[Callable[[FailureGroup], str]] = None,
+           workers: int = WORKERS, restart_threshold: int = RESTART_THRESHOLD,
+           korrel8r_client: Optional[korrel8r.Korrel8rClient] = None) -> List[FailureGroup]:
+    """Ranked failure groups of a namespace, correlated if given a korrel8r client and analyzed with analyze_group"""
+    pods = collect(namespace, workers, restart_threshold)
+    if korrel8r_client:
+        correlate(pods, korrel8r_client, planner.get_planner())
+    groups = group(pods)
+    if analyze_group:
+        analyze(groups, analyze_group, workers)
+    return groups
+
+
+def headline(analysis: Optional[str], width: int = 120) -> str:
+    """First meaningful line of an analysis, without Markdown markup"""
+    for line in (analysis or "").splitlines():
+        line = _LIST_ITEM.sub("", _MARKUP.sub("", line)).strip()
+        if not line or line.endswith(":") or line.isupper():
+            continue  # Headings
+        return line if len(line) <= width else line[:width - 1] + "…"
+    return ""
+
+
+def summary_frame(groups: List[FailureGroup]) -> pd.DataFrame:
+    """The ranked summary table: one row per failure group"""
+    return pd.DataFrame([{
+        "rank": rank,
+        "severity": g.severity,
+        "category": categorize.ERROR_CATEGORIES.get(g.category, {}).get("name", g.category),
+        "failure": g.describe(),
+        "pods": len(g.pods),
+        "restarts": g.restarts,
+        "affected": ", ".join(p.name for p in g.pods),
+        "analysis": headline(g.analysis),
+    } for rank, g in enumerate(groups, 1)],
+        columns=["rank", "severity", "category", "failure", "pods", "restarts", "affected", "analysis"])